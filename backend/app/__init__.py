@@ -1,7 +1,9 @@
-from flask import Flask, Response
+import time
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
 from app.core.config import Config
 from app.core.database import db
+from app.core.exceptions import UploadTooLargeError
 from app.core.logging import configure_logger
 
 def create_app(config_class=Config):
@@ -21,6 +23,27 @@ def create_app(config_class=Config):
         except Exception as e:
             print(f"DB Init Failed: {e}")
 
+    # Feed HTTP latency to the vision rate controller so the live loop backs off under load
+    from app.services.vision_service import vision_service
+
+    @app.errorhandler(413)
+    def request_too_large(e):
+        # Raised by Flask while parsing a body over MAX_CONTENT_LENGTH (or the route's own limit)
+        limit = request.max_content_length or Config.MAX_CONTENT_LENGTH
+        error = UploadTooLargeError(f"Request body exceeds the {limit / (1024 * 1024):.1f} MB upload limit.")
+        return jsonify(error.to_dict()), error.status_code
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_latency(response):
+        started = g.get('request_started')
+        if started is not None and not response.is_streamed:
+            vision_service.rate_controller.record_http_latency((time.perf_counter() - started) * 1000)
+        return response
+
     # Register Blueprints
     from app.api.routes import vision, chat, sensors, admin, weather
     app.register_blueprint(vision.bp)
@@ -32,11 +55,18 @@ def create_app(config_class=Config):
     from app.api.routes import remedy
     app.register_blueprint(remedy.bp)
 
+    # Offline video analysis jobs
+    from app.api.routes import jobs
+    app.register_blueprint(jobs.bp)
+
+    # Prometheus scrape endpoint (/metrics)
+    from app.api.routes import metrics
+    app.register_blueprint(metrics.bp)
+
     # Legacy / Compatibility Routes (to match old frontend for now if needed, 
     # but strictly we should update frontend. We will provide redirects or direct mapping)
     
     # Map old /video_feed to new service for backward compatibility during transition
-    from app.services.vision_service import vision_service
     @app.route('/video_feed')
     def legacy_video_feed():
         return Response(vision_service.generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
@@ -1,5 +1,10 @@
-from flask import Blueprint, jsonify
+import os
+from flask import Blueprint, jsonify, request
+from app.core.config import Config
+from app.core.database import db
+from app.services.inference_engines import ENGINES
 from app.services.storage_service import storage_service
+from app.services.vision_service import vision_service
 
 bp = Blueprint('admin', __name__, url_prefix='/api/v1/admin')
 
@@ -11,3 +16,55 @@ def reset_system():
         return jsonify({"success": True, "message": "System data cleared."})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
+
+@bp.route('/db', methods=['GET'])
+def db_status():
+    """SQLite settings, connection pool, write-behind queue and hot window statistics."""
+    data = db.stats()
+    data["write_behind"] = storage_service.get_write_stats()
+    data["hot_window"] = storage_service.get_hot_window_stats()
+    return jsonify({"success": True, "data": data})
+
+@bp.route('/model', methods=['GET'])
+def model_status():
+    """Currently loaded model and the outcome of the last reload."""
+    return jsonify({"success": True, "data": vision_service.get_model_status()})
+
+@bp.route('/model/reload', methods=['POST'])
+def reload_model():
+    """
+    Hot-swap the model without a restart. Optional JSON body:
+    {"model_path": "...", "engine": "torch|onnx", "wait": false}
+    model_path is a file name (or path) inside MODELS_DIR.
+    """
+    payload = request.get_json(silent=True) or {}
+    wait = bool(payload.get('wait', False))
+
+    engine_name = payload.get('engine')
+    if engine_name is not None and str(engine_name).lower() not in ENGINES:
+        return jsonify({"success": False, "error": f"Unknown engine. Choose from: {', '.join(ENGINES)}"}), 400
+    model_path = payload.get('model_path')
+    if model_path is not None:
+        # Model files are unpickled on load, so only files inside MODELS_DIR are accepted
+        models_dir = os.path.realpath(Config.MODELS_DIR)
+        model_path = os.path.realpath(os.path.join(models_dir, str(model_path)))
+        if os.path.commonpath([model_path, models_dir]) != models_dir:
+            return jsonify({"success": False, "error": "Model files must be inside MODELS_DIR."}), 400
+        if not os.path.isfile(model_path):
+            return jsonify({"success": False, "error": "Model file not found."}), 400
+
+    try:
+        started = vision_service.reload_model(
+            model_path=model_path,
+            engine_name=engine_name and str(engine_name).lower(),
+            wait=wait
+        )
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+    if not started:
+        return jsonify({"success": False, "error": "A model reload is already in progress."}), 409
+
+    status = vision_service.get_model_status()
+    if wait and status['last_reload'].get('state') == 'failed':
+        return jsonify({"success": False, "error": status['last_reload'].get('error'), "data": status}), 422
+    return jsonify({"success": True, "data": status}), (200 if wait else 202)
@@ -0,0 +1,91 @@
+import os
+import uuid
+from flask import Blueprint, jsonify, request
+from werkzeug.utils import secure_filename
+from app.core.config import Config
+from app.services.video_jobs import video_job_manager, is_stream
+from app.services.camera_worker import validate_camera_source
+
+bp = Blueprint('jobs', __name__, url_prefix='/api/v1/jobs')
+
+@bp.before_request
+def allow_video_uploads():
+    # Video uploads get their own body limit instead of the image MAX_CONTENT_LENGTH
+    if request.method == 'POST' and request.endpoint == 'jobs.create_video_job':
+        request.max_content_length = Config.VIDEO_UPLOAD_MAX_BYTES + 64 * 1024
+
+def _job_options(values):
+    workers = int(values.get('workers', Config.VIDEO_JOB_WORKERS))
+    if not 1 <= workers <= Config.VIDEO_JOB_MAX_WORKERS:
+        raise ValueError(f"workers must be between 1 and {Config.VIDEO_JOB_MAX_WORKERS}")
+    return {
+        "stride": int(values.get('stride', Config.VIDEO_JOB_STRIDE)),
+        "segment_seconds": float(values.get('segment_seconds', Config.VIDEO_JOB_SEGMENT_SECONDS)),
+        "workers": workers,
+        "max_seconds": float(values['max_seconds']) if values.get('max_seconds') else None
+    }
+
+@bp.route('/video', methods=['POST'])
+def create_video_job():
+    """
+    Start an offline analysis job.
+    Either upload a video (multipart 'file') or pass JSON/form 'source': a stream URL
+    (scheme in CAMERA_URL_SCHEMES, host in CAMERA_URL_HOSTS if set) or a file name under VIDEO_DIR.
+    Optional: stride, segment_seconds, workers, max_seconds.
+    """
+    values = request.get_json(silent=True) or request.values
+    try:
+        options = _job_options(values)
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid job option: {e}"}), 400
+
+    video_dir = os.path.realpath(Config.VIDEO_DIR)
+    delete_source = False
+    if 'file' in request.files and request.files['file'].filename:
+        upload = request.files['file']
+        os.makedirs(video_dir, exist_ok=True)
+        # Unique per upload so concurrent jobs never overwrite each other's (or existing) files
+        source = os.path.join(video_dir, f"{uuid.uuid4().hex[:12]}_{secure_filename(upload.filename) or 'upload'}")
+        upload.save(source)
+        if os.path.getsize(source) > Config.VIDEO_UPLOAD_MAX_BYTES:
+            os.remove(source)
+            return jsonify({"success": False, "error": "Uploaded video is too large."}), 413
+        delete_source = True
+    else:
+        source = values.get('source')
+        if not source:
+            return jsonify({"success": False, "error": "Provide a video 'file' or a 'source'."}), 400
+        if is_stream(source):
+            # Same URL rules as API-added cameras (no file://, no arbitrary internal hosts)
+            try:
+                source = validate_camera_source(source)
+            except ValueError as e:
+                return jsonify({"success": False, "error": f"Invalid source: {e}"}), 400
+        else:
+            source = os.path.realpath(os.path.join(video_dir, source))
+            # Local files are only read from VIDEO_DIR
+            if os.path.commonpath([source, video_dir]) != video_dir:
+                return jsonify({"success": False, "error": "Video files must be inside VIDEO_DIR."}), 400
+            if not os.path.exists(source):
+                return jsonify({"success": False, "error": "Video file not found."}), 404
+
+    job = video_job_manager.create_job(source, delete_source=delete_source, **options)
+    return jsonify({"success": True, "data": job.to_dict()}), 202
+
+@bp.route('/video', methods=['GET'])
+def list_video_jobs():
+    return jsonify({"success": True, "data": video_job_manager.list()})
+
+@bp.route('/video/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    """Progress and throughput of one job, including per-segment state."""
+    job = video_job_manager.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found."}), 404
+    return jsonify({"success": True, "data": job.to_dict(include_segments=True)})
+
+@bp.route('/video/<job_id>', methods=['DELETE'])
+def cancel_video_job(job_id):
+    if not video_job_manager.cancel(job_id):
+        return jsonify({"success": False, "error": "Job not found."}), 404
+    return jsonify({"success": True, "message": "Cancellation requested."})
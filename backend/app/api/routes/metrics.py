@@ -0,0 +1,11 @@
+from flask import Blueprint, Response
+from app.core.metrics import PrometheusText
+from app.services.vision_service import vision_service
+from app.services.metrics_exporter import render_metrics
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Vision pipeline metrics in Prometheus text format."""
+    return Response(render_metrics(vision_service), mimetype=PrometheusText.CONTENT_TYPE)
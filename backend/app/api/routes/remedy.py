@@ -3,6 +3,7 @@ from flask import Blueprint, jsonify, request
 from app.services.vision_service import vision_service
 from app.services.weather_service import weather_service
 from app.services.remedy_service import remedy_service
+from app.core.exceptions import AppError
 import logging
 
 bp = Blueprint('remedy', __name__, url_prefix='/api/v1/remedy')
@@ -13,7 +14,7 @@ def analyze_and_recommend():
     """
     Unified Endpoint: Upload Image -> Get Detections -> Check Weather -> Get Remedy
     
-    Accepts: multipart/form-data with 'file'
+    Accepts: multipart/form-data with 'file' (optional 'tiled=true' for high-resolution images)
     Returns: JSON with detailed analysis and context-aware recommendations.
     """
     if 'file' not in request.files:
@@ -23,10 +24,12 @@ def analyze_and_recommend():
     if file.filename == '':
         return jsonify({"success": False, "error": "No file selected", "code": "EMPTY_FILENAME"}), 400
         
+    tiled = request.values.get('tiled', 'false').lower() in ('1', 'true', 'yes')
     try:
         # 1. Vision Analysis
-        # Returns list of dicts: [{'label': 'Potato_Early_Blight', 'confidence': 0.95}, ...]
-        detections = vision_service.predict_image_file(file)
+        # result["detections"]: [{'label': 'Potato_Early_Blight', 'confidence': 0.95, 'box': [...]}, ...]
+        result = vision_service.predict_image_file(file, tiled=tiled)
+        detections = result["detections"]
         
         # 2. Weather Context
         # Fetches real-time or simulated weather
@@ -73,9 +76,13 @@ def analyze_and_recommend():
             },
             "analysis": results
         }
+        if tiled:
+            response["tiling"] = result.get("tiling")
         
         return jsonify(response)
 
+    except AppError as e:
+        return jsonify(e.to_dict()), e.status_code
     except Exception as e:
         logger.error(f"Analysis failed: {str(e)}", exc_info=True)
         return jsonify({
@@ -1,12 +1,17 @@
 from flask import Blueprint, jsonify, request, Response
 from app.services.vision_service import vision_service
 from app.services.storage_service import storage_service
+from app.core.exceptions import AppError
+from app.services.camera_worker import validate_camera_source
 
 bp = Blueprint('vision', __name__, url_prefix='/api/v1/vision')
 
 @bp.route('/analyze', methods=['POST'])
 def analyze_image():
-    """Upload and analyze an image."""
+    """
+    Upload and analyze an image.
+    Optional form/query flag: tiled=true for tiled analysis of high-resolution images.
+    """
     if 'file' not in request.files:
         return jsonify({"success": False, "error": "No file uploaded"}), 400
     
@@ -14,12 +19,15 @@ def analyze_image():
     if file.filename == '':
         return jsonify({"success": False, "error": "No file selected"}), 400
         
+    tiled = request.values.get('tiled', 'false').lower() in ('1', 'true', 'yes')
     try:
-        result = vision_service.predict_image_file(file)
+        result = vision_service.predict_image_file(file, tiled=tiled)
         return jsonify({
             "success": True,
             "data": result
         })
+    except AppError as e:
+        return jsonify(e.to_dict()), e.status_code
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -54,6 +62,90 @@ def video_feed():
     """MJPEG Video Feed."""
     return Response(vision_service.generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@bp.route('/cameras', methods=['GET'])
+def list_cameras():
+    """Status of every registered camera."""
+    return jsonify({
+        "success": True,
+        "data": vision_service.list_cameras()
+    })
+
+@bp.route('/cameras', methods=['POST'])
+def add_camera():
+    """
+    Register a camera at runtime.
+    Input JSON: {"id": "greenhouse2", "source": "rtsp://..." | 0 | "video.mp4"}
+    URLs must use an allowed scheme/host; files are looked up in VIDEO_DIR.
+    """
+    data = request.json or {}
+    camera_id = str(data.get('id', '')).strip()
+    source = data.get('source')
+    if not camera_id or source in (None, ''):
+        return jsonify({"success": False, "error": "Both 'id' and 'source' are required"}), 400
+
+    try:
+        source = validate_camera_source(source)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    try:
+        worker = vision_service.add_camera(camera_id, source)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    return jsonify({"success": True, "data": worker.status()}), 201
+
+@bp.route('/cameras/<camera_id>', methods=['DELETE'])
+def remove_camera(camera_id):
+    """Stop and unregister a camera."""
+    if not vision_service.remove_camera(camera_id):
+        return jsonify({"success": False, "error": f"Unknown camera '{camera_id}'"}), 404
+    return jsonify({"success": True})
+
+@bp.route('/cameras/<camera_id>/status')
+def camera_status(camera_id):
+    """Pipeline counters and latest detections for one camera."""
+    worker = vision_service.get_camera_worker(camera_id)
+    if worker is None:
+        return jsonify({"success": False, "error": f"Unknown camera '{camera_id}'"}), 404
+    return jsonify({
+        "success": True,
+        "data": worker.status()
+    })
+
+@bp.route('/cameras/<camera_id>/feed')
+def camera_feed(camera_id):
+    """MJPEG Video Feed for one camera."""
+    if vision_service.get_camera_worker(camera_id) is None:
+        return jsonify({"success": False, "error": f"Unknown camera '{camera_id}'"}), 404
+    return Response(vision_service.generate_frames(camera_id), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@bp.route('/snapshot')
+@bp.route('/cameras/<camera_id>/snapshot')
+def snapshot(camera_id=None):
+    """Single annotated JPEG of the latest frame (rendered on request)."""
+    if camera_id is not None and vision_service.get_camera_worker(camera_id) is None:
+        return jsonify({"success": False, "error": f"Unknown camera '{camera_id}'"}), 404
+    jpeg = vision_service.get_snapshot(camera_id)
+    if jpeg is None:
+        return jsonify({"success": False, "error": "No frame available yet"}), 503
+    return Response(jpeg, mimetype='image/jpeg')
+
+@bp.route('/pipeline/stats')
+def pipeline_stats():
+    """Live pipeline counters (captured / dropped / inferred frames)."""
+    return jsonify({
+        "success": True,
+        "data": vision_service.get_pipeline_stats()
+    })
+
+@bp.route('/cache/stats')
+def cache_stats():
+    """Upload result cache hit/miss counters and saved inference time."""
+    return jsonify({
+        "success": True,
+        "data": vision_service.get_cache_stats()
+    })
+
 @bp.route('/logs/current')
 def current_logs():
     """Current frame status display (for overlay)."""
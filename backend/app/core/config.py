@@ -12,17 +12,133 @@ class Config:
     # Model Configuration
     MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(BASE_DIR, '..', 'models', 'best.pt'))
     MODEL_CONFIDENCE = float(os.environ.get('MODEL_CONFIDENCE', 0.5))
+    MODEL_IOU = float(os.environ.get('MODEL_IOU', 0.45))
+    MODEL_IMGSZ = int(os.environ.get('MODEL_IMGSZ', 640))
+    
+    # Tiled analysis for high-resolution uploads (?tiled=true)
+    TILE_SIZE = int(os.environ.get('TILE_SIZE', MODEL_IMGSZ))
+    TILE_OVERLAP = float(os.environ.get('TILE_OVERLAP', 0.2))
+    
+    # Inference Engine: 'torch' (Ultralytics/PyTorch), 'onnx' (ONNX Runtime CPU) or 'stub' (no model; benchmarks/CI)
+    INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'torch')
+    ONNX_MODEL_PATH = os.environ.get('ONNX_MODEL_PATH', os.path.splitext(MODEL_PATH)[0] + '.onnx')
+    ONNX_THREADS = int(os.environ.get('ONNX_THREADS', 0))
+    STUB_LATENCY_MS = float(os.environ.get('STUB_LATENCY_MS', 5))
+    
+    # Inference Scheduling (micro-batching across uploads and the live loop)
+    INFERENCE_MAX_BATCH = int(os.environ.get('INFERENCE_MAX_BATCH', 4))
+    INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 5))
+    # >0 runs the model in that many worker processes (shared-memory frame handoff)
+    INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))
+    # Priority admission: max queued+running frames and queue deadline (ms, 0 = none) per class
+    INFERENCE_INTERACTIVE_MAX = int(os.environ.get('INFERENCE_INTERACTIVE_MAX', 64))
+    INFERENCE_INTERACTIVE_DEADLINE_MS = float(os.environ.get('INFERENCE_INTERACTIVE_DEADLINE_MS', 30000))
+    INFERENCE_LIVE_MAX = int(os.environ.get('INFERENCE_LIVE_MAX', 4))
+    INFERENCE_LIVE_DEADLINE_MS = float(os.environ.get('INFERENCE_LIVE_DEADLINE_MS', 500))
+    INFERENCE_BACKGROUND_MAX = int(os.environ.get('INFERENCE_BACKGROUND_MAX', 16))
+    INFERENCE_BACKGROUND_DEADLINE_MS = float(os.environ.get('INFERENCE_BACKGROUND_DEADLINE_MS', 0))
+    # Shed/degrade live frames while recent upload p99 is above this (0 disables)
+    INTERACTIVE_P99_TARGET_MS = float(os.environ.get('INTERACTIVE_P99_TARGET_MS', 1000))
+    
+    # Model hot-swap (admin reload / file watcher)
+    MODEL_WATCH = os.environ.get('MODEL_WATCH', 'False') == 'True'
+    MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 5.0))
+    MODEL_WARMUP_ROUNDS = int(os.environ.get('MODEL_WARMUP_ROUNDS', 2))
+    # The admin reload endpoint only loads model files from inside this directory
+    MODELS_DIR = os.environ.get('MODELS_DIR', os.path.join(BASE_DIR, '..', 'models'))
+    # Images a new model must handle before it is swapped in (optional expected.json lists required labels)
+    GOLDEN_IMAGES_DIR = os.environ.get('GOLDEN_IMAGES_DIR', os.path.join(BASE_DIR, '..', 'models', 'golden'))
     
     # Database Configuration
     DB_PATH = os.environ.get('DB_PATH', os.path.join(BASE_DIR, '..', 'agri.db'))
+    # Pooled connections; WAL lets readers run alongside the vision thread's writes
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10.0))
+    DB_JOURNAL_MODE = os.environ.get('DB_JOURNAL_MODE', 'WAL')
+    DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')  # NORMAL is durable across app crashes in WAL mode
+    DB_CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 16384))
+    DB_MMAP_SIZE = int(os.environ.get('DB_MMAP_SIZE', 64 * 1024 * 1024))
+    DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+    DB_STATEMENT_CACHE = int(os.environ.get('DB_STATEMENT_CACHE', 256))
+    # Move detections/sensors older than the current 'day' or 'month' into per-period tables ('none' = off)
+    DB_PARTITION = os.environ.get('DB_PARTITION', 'none')
+    DB_PARTITION_INTERVAL = float(os.environ.get('DB_PARTITION_INTERVAL', 3600))
+    # Write-behind ingestion: detection/sensor rows are group-committed by a background thread
+    DB_WRITE_BEHIND = os.environ.get('DB_WRITE_BEHIND', 'True') == 'True'
+    DB_WRITE_BATCH_SIZE = int(os.environ.get('DB_WRITE_BATCH_SIZE', 500))
+    DB_WRITE_FLUSH_INTERVAL = float(os.environ.get('DB_WRITE_FLUSH_INTERVAL', 0.5))
+    DB_WRITE_MAX_PENDING = int(os.environ.get('DB_WRITE_MAX_PENDING', 20000))
+    # Producers wait this long for queue space, then commit their own rows
+    DB_WRITE_BLOCK_TIMEOUT = float(os.environ.get('DB_WRITE_BLOCK_TIMEOUT', 2.0))
+    # In-memory copy of the latest detection/sensor rows (per table) serving recent reads; 0 = off
+    HOT_WINDOW_ROWS = int(os.environ.get('HOT_WINDOW_ROWS', 5000))
+    HOT_WINDOW_SECONDS = float(os.environ.get('HOT_WINDOW_SECONDS', 900))
+    
+    # Upload handling (streamed into pooled buffers; larger bodies get 413)
+    MAX_UPLOAD_BYTES = int(os.environ.get('MAX_UPLOAD_BYTES', 20 * 1024 * 1024))
+    # Flask rejects larger request bodies while parsing, before they are spooled (room for multipart framing)
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_BYTES + 64 * 1024
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 64 * 1024))
+    UPLOAD_BUFFER_POOL = int(os.environ.get('UPLOAD_BUFFER_POOL', 4))
+    # Decode large JPEG/PNG uploads at 1/2-1/8 scale when still >= MODEL_IMGSZ (not in tiled mode)
+    UPLOAD_REDUCED_DECODE = os.environ.get('UPLOAD_REDUCED_DECODE', 'True') == 'True'
+    
+    # Upload Result Cache
+    RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 256))
+    RESULT_CACHE_MAX_DISTANCE = int(os.environ.get('RESULT_CACHE_MAX_DISTANCE', 5))  # Perceptual-hash bits
+    RESULT_CACHE_PERSIST = os.environ.get('RESULT_CACHE_PERSIST', 'False') == 'True'
     
     # Sensor Simulation Config
     SIMULATE_SENSORS = os.environ.get('SIMULATE_SENSORS', 'True') == 'True'
     
     # Vision Configuration
     CAMERA_INDEX = int(os.environ.get('CAMERA_INDEX', 0))
+    # Multiple cameras: "id=source,id=source" (source = device index, stream URL or video file)
+    CAMERA_SOURCES = os.environ.get('CAMERA_SOURCES', f"default={CAMERA_INDEX}")
+    # Sources cameras added through the API may use: device indexes, these URL schemes (and hosts;
+    # empty = any host) or video files inside VIDEO_DIR
+    CAMERA_URL_SCHEMES = [s.strip().lower() for s in os.environ.get('CAMERA_URL_SCHEMES', 'rtsp,rtsps').split(',') if s.strip()]
+    CAMERA_URL_HOSTS = [h.strip().lower() for h in os.environ.get('CAMERA_URL_HOSTS', '').split(',') if h.strip()]
     LOG_COOLDOWN = float(os.environ.get('LOG_COOLDOWN', 1.0))
     
+    # Live-camera detection tracking (log track start / peak / end instead of every frame)
+    TRACKING_ENABLED = os.environ.get('TRACKING_ENABLED', 'True') == 'True'
+    TRACK_IOU_THRESHOLD = float(os.environ.get('TRACK_IOU_THRESHOLD', 0.3))
+    TRACK_MAX_AGE = float(os.environ.get('TRACK_MAX_AGE', 1.5))  # Seconds unseen before a track ends
+    TRACK_MIN_HITS = int(os.environ.get('TRACK_MIN_HITS', 2))
+    TRACK_PEAK_MARGIN = float(os.environ.get('TRACK_PEAK_MARGIN', 0.05))
+    
+    # Offline video / stream analysis jobs
+    VIDEO_DIR = os.environ.get('VIDEO_DIR', os.path.join(BASE_DIR, '..', 'videos'))  # API jobs may only read files here
+    VIDEO_UPLOAD_MAX_BYTES = int(os.environ.get('VIDEO_UPLOAD_MAX_BYTES', 1024 * 1024 * 1024))
+    VIDEO_JOB_STRIDE = int(os.environ.get('VIDEO_JOB_STRIDE', 5))
+    VIDEO_JOB_SEGMENT_SECONDS = float(os.environ.get('VIDEO_JOB_SEGMENT_SECONDS', 60))
+    VIDEO_JOB_WORKERS = int(os.environ.get('VIDEO_JOB_WORKERS', 2))
+    VIDEO_JOB_MAX_WORKERS = int(os.environ.get('VIDEO_JOB_MAX_WORKERS', 4))  # Upper bound for the per-job 'workers' option
+    VIDEO_JOB_MAX_CONCURRENT = int(os.environ.get('VIDEO_JOB_MAX_CONCURRENT', 1))
+    VIDEO_JOB_MAX_INFLIGHT = int(os.environ.get('VIDEO_JOB_MAX_INFLIGHT', 8))  # Frames per segment awaiting inference
+    
+    # Detection CSV Log (background writer)
+    CSV_LOG_PATH = os.environ.get('CSV_LOG_PATH', os.path.join('logs', 'detections_log.csv'))
+    CSV_LOG_QUEUE_SIZE = int(os.environ.get('CSV_LOG_QUEUE_SIZE', 10000))
+    CSV_LOG_BATCH_SIZE = int(os.environ.get('CSV_LOG_BATCH_SIZE', 200))
+    CSV_LOG_FLUSH_INTERVAL = float(os.environ.get('CSV_LOG_FLUSH_INTERVAL', 1.0))
+    CSV_LOG_MAX_BYTES = int(os.environ.get('CSV_LOG_MAX_BYTES', 10 * 1024 * 1024))
+    CSV_LOG_ROTATE_DAILY = os.environ.get('CSV_LOG_ROTATE_DAILY', 'True') == 'True'
+    FRAME_BUFFER_SIZE = int(os.environ.get('FRAME_BUFFER_SIZE', 2))
+    STREAM_JPEG_QUALITY = int(os.environ.get('STREAM_JPEG_QUALITY', 80))
+    
+    # Scene-change gating (skip inference on unchanged frames)
+    SCENE_GATE_ENABLED = os.environ.get('SCENE_GATE_ENABLED', 'True') == 'True'
+    SCENE_GATE_THRESHOLD = float(os.environ.get('SCENE_GATE_THRESHOLD', 3.0))
+    SCENE_GATE_MAX_AGE = float(os.environ.get('SCENE_GATE_MAX_AGE', 2.0))
+    
+    # Adaptive inference rate (0 / empty disables each target)
+    VISION_TARGET_FPS = float(os.environ.get('VISION_TARGET_FPS', 0))
+    VISION_CPU_BUDGET = float(os.environ.get('VISION_CPU_BUDGET', 0))  # Fraction of one core, e.g. 0.5
+    HTTP_LATENCY_TARGET_MS = float(os.environ.get('HTTP_LATENCY_TARGET_MS', 0))
+    VISION_IMGSZ_STEPS = [int(s) for s in os.environ.get('VISION_IMGSZ_STEPS', '').split(',') if s.strip()]
+    
     # Weather API (Optional)
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY', '')
     LOCATION_LAT = os.environ.get('LOCATION_LAT', '0')
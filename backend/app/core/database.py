@@ -1,62 +1,275 @@
+import atexit
 import sqlite3
+import threading
+import time
 import logging
+from contextlib import contextmanager
 from app.core.config import Config
+from app.core.metrics import Histogram, STAGE_BUCKETS_MS
+from app.core.migrations import migrate, current_version
+from app.core.partitions import PartitionRotator
 
 logger = logging.getLogger(__name__)
 
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections.
+
+    Connections are created lazily up to `max_size` and handed out most
+    recently used first, so their page and statement caches stay warm. A
+    thread that already holds a connection gets the same one back from nested
+    `connection()` blocks. When every connection is busy, callers wait up to
+    `timeout` seconds for one to be returned.
+    """
+    def __init__(self, factory, max_size=8, timeout=10.0):
+        self.factory = factory
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.idle = []
+        self.created = 0
+        self.condition = threading.Condition()
+        self.local = threading.local()
+
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.checkouts = 0
+        self.reused = 0
+        self.waits = 0
+        self.discarded = 0
+        self.wait_ms = Histogram(STAGE_BUCKETS_MS)
+
+    def acquire(self):
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        conn = None
+        with self.condition:
+            while True:
+                if self.idle:
+                    conn = self.idle.pop()
+                    self.reused += 1
+                    break
+                if self.created < self.max_size:
+                    self.created += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(f"No database connection free after {self.timeout:.0f}s.")
+                self.waits += 1
+                self.condition.wait(remaining)
+            self.in_use += 1
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+        if conn is None:
+            try:
+                conn = self.factory()
+            except Exception:
+                with self.condition:
+                    self.created -= 1
+                    self.in_use -= 1
+                    self.condition.notify()
+                raise
+        self.wait_ms.observe((time.perf_counter() - started) * 1000)
+        return conn
+
+    def release(self, conn):
+        keep = True
+        try:
+            if conn.in_transaction:
+                # Never hand the next caller someone else's half-finished transaction
+                conn.rollback()
+        except sqlite3.Error:
+            keep = False
+        with self.condition:
+            self.in_use -= 1
+            if keep:
+                self.idle.append(conn)
+            else:
+                self.created -= 1
+                self.discarded += 1
+            self.condition.notify()
+        if not keep:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self.local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+        conn = self.acquire()
+        self.local.conn = conn
+        try:
+            yield conn
+        finally:
+            self.local.conn = None
+            self.release(conn)
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.created -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "max_size": self.max_size,
+                "open": self.created,
+                "idle": len(self.idle),
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "reused": self.reused,
+                "waits": self.waits,
+                "discarded": self.discarded,
+                "wait_ms": self.wait_ms.snapshot()
+            }
+
+
 class DatabaseManager:
+    """
+    SQLite access for the whole app.
+
+    The database runs in WAL mode so readers (chat, dashboards) never block
+    behind the vision thread's writes, with `synchronous`, page cache and
+    mmap pragmas from Config. Services borrow connections from a pool via
+    `connection()` / `transaction()` instead of opening one per query; each
+    pooled connection keeps its own prepared-statement cache.
+    """
     def __init__(self, db_path=None):
         self.db_path = db_path or Config.DB_PATH
+        self.pool = ConnectionPool(self._connect, Config.DB_POOL_SIZE, Config.DB_POOL_TIMEOUT)
+        self.local = threading.local()  # transaction() / snapshot() nesting depth of this thread
+        self.journal_mode = None
+        self.partitions = None
 
-    def get_connection(self):
-        """Creates a database connection."""
+    def _connect(self):
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Return dict-like objects
-            return conn
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=Config.DB_BUSY_TIMEOUT_MS / 1000.0,
+                check_same_thread=False,  # Pooled connections move between threads (one at a time)
+                cached_statements=Config.DB_STATEMENT_CACHE
+            )
         except sqlite3.Error as e:
             logger.error(f"Database connection failed: {e}")
             raise
+        conn.row_factory = sqlite3.Row  # Return dict-like objects
+        self.journal_mode = conn.execute(f"PRAGMA journal_mode={Config.DB_JOURNAL_MODE}").fetchone()[0]
+        conn.execute(f"PRAGMA synchronous={Config.DB_SYNCHRONOUS}")
+        conn.execute(f"PRAGMA cache_size=-{int(Config.DB_CACHE_SIZE_KB)}")
+        conn.execute(f"PRAGMA mmap_size={int(Config.DB_MMAP_SIZE)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
 
-    def init_db(self):
-        """Initialize the database tables."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Table for sensor data
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sensors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL,
-                temperature REAL,
-                humidity REAL,
-                soil_moisture REAL
-            )
-        ''')
-
-        # Table for detections
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS detections (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp REAL,
-                label TEXT,
-                confidence REAL,
-                source TEXT DEFAULT 'webcam'
-            )
-        ''')
-        
-        # Check and add column if missing (for migrations)
-        try:
-            cursor.execute("SELECT source FROM detections LIMIT 1")
-        except sqlite3.OperationalError:
+    def get_connection(self):
+        """Creates a standalone (unpooled) connection with the same pragmas; the caller closes it."""
+        return self._connect()
+
+    @contextmanager
+    def connection(self):
+        """Borrows a pooled connection for the duration of the block."""
+        with self.pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Pooled connection whose work is committed on success and rolled back on
+        error. Nested inside another transaction() / snapshot() on the same
+        thread, the block runs in a savepoint and only the outermost one commits.
+        """
+        with self.pool.connection() as conn:
+            if getattr(self.local, 'depth', 0):
+                with self._savepoint(conn):
+                    yield conn
+                return
+            if not conn.in_transaction:
+                conn.execute("BEGIN")  # Explicit, so nested savepoints belong to this transaction
+            self.local.depth = 1
             try:
-                cursor.execute("ALTER TABLE detections ADD COLUMN source TEXT DEFAULT 'webcam'")
-            except Exception:
-                pass
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self.local.depth = 0
+
+    @contextmanager
+    def snapshot(self):
+        """
+        Pooled connection inside one read transaction: every query sees the
+        same committed state. Nested inside a transaction on the same thread,
+        it reads that transaction's state and undoes any writes of its own.
+        """
+        with self.pool.connection() as conn:
+            if getattr(self.local, 'depth', 0) or conn.in_transaction:
+                with self._savepoint(conn, keep=False):
+                    yield conn
+                return
+            conn.execute("BEGIN")
+            self.local.depth = 1
+            try:
+                yield conn
+            finally:
+                self.local.depth = 0
+                conn.rollback()
+
+    @contextmanager
+    def _savepoint(self, conn, keep=True):
+        """Inner block of a nested transaction: released on success (if `keep`), otherwise rolled back."""
+        depth = getattr(self.local, 'depth', 0)
+        name = f"nested_{depth}"
+        conn.execute(f"SAVEPOINT {name}")
+        self.local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            if not keep:
+                conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+        finally:
+            self.local.depth = depth
+
+    def close(self):
+        """Closes idle pooled connections (WAL is checkpointed when the last one closes)."""
+        if self.partitions:
+            self.partitions.stop()
+        self.pool.close_all()
+
+    def stats(self):
+        with self.connection() as conn:
+            version = current_version(conn)
+        return {
+            "path": self.db_path,
+            "schema_version": version,
+            "journal_mode": self.journal_mode,
+            "synchronous": Config.DB_SYNCHRONOUS,
+            "cache_size_kb": Config.DB_CACHE_SIZE_KB,
+            "mmap_size": Config.DB_MMAP_SIZE,
+            "statement_cache": Config.DB_STATEMENT_CACHE,
+            "pool": self.pool.stats(),
+            "partitions": self.partitions.stats() if self.partitions else {"mode": "none"}
+        }
+
+    def init_db(self):
+        """Creates or upgrades the schema (see app.core.migrations) and starts partition upkeep."""
+        with self.connection() as conn:
+            version = migrate(conn)
+        if Config.DB_PARTITION in ("day", "month") and self.partitions is None:
+            self.partitions = PartitionRotator(self, Config.DB_PARTITION, Config.DB_PARTITION_INTERVAL)
+            self.partitions.start()
+        logger.info(f"Database initialized successfully (schema version {version}).")
 
-        conn.commit()
-        conn.close()
-        logger.info("Database initialized successfully.")
 
 # Singleton instance
 db = DatabaseManager()
+atexit.register(db.close)
@@ -26,3 +26,15 @@ class SensorReadError(AppError):
 class ValidationError(AppError):
     def __init__(self, message="Invalid input data."):
         super().__init__(message, status_code=400)
+
+class UploadTooLargeError(AppError):
+    def __init__(self, message="Uploaded file is too large."):
+        super().__init__(message, status_code=413)
+
+class InferenceBusyError(AppError):
+    def __init__(self, message="Inference capacity exhausted; try again shortly."):
+        super().__init__(message, status_code=503)
+
+class InferenceTimeoutError(AppError):
+    def __init__(self, message="Inference deadline exceeded."):
+        super().__init__(message, status_code=504)
@@ -0,0 +1,205 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Default latency buckets in milliseconds
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    """
+    Minimal thread-safe fixed-bucket histogram.
+    Keeps cumulative counts per upper bound plus count/sum, which is enough to
+    report percentiles and to render the data in other formats later.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def percentile(self, q, interpolate=False):
+        """
+        Upper bucket bound containing the q-th percentile (0-100). With
+        interpolate=True the value is estimated linearly inside that bucket
+        (like Prometheus' histogram_quantile).
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = self.count * q / 100.0
+            running = 0
+            for i, c in enumerate(self.counts):
+                previous = running
+                running += c
+                if running >= rank:
+                    if i >= len(self.buckets):
+                        return self.buckets[-1] if interpolate and self.buckets else float('inf')
+                    if not interpolate or not c:
+                        return self.buckets[i]
+                    lower = self.buckets[i - 1] if i else 0.0
+                    return lower + (self.buckets[i] - lower) * (rank - previous) / c
+        return None
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {str(b): c for b, c in zip(self.buckets, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "mean": round(total / count, 3) if count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": buckets
+        }
+
+    def state(self):
+        """Consistent (buckets, per-bucket counts incl. +Inf, count, sum) view for exporters."""
+        with self._lock:
+            return self.buckets, list(self.counts), self.count, self.sum
+
+
+# Finer buckets for individual pipeline stages (many take well under a millisecond)
+STAGE_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+PIPELINE_STAGES = ("capture", "preprocess", "predict", "postprocess", "enrich", "draw", "encode", "csv_write", "db_write")
+
+
+class StageTimers:
+    """Named latency histograms, one per pipeline stage, created on first use."""
+    def __init__(self, buckets=STAGE_BUCKETS_MS):
+        self.buckets = buckets
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, stage):
+        h = self.histograms.get(stage)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(stage, Histogram(self.buckets))
+        return h
+
+    def observe(self, stage, value_ms):
+        self.histogram(stage).observe(value_ms)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - started) * 1000)
+
+    def snapshot(self):
+        return {stage: h.snapshot() for stage, h in list(self.histograms.items())}
+
+    def reset(self):
+        """Drops all recorded stages (e.g. after a benchmark warm-up)."""
+        with self._lock:
+            self.histograms = {}
+
+
+# Shared by the capture/inference/logging code paths of the vision pipeline
+pipeline_timers = StageTimers()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value):
+    if value is None:
+        return "NaN"
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusText:
+    """Builds a page in the Prometheus text exposition format (0.0.4)."""
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """`samples` is a list of (labels dict, value) for a gauge or counter."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+    def histogram(self, name, help_text, histograms):
+        """`histograms` is a list of (labels dict, Histogram)."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, h in histograms:
+            buckets, counts, count, total = h.state()
+            running = 0
+            for bound, c in zip(buckets, counts):
+                running += c
+                self.lines.append(f"{name}_bucket{_format_labels(dict(labels, le=_format_value(float(bound))))} {running}")
+            self.lines.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {count}")
+            self.lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(total))}")
+            self.lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+
+# Resident memory buckets in megabytes (upload handling)
+MEMORY_BUCKETS_MB = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def current_rss_mb():
+    """
+    Current resident set size of this process in MB. Reads /proc on Linux;
+    elsewhere falls back to the process peak from getrusage.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except (ImportError, OSError):
+        return 0.0
+
+
+class RssSampler:
+    """Tracks the highest RSS seen at the sample points of one request."""
+    def __init__(self):
+        self.start = current_rss_mb()
+        self.peak = self.start
+
+    def sample(self):
+        self.peak = max(self.peak, current_rss_mb())
+        return self.peak
+
+    @property
+    def growth(self):
+        return max(0.0, self.peak - self.start)
@@ -0,0 +1,132 @@
+import sqlite3
+import logging
+from app.core.partitions import PARTITIONED_TABLES, create_time_indexes, refresh_views
+from app.core.rollups import create_rollups, rebuild_from_db
+
+logger = logging.getLogger(__name__)
+
+# (version, description, function(conn)) in order; PRAGMA user_version holds the last applied version
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+@migration(1, "Base tables")
+def _base_tables(conn):
+    # Databases created before versioning already have (some of) these; everything is idempotent
+    cursor = conn.cursor()
+
+    # Table for sensor data
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sensors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL,
+            temperature REAL,
+            humidity REAL,
+            soil_moisture REAL
+        )
+    ''')
+
+    # Table for detections
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS detections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp REAL,
+            label TEXT,
+            confidence REAL,
+            source TEXT DEFAULT 'webcam',
+            track_id INTEGER,
+            event TEXT,
+            dwell REAL
+        )
+    ''')
+
+    # Table for cached upload analysis results
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS result_cache (
+            content_hash TEXT PRIMARY KEY,
+            phash TEXT,
+            model TEXT,
+            detections TEXT,
+            infer_ms REAL,
+            created REAL
+        )
+    ''')
+
+    # Check and add columns if missing (for pre-versioning databases)
+    existing = {r[1] for r in cursor.execute("PRAGMA table_info(detections)").fetchall()}
+    for column, ddl in (
+        ("source", "source TEXT DEFAULT 'webcam'"),
+        # Track events from the live-camera tracker (NULL for uploads)
+        ("track_id", "track_id INTEGER"),
+        ("event", "event TEXT"),
+        ("dwell", "dwell REAL"),
+    ):
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE detections ADD COLUMN {ddl}")
+
+
+@migration(2, "Time indexes on detections and sensors")
+def _time_indexes(conn):
+    for table in PARTITIONED_TABLES:
+        create_time_indexes(conn, table)
+    conn.execute("ANALYZE")
+
+
+@migration(3, "Read views over live tables and their partitions")
+def _read_views(conn):
+    refresh_views(conn)
+
+
+@migration(4, "Per-minute detection rollups")
+def _rollups(conn):
+    create_rollups(conn)
+    rebuild_from_db(conn)
+
+
+@migration(5, "Image size of cached upload results")
+def _result_cache_size(conn):
+    existing = {r[1] for r in conn.execute("PRAGMA table_info(result_cache)").fetchall()}
+    for column in ("width", "height"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE result_cache ADD COLUMN {column} INTEGER")
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Applies pending migrations, each in its own IMMEDIATE transaction together
+    with its user_version bump. Safe to run against a live database: WAL
+    readers continue throughout and writers wait (busy timeout) only while
+    one step runs. Concurrent starters re-check the version under the lock,
+    so each step runs once. Returns the resulting version.
+    """
+    version = current_version(conn)
+    for target, description, fn in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) >= target:
+                conn.rollback()  # Another process got there first
+                version = current_version(conn)
+                continue
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            logger.error(f"Database migration {target} ({description}) failed.")
+            raise
+        version = target
+        logger.info(f"Applied database migration {target}: {description}.")
+    return version
@@ -0,0 +1,179 @@
+import re
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Append-only tables that are indexed by time and can be split into periods
+PARTITIONED_TABLES = ("detections", "sensors")
+
+# (index suffix, columns) per table. The leading timestamp index also carries
+# the label so the chat/summary query is answered from the index alone.
+TIME_INDEXES = {
+    "detections": (
+        ("timestamp", "timestamp, label"),
+        ("label_timestamp", "label, timestamp"),
+        ("source_timestamp", "source, timestamp"),
+    ),
+    "sensors": (
+        ("timestamp", "timestamp"),
+    ),
+}
+
+PARTITION_MODES = ("none", "day", "month")
+
+
+def view_name(table):
+    """Read-side view covering the live table and all of its partitions."""
+    return f"{table}_all"
+
+
+def create_time_indexes(conn, table, target=None):
+    """Creates the time indexes of `table` on `target` (the table itself or one of its partitions)."""
+    target = target or table
+    for suffix, columns in TIME_INDEXES[table]:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{target}_{suffix} ON {target} ({columns})")
+
+
+def list_partitions(conn, table):
+    """Partition table names of `table`, oldest first."""
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+                        (f"{table}_p[0-9]*",)).fetchall()
+    return sorted(r[0] for r in rows)
+
+
+def _columns(conn, table):
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+
+def refresh_views(conn):
+    """
+    (Re)creates `<table>_all` as the live table UNION ALL its partitions.
+    Columns added to the live table after a partition was split off read as NULL there.
+    """
+    for table in PARTITIONED_TABLES:
+        columns = _columns(conn, table)
+        selects = [f"SELECT {', '.join(columns)} FROM {table}"]
+        for partition in list_partitions(conn, table):
+            present = set(_columns(conn, partition))
+            selects.append(f"SELECT {', '.join(c if c in present else f'NULL AS {c}' for c in columns)} FROM {partition}")
+        conn.execute(f"DROP VIEW IF EXISTS {view_name(table)}")
+        conn.execute(f"CREATE VIEW {view_name(table)} AS {' UNION ALL '.join(selects)}")
+
+
+def period_bounds(timestamp, mode):
+    """(suffix, start, end) of the local-time day or month containing `timestamp`."""
+    t = time.localtime(timestamp)
+    if mode == "day":
+        start = time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+        n = time.localtime(start + 36 * 3600)  # Somewhere in the next day, DST-safe
+        end = time.mktime((n.tm_year, n.tm_mon, n.tm_mday, 0, 0, 0, 0, 0, -1))
+        return time.strftime("%Y%m%d", t), start, end
+    start = time.mktime((t.tm_year, t.tm_mon, 1, 0, 0, 0, 0, 0, -1))
+    year, month = (t.tm_year + 1, 1) if t.tm_mon == 12 else (t.tm_year, t.tm_mon + 1)
+    end = time.mktime((year, month, 1, 0, 0, 0, 0, 0, -1))
+    return time.strftime("%Y%m", t), start, end
+
+
+def _create_partition(conn, table, partition):
+    """Clones the live table's definition (without AUTOINCREMENT: rows keep their ids) and indexes."""
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    sql = re.sub(rf"^CREATE TABLE\s+(IF NOT EXISTS\s+)?{table}\b", f"CREATE TABLE IF NOT EXISTS {partition}", sql.strip())
+    conn.execute(sql.replace(" AUTOINCREMENT", ""))
+    create_time_indexes(conn, table, partition)
+
+
+def rotate(conn, mode, now=None, chunk_rows=50000):
+    """
+    Moves rows older than the current period out of each live table into
+    `<table>_p<YYYYMM|YYYYMMDD>` partitions, `chunk_rows` per transaction so
+    writers are only ever blocked briefly. Returns the number of rows moved.
+    """
+    if mode not in ("day", "month"):
+        return 0
+    _, current_start, _ = period_bounds(now or time.time(), mode)
+    moved = 0
+    created = False
+    for table in PARTITIONED_TABLES:
+        columns = ", ".join(_columns(conn, table))
+        while True:
+            oldest = conn.execute(f"SELECT MIN(timestamp) FROM {table} WHERE timestamp < ?", (current_start,)).fetchone()[0]
+            if oldest is None:
+                break
+            suffix, start, end = period_bounds(oldest, mode)
+            partition = f"{table}_p{suffix}"
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if partition not in list_partitions(conn, table):
+                    _create_partition(conn, table, partition)
+                    created = True
+                # Bound the chunk by id so INSERT and DELETE see exactly the same rows
+                bound = conn.execute(
+                    f"SELECT id FROM {table} WHERE timestamp >= ? AND timestamp < ? ORDER BY id LIMIT 1 OFFSET ?",
+                    (start, end, chunk_rows)).fetchone()
+                where = "timestamp >= ? AND timestamp < ?" + (" AND id < ?" if bound else "")
+                params = (start, end, bound[0]) if bound else (start, end)
+                conn.execute(f"INSERT INTO {partition} ({columns}) SELECT {columns} FROM {table} WHERE {where}", params)
+                moved += conn.execute(f"DELETE FROM {table} WHERE {where}", params).rowcount
+                if created:
+                    refresh_views(conn)
+                    created = False
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    if moved:
+        logger.info(f"Moved {moved} rows into {mode} partitions.")
+    return moved
+
+
+def drop_partitions(conn):
+    """Drops every partition table (used by the demo reset). Caller commits."""
+    for table in PARTITIONED_TABLES:
+        for partition in list_partitions(conn, table):
+            conn.execute(f"DROP TABLE {partition}")
+    refresh_views(conn)
+
+
+class PartitionRotator:
+    """Runs `rotate()` on start and then every `interval` seconds in a background thread."""
+    def __init__(self, database, mode, interval=3600.0):
+        self.database = database
+        self.mode = mode
+        self.interval = interval
+        self.thread = None
+        self.last_run = None
+        self.rows_moved = 0
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self._stop.clear()
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            logger.info(f"Partitioning detections/sensors by {self.mode}.")
+
+    def stop(self):
+        self._stop.set()
+        if self.thread:
+            self.thread.join()
+
+    def run_once(self):
+        with self.database.connection() as conn:
+            self.rows_moved += rotate(conn, self.mode)
+        self.last_run = time.time()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Partition rotation failed: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def stats(self):
+        with self.database.connection() as conn:
+            partitions = {table: list_partitions(conn, table) for table in PARTITIONED_TABLES}
+        return {"mode": self.mode, "last_run": self.last_run, "rows_moved": self.rows_moved, "partitions": partitions}
@@ -0,0 +1,151 @@
+import csv
+import glob
+import gzip
+import math
+import os
+import time
+from app.core.partitions import view_name
+
+ROLLUP_TABLE = "detection_rollups"
+BUCKET_SECONDS = 60
+# Every detection is counted at each resolution; long windows are summed from the coarsest buckets that fit
+RESOLUTIONS = (BUCKET_SECONDS, 3600, 86400)
+
+_UPSERT = f"""
+    INSERT INTO {ROLLUP_TABLE} (resolution, bucket, label, source, count, max_confidence, last_seen)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (resolution, bucket, label, source) DO UPDATE SET
+        count = count + excluded.count,
+        max_confidence = MAX(max_confidence, excluded.max_confidence),
+        last_seen = MAX(last_seen, excluded.last_seen)
+"""
+
+
+def bucket_of(timestamp, resolution=BUCKET_SECONDS):
+    return int(timestamp // resolution)
+
+
+def first_full_bucket(since, resolution=BUCKET_SECONDS):
+    """First bucket that starts at or after `since`."""
+    return math.ceil(since / resolution)
+
+
+def create_rollups(conn):
+    """
+    (resolution, bucket, label, source) counts with max confidence and last-seen
+    time, plus the same per hour and per day. An AFTER INSERT trigger on the
+    live detections table keeps them current for every writer, in the
+    writer's own transaction; rows moved into partitions are neither
+    re-counted nor subtracted.
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+            resolution INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            label TEXT NOT NULL,
+            source TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            max_confidence REAL,
+            last_seen REAL,
+            PRIMARY KEY (resolution, bucket, label, source)
+        ) WITHOUT ROWID
+    """)
+    upserts = "".join(f"""
+            INSERT INTO {ROLLUP_TABLE} (resolution, bucket, label, source, count, max_confidence, last_seen)
+            VALUES ({r}, CAST(NEW.timestamp / {r} AS INTEGER), COALESCE(NEW.label, ''),
+                    COALESCE(NEW.source, ''), 1, NEW.confidence, NEW.timestamp)
+            ON CONFLICT (resolution, bucket, label, source) DO UPDATE SET
+                count = count + 1,
+                max_confidence = MAX(max_confidence, excluded.max_confidence),
+                last_seen = MAX(last_seen, excluded.last_seen);""" for r in RESOLUTIONS)
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS detections_rollup AFTER INSERT ON detections BEGIN {upserts} END")
+
+
+def rebuild_from_db(conn):
+    """Replaces all rollups with aggregates of the stored detections (live table and partitions)."""
+    conn.execute(f"DELETE FROM {ROLLUP_TABLE}")
+    for r in RESOLUTIONS:
+        conn.execute(f"""
+            INSERT INTO {ROLLUP_TABLE} (resolution, bucket, label, source, count, max_confidence, last_seen)
+            SELECT {r}, CAST(timestamp / {r} AS INTEGER), COALESCE(label, ''), COALESCE(source, ''),
+                   COUNT(*), MAX(confidence), MAX(timestamp)
+            FROM {view_name('detections')}
+            WHERE timestamp IS NOT NULL
+            GROUP BY 2, 3, 4
+        """)
+    return conn.execute(f"SELECT COUNT(*) FROM {ROLLUP_TABLE} WHERE resolution = ?", (BUCKET_SECONDS,)).fetchone()[0]
+
+
+def csv_log_files(path):
+    """The detections CSV plus its rotated (optionally gzipped) siblings, oldest first."""
+    base, ext = os.path.splitext(path)
+    files = sorted(glob.glob(f"{glob.escape(base)}.*{ext}") + glob.glob(f"{glob.escape(base)}.*{ext}.gz"))
+    return files + ([path] if os.path.exists(path) else [])
+
+
+def _read_csv(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, mode='rt', newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                timestamp = time.mktime(time.strptime(row['Timestamp'], "%Y-%m-%dT%H:%M:%S"))
+                confidence = float(row.get('Confidence') or 0)
+            except (KeyError, ValueError, TypeError):
+                continue
+            # Logs written before the Source column existed came from the webcam
+            yield timestamp, row.get('Disease') or '', row.get('Source') or 'webcam', confidence
+
+
+def add_csv(conn, paths):
+    """
+    Adds CSV-logged detections for minutes the database has nothing for.
+
+    The CSV records every detection while the database may hold fewer (debounced
+    uploads, rows lost to a reset), so a (minute, source) that already has rollup
+    rows is left alone rather than double counted. Returns the number of CSV rows used.
+    """
+    covered = {(b, s) for b, s in conn.execute(
+        f"SELECT DISTINCT bucket, source FROM {ROLLUP_TABLE} WHERE resolution = ?", (BUCKET_SECONDS,))}
+    totals = {}
+    for path in paths:
+        for timestamp, label, source, confidence in _read_csv(path):
+            bucket = bucket_of(timestamp)
+            if (bucket, source) in covered:
+                continue
+            for r in RESOLUTIONS:
+                key = (r, bucket_of(timestamp, r), label, source)
+                count, peak, last = totals.get(key, (0, confidence, timestamp))
+                totals[key] = (count + 1, max(peak, confidence), max(last, timestamp))
+    conn.executemany(_UPSERT, [key + value for key, value in totals.items()])
+    return sum(count for key, (count, _, _) in totals.items() if key[0] == BUCKET_SECONDS)
+
+
+def summarize(conn, since):
+    """
+    Per-label totals of everything from the first minute boundary at or after
+    `since` until now. Returns ({label: [count, max_confidence, last_seen]},
+    edge_end): rows in (since, edge_end) are not covered and must be read raw.
+
+    The window is split coarsest first: whole days from the first day boundary
+    on, whole hours before that, whole minutes before that, so even a season
+    sums at most a few hundred rows. Buckets reaching into the future are safe
+    to use whole as they only contain rows up to now.
+    """
+    totals = {}
+    upper = None  # Start (seconds) of the range already covered by a coarser resolution
+    for r in sorted(RESOLUTIONS, reverse=True):
+        start = first_full_bucket(since, r) * r
+        if start > time.time() or (upper is not None and start >= upper):
+            continue
+        sql = (f"SELECT label, SUM(count), MAX(max_confidence), MAX(last_seen) FROM {ROLLUP_TABLE} "
+               "WHERE resolution = ? AND bucket >= ?")
+        params = [r, start // r]
+        if upper is not None:
+            sql += " AND bucket < ?"
+            params.append(upper // r)
+        for label, count, peak, last in conn.execute(sql + " GROUP BY label", params):
+            current = totals.get(label)
+            totals[label] = [count, peak, last] if current is None else \
+                [current[0] + count, max(current[1], peak), max(current[2], last)]
+        upper = start
+    return totals, (upper if upper is not None else since)
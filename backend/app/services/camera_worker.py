@@ -0,0 +1,286 @@
+import cv2
+import threading
+import time
+import os
+import logging
+from urllib.parse import urlsplit
+from app.core.config import Config
+from app.core.metrics import pipeline_timers
+from app.core.exceptions import InferenceBusyError, InferenceTimeoutError
+from app.services.frame_buffer import FrameRingBuffer
+from app.services.stream_broadcaster import FrameBroadcaster
+from app.services.scene_gate import SceneChangeGate
+from app.services.overlay import draw_detections
+from app.services.tracker import DetectionTracker
+
+logger = logging.getLogger(__name__)
+
+
+def parse_camera_sources(spec):
+    """
+    Parses CAMERA_SOURCES ("id=source,id=source") into an ordered dict.
+    A source that is all digits is a device index; anything else is a URL or file path.
+    """
+    sources = {}
+    for i, item in enumerate(s.strip() for s in spec.split(',')):
+        if not item:
+            continue
+        if '=' in item:
+            camera_id, source = item.split('=', 1)
+        else:
+            camera_id, source = f"cam{i}", item
+        sources[camera_id.strip()] = parse_source(source.strip())
+    return sources
+
+
+def parse_source(source):
+    return int(source) if isinstance(source, str) and source.isdigit() else source
+
+
+def validate_camera_source(source):
+    """
+    Checks a source supplied through the API and returns it parsed: a device
+    index, a URL with an allowed scheme/host (CAMERA_URL_SCHEMES / CAMERA_URL_HOSTS)
+    or a video file resolved inside VIDEO_DIR. Raises ValueError otherwise.
+    """
+    source = parse_source(str(source).strip())
+    if isinstance(source, int):
+        return source
+    if "://" in source:
+        url = urlsplit(source)
+        if url.scheme.lower() not in Config.CAMERA_URL_SCHEMES:
+            raise ValueError(f"URL scheme must be one of: {', '.join(Config.CAMERA_URL_SCHEMES)}")
+        if Config.CAMERA_URL_HOSTS and (url.hostname or '').lower() not in Config.CAMERA_URL_HOSTS:
+            raise ValueError("Camera host is not in CAMERA_URL_HOSTS.")
+        return source
+    video_dir = os.path.realpath(Config.VIDEO_DIR)
+    path = os.path.realpath(os.path.join(video_dir, source))
+    if os.path.commonpath([path, video_dir]) != video_dir:
+        raise ValueError("Video files must be inside VIDEO_DIR.")
+    if not os.path.isfile(path):
+        raise ValueError("Video file not found.")
+    return path
+
+
+class CameraWorker:
+    """
+    Capture + per-camera pipeline for one video source.
+
+    Each worker owns its capture thread, ring buffer, scene gate and MJPEG
+    broadcaster, while inference goes through the VisionService's shared
+    scheduler, so adding a camera costs capture and encode work but never
+    another copy of the model.
+    """
+    def __init__(self, service, camera_id, source, source_tag=None, capture_factory=None):
+        self.service = service
+        self.camera_id = camera_id
+        self.source = source
+        # Anything with the cv2.VideoCapture read/isOpened/get/set/release interface (e.g. benchmark replay)
+        self.capture_factory = capture_factory or cv2.VideoCapture
+        self.source_tag = source_tag or f"camera:{camera_id}"
+        # Recorded files are replayed at their native rate instead of as fast as they decode
+        self.is_file = isinstance(source, str) and "://" not in source and os.path.exists(source)
+
+        self.camera = None
+        self.thread = None
+        self.capture_thread = None
+        self.running = False
+        self.latest_detections_display = ["Initializing..."]
+        self.last_detections = []
+        self.last_frame = None  # Raw frame reference for on-demand snapshots (no copy)
+        self.frame_count = 0
+        self.frames_shed = 0  # Refused by the scheduler in favour of uploads
+        self.fps = 0.0  # Processed frames per second (smoothed)
+        self._last_processed = None
+        self.last_frame_time = None
+        self.error = None
+
+        # Capture -> Inference handoff (newest frame wins)
+        self.frame_buffer = FrameRingBuffer(Config.FRAME_BUFFER_SIZE)
+
+        # Annotated frame -> MJPEG clients (encoded once per frame)
+        self.broadcaster = FrameBroadcaster(Config.STREAM_JPEG_QUALITY)
+
+        # Skip inference while the scene is static
+        self.scene_gate = SceneChangeGate(
+            threshold=Config.SCENE_GATE_THRESHOLD,
+            max_age=Config.SCENE_GATE_MAX_AGE,
+            enabled=Config.SCENE_GATE_ENABLED
+        )
+        
+        # One row per tracked object (start / peak / end) instead of one per frame
+        self.tracker = DetectionTracker(
+            iou_threshold=Config.TRACK_IOU_THRESHOLD,
+            max_age=Config.TRACK_MAX_AGE,
+            min_hits=Config.TRACK_MIN_HITS,
+            peak_margin=Config.TRACK_PEAK_MARGIN
+        ) if Config.TRACKING_ENABLED else None
+
+    def start(self):
+        """Starts the background capture and inference threads if not running."""
+        if self.thread is None or not self.thread.is_alive():
+            self.running = True
+            self.error = None
+            self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self.capture_thread.start()
+            self.thread = threading.Thread(target=self._process_loop, daemon=True)
+            self.thread.start()
+            logger.info(f"Camera '{self.camera_id}' capture and processing threads started.")
+
+    def stop(self):
+        self.running = False
+        self.frame_buffer.wake()
+        if self.capture_thread:
+            self.capture_thread.join()
+        if self.thread:
+            self.thread.join()
+        if self.tracker:
+            # Close out tracks still in view
+            self.service.record_track_events(self.tracker.flush(), self.source_tag)
+        if self.camera:
+            self.camera.release()
+            self.camera = None
+
+    def get_camera(self):
+        if self.camera is None or not self.camera.isOpened():
+            logger.info(f"Opening camera '{self.camera_id}' ({self.source})...")
+            self.camera = self.capture_factory(self.source)
+            time.sleep(0.5)
+        return self.camera
+
+    def _capture_loop(self):
+        """Reads the camera as fast as it delivers and feeds the ring buffer."""
+        self.get_camera() # Ensure camera is open
+        if not self.camera or not self.camera.isOpened():
+             logger.error(f"Camera '{self.camera_id}' could not be opened. Exiting loop.")
+             self.error = "Camera could not be opened."
+             self.running = False
+             self.frame_buffer.wake()
+             return
+
+        frame_interval = 0.0
+        if self.is_file:
+            fps = self.camera.get(cv2.CAP_PROP_FPS) or 25.0
+            frame_interval = 1.0 / fps
+
+        while self.running:
+            started = time.perf_counter()
+            success, frame = self.camera.read()
+            if not success:
+                if self.is_file:
+                    # Loop recorded files
+                    self.camera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                logger.warning(f"Camera '{self.camera_id}' read failed. Retrying...")
+                # Simple retry logic
+                self.camera.release()
+                time.sleep(1)
+                self.camera = self.capture_factory(self.source)
+                continue
+
+            pipeline_timers.observe("capture", (time.perf_counter() - started) * 1000)
+            self.frame_buffer.push(frame)
+            self.last_frame_time = time.time()
+            if frame_interval:
+                time.sleep(frame_interval)
+
+    def _process_loop(self):
+        """Runs inference on the newest buffered frame, dropping older ones."""
+        service = self.service
+        if service.engine is None:
+            service.load_model()
+
+        while self.running:
+            seq, frame = self.frame_buffer.pop_latest(timeout=1.0)
+            if frame is None:
+                continue
+
+            self.frame_count += 1
+            service.frame_count += 1
+            self._update_fps()
+            controller = service.rate_controller
+
+            inferred = False
+            if self.scene_gate.should_infer(frame):
+                # Run Inference
+                started = time.perf_counter()
+                try:
+                    _, detections = service.detect_on_frame(frame, source=self.source_tag, imgsz=controller.imgsz,
+                                                            tracker=self.tracker)
+                    controller.record_inference(time.perf_counter() - started)
+                    self.last_detections = detections
+                    inferred = True
+                except (InferenceBusyError, InferenceTimeoutError):
+                    # Shed in favour of interactive requests; keep showing the last result
+                    self.frames_shed += 1
+            if not inferred:
+                # Static scene or shed frame: reuse the last detections (still in view for the tracker)
+                detections = self.last_detections
+                if self.tracker:
+                    service.record_track_events(self.tracker.update(detections), self.source_tag)
+            self.last_frame = frame
+
+            # Overlay + encode only when a stream client is attached; headless monitoring costs only inference
+            if self.broadcaster.has_subscribers():
+                with pipeline_timers.time("draw"):
+                    annotated = draw_detections(frame, detections)
+                with pipeline_timers.time("encode"):
+                    self.broadcaster.publish(annotated)
+
+            # Update Detections Display
+            current_probs = [f"Detected: {d['label']} ({d['confidence']:.2f})" for d in detections]
+            if not current_probs:
+                current_probs = ["Monitoring..."]
+            self.latest_detections_display = current_probs
+
+            # Back off to stay inside the FPS / CPU / HTTP latency budget (0 when unconstrained)
+            delay = controller.next_delay()
+            if delay > 0:
+                time.sleep(delay)
+
+    def _update_fps(self):
+        now = time.perf_counter()
+        if self._last_processed is not None and now > self._last_processed:
+            instant = 1.0 / (now - self._last_processed)
+            self.fps = instant if not self.fps else 0.9 * self.fps + 0.1 * instant
+        self._last_processed = now
+
+    def stream(self):
+        """Generator for this camera's MJPEG stream."""
+        # Ensure processing is running
+        self.start()
+        return self.broadcaster.stream()
+
+    def snapshot(self, wait=3.0):
+        """Annotated JPEG of the latest frame, drawn on demand."""
+        self.start()
+        deadline = time.time() + wait
+        while self.last_frame is None and self.running and time.time() < deadline:
+            time.sleep(0.05)
+        frame, detections = self.last_frame, self.last_detections
+        if frame is None:
+            return None
+        with pipeline_timers.time("draw"):
+            annotated = draw_detections(frame, detections)
+        with pipeline_timers.time("encode"):
+            flag, encoded_image = cv2.imencode(".jpg", annotated, self.broadcaster.encode_params)
+        return encoded_image.tobytes() if flag else None
+
+    def status(self):
+        stats = self.frame_buffer.stats()
+        stats.update({
+            "id": self.camera_id,
+            "source": str(self.source),
+            "source_tag": self.source_tag,
+            "running": self.running,
+            "error": self.error,
+            "frames_processed": self.frame_count,
+            "frames_shed": self.frames_shed,
+            "fps": round(self.fps, 2),
+            "last_frame_time": self.last_frame_time,
+            "detections": self.latest_detections_display,
+            "stream": self.broadcaster.stats(),
+            "scene_gate": self.scene_gate.stats(),
+            "tracker": self.tracker.stats() if self.tracker else None
+        })
+        return stats
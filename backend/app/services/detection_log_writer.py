@@ -0,0 +1,187 @@
+import csv
+import gzip
+import os
+import queue
+import shutil
+import threading
+import time
+import logging
+from app.core.metrics import Histogram, STAGE_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionLogWriter:
+    """
+    Queue-fed background writer for the detections CSV.
+
+    Callers only enqueue rows (never touching the filesystem); a writer thread
+    batches them and flushes when `batch_size` rows are pending or
+    `flush_interval` seconds have passed. The file is rotated when it exceeds
+    `max_bytes` or the day changes, and rotated files are gzip-compressed.
+    An existing file with a different header (older column layout) is rotated
+    away before the first write instead of being appended to.
+
+    Under backpressure rows are sampled once the queue is past
+    `sample_watermark` (only every `sample_every`-th row is kept) and dropped
+    when it is full; both are counted.
+    """
+    def __init__(self, path, header, max_queue=10000, batch_size=200, flush_interval=1.0,
+                 max_bytes=10 * 1024 * 1024, rotate_daily=True, sample_watermark=0.8, sample_every=4):
+        self.path = path
+        self.header = header
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.sample_threshold = int(max_queue * sample_watermark)
+        self.sample_every = max(1, sample_every)
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.file = None
+        self.writer = None
+        self.current_day = None
+        self.thread = None
+        self._start_lock = threading.Lock()
+
+        self.accepted = 0
+        self.written = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._sample_counter = 0
+        self.flush_ms = Histogram(STAGE_BUCKETS_MS)  # Disk time per flushed batch
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def start(self):
+        with self._start_lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def write(self, row):
+        """Enqueue one row without blocking. Returns False if it was sampled out or dropped."""
+        self.start()
+        if self.queue.qsize() >= self.sample_threshold:
+            self._sample_counter += 1
+            if self._sample_counter % self.sample_every:
+                self.sampled_out += 1
+                return False
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush everything still queued and stop the writer thread."""
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+        self._close_file()
+
+    def _run(self):
+        pending = []
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                row = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                row = ()
+            if row is None:
+                self._flush(pending)
+                return
+            if row:
+                pending.append(row)
+
+            if len(pending) >= self.batch_size or (pending and time.monotonic() - last_flush >= self.flush_interval):
+                self._flush(pending)
+                pending = []
+                last_flush = time.monotonic()
+            elif not pending:
+                last_flush = time.monotonic()
+
+    def _flush(self, rows):
+        if not rows:
+            return
+        started = time.perf_counter()
+        try:
+            self._maybe_rotate()
+            self._open_file()
+            self.writer.writerows(rows)
+            self.file.flush()
+            self.written += len(rows)
+            self.flush_ms.observe((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            self.dropped += len(rows)
+            logger.error(f"Detection CSV write failed: {e}")
+
+    def _open_file(self):
+        if self.file is not None:
+            return
+        is_new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self.file = open(self.path, mode='a', newline='')
+        self.writer = csv.writer(self.file)
+        if is_new:
+            self.writer.writerow(self.header)
+        self.current_day = time.strftime("%Y-%m-%d")
+
+    def _close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def _maybe_rotate(self):
+        if not os.path.exists(self.path):
+            return
+        today = time.strftime("%Y-%m-%d")
+        file_day = self.current_day or time.strftime("%Y-%m-%d", time.localtime(os.path.getmtime(self.path)))
+        too_big = self.max_bytes and os.path.getsize(self.path) >= self.max_bytes
+        new_day = self.rotate_daily and file_day != today
+        # Only checked before the file is opened: afterwards it holds our own header
+        old_layout = self.file is None and not self._header_matches()
+        if too_big or new_day or old_layout:
+            self._rotate(file_day)
+
+    def _header_matches(self):
+        """True if the existing file is empty or starts with this writer's header."""
+        try:
+            with open(self.path, newline='') as f:
+                first = next(csv.reader(f), None)
+        except (OSError, csv.Error, UnicodeDecodeError):
+            return False
+        return first is None or first == list(self.header)
+
+    def _rotate(self, day):
+        self._close_file()
+        base, ext = os.path.splitext(self.path)
+        stamp = f"{base}.{day}.{time.strftime('%H%M%S')}"
+        rotated, n = f"{stamp}{ext}", 1
+        while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+            rotated, n = f"{stamp}-{n}{ext}", n + 1
+        os.replace(self.path, rotated)
+        try:
+            with open(rotated, 'rb') as src, gzip.open(rotated + ".gz", 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(rotated)
+        except Exception as e:
+            logger.warning(f"Compressing rotated log {rotated} failed: {e}")
+        self.rotations += 1
+        logger.info(f"Rotated detections CSV to {rotated}.gz")
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "queue_depth": self.queue.qsize(),
+            "accepted": self.accepted,
+            "written": self.written,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+            "rotations": self.rotations,
+            "flush_ms": self.flush_ms.snapshot()
+        }
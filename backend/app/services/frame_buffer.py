@@ -0,0 +1,64 @@
+import threading
+from collections import deque
+
+
+class FrameRingBuffer:
+    """
+    Small fixed-size buffer between the capture thread and the inference stage.
+
+    The capture side pushes every frame it reads; when the buffer is full the
+    oldest frame falls off. The inference side always takes the NEWEST frame and
+    discards anything older, so a slow model never works on stale frames and
+    never blocks the camera.
+    """
+    def __init__(self, size=2):
+        self.frames = deque(maxlen=max(1, size))
+        self.condition = threading.Condition()
+        self.seq = 0
+
+        # Per-stage counters
+        self.captured = 0
+        self.dropped = 0
+        self.inferred = 0
+
+    def push(self, frame):
+        """Store a freshly captured frame, overwriting the oldest one if full."""
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append((self.seq, frame))
+            self.seq += 1
+            self.captured += 1
+            self.condition.notify()
+
+    def pop_latest(self, timeout=None):
+        """
+        Wait for a frame and return (seq, frame) for the newest one.
+        Older buffered frames are dropped. Returns (None, None) on timeout.
+        """
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            if not self.frames:
+                return None, None
+            seq, frame = self.frames.pop()
+            self.dropped += len(self.frames)
+            self.frames.clear()
+            self.inferred += 1
+            return seq, frame
+
+    def wake(self):
+        """Release any consumer waiting in pop_latest (used on shutdown)."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            captured = self.captured
+            return {
+                "captured": captured,
+                "dropped": self.dropped,
+                "inferred": self.inferred,
+                "buffered": len(self.frames),
+                "drop_rate": round(self.dropped / captured, 4) if captured else 0.0
+            }
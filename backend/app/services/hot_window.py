@@ -0,0 +1,150 @@
+import math
+import threading
+import time
+from collections import deque
+from app.core.rollups import BUCKET_SECONDS
+
+
+class HotWindow:
+    """
+    Write-through in-memory copy of the most recent detection / sensor rows
+    written by this process, bounded by `max_rows` per table and `max_age`
+    seconds.
+
+    Rows are added as soon as they are accepted (before the write-behind
+    commit), so reads served from here need neither the database nor the
+    pending-row merge. Each table keeps its rows twice:
+
+      by id     - ordered by id for latest-row reads; every row with
+                  id > after_id is held
+      by minute - per-minute row lists, with running per-label totals (like
+                  the database rollups) for tables that have a label; every
+                  row with timestamp > since is held
+
+    `since` starts at process start and moves up as minutes are evicted.
+    Reads outside what is held return None and the caller falls back to the
+    database. Rows written by other processes are not seen; `reset()` empties
+    a table's window and restarts its coverage at the current time.
+    """
+    def __init__(self, tables, max_rows=5000, max_age=900.0):
+        self.tables = tables
+        self.max_rows = max(1, max_rows)
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.minutes = {}  # table -> {bucket: ({label: [count, max_confidence, last_seen]}, rows)}
+        self.minute_rows = {}
+        self.since = {}
+        self.after_id = {}
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self, tables=None, after_id=0):
+        """Empties the window; only rows added later (with ids above `after_id`) are served."""
+        now = time.time()
+        with self.lock:
+            for table in tables or self.tables:
+                self.rows[table] = deque()
+                self.minutes[table] = {}
+                self.minute_rows[table] = 0
+                self.since[table] = now
+                self.after_id[table] = after_id
+
+    def add(self, table, ids, rows):
+        """Adds rows (column values without the id) under their assigned ids."""
+        columns = self.tables[table]
+        labelled = 'label' in columns
+        with self.lock:
+            target = self.rows[table]
+            minutes = self.minutes[table]
+            for row_id, values in zip(ids, rows):
+                row = dict(zip(columns, (row_id,) + tuple(values)))
+                if not target or row_id > target[-1]['id']:
+                    target.append(row)
+                else:
+                    # Another thread's rows got in first; keep the window ordered by id
+                    position = len(target) - 1
+                    while position > 0 and target[position - 1]['id'] > row_id:
+                        position -= 1
+                    target.insert(position, row)
+
+                totals, bucket_rows = minutes.setdefault(int(row['timestamp'] // BUCKET_SECONDS), ({}, []))
+                bucket_rows.append(row)
+                if labelled:
+                    current = totals.get(row['label'])
+                    if current is None:
+                        totals[row['label']] = [1, row['confidence'], row['timestamp']]
+                    else:
+                        current[0] += 1
+                        current[1] = max(current[1], row['confidence'])
+                        current[2] = max(current[2], row['timestamp'])
+            self.minute_rows[table] += len(ids)
+            self._trim(table, time.time())
+
+    def _trim(self, table, now):
+        """Evicts rows and minutes past the size or age bound, oldest first. Caller holds the lock."""
+        target = self.rows[table]
+        oldest = now - self.max_age
+        while target and (len(target) > self.max_rows or target[0]['timestamp'] < oldest):
+            self.after_id[table] = max(self.after_id[table], target.popleft()['id'])
+
+        minutes = self.minutes[table]
+        while minutes:
+            bucket = min(minutes)
+            end = (bucket + 1) * BUCKET_SECONDS
+            if self.minute_rows[table] <= self.max_rows and end > oldest:
+                break
+            self.minute_rows[table] -= len(minutes.pop(bucket)[1])
+            self.since[table] = max(self.since[table], end)
+
+    def latest(self, table, limit):
+        """The `limit` rows with the highest ids, newest first, or None if not all are held."""
+        with self.lock:
+            self._trim(table, time.time())
+            target = self.rows[table]
+            # Ordered by id, so the newest are at the end; all of them are above after_id once any is evicted
+            if limit < 0 or len(target) < limit or (limit and target[-limit]['id'] <= self.after_id[table]):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [dict(target[-i]) for i in range(1, limit + 1)]
+
+    def totals_since(self, table, cutoff):
+        """
+        {label: [count, max_confidence, last_seen]} of the rows with timestamp >
+        cutoff (whole minutes counted like the database rollups), or None if
+        some of them may not be held.
+        """
+        with self.lock:
+            self._trim(table, time.time())
+            if cutoff < self.since[table]:
+                self.misses += 1
+                return None
+            self.hits += 1
+            first_full = math.ceil(cutoff / BUCKET_SECONDS)
+            totals = {}
+            for bucket, (bucket_totals, bucket_rows) in self.minutes[table].items():
+                if bucket >= first_full:
+                    items = bucket_totals.items()
+                elif bucket == first_full - 1:
+                    items = [(r['label'], (1, r['confidence'], r['timestamp']))
+                             for r in bucket_rows if r['timestamp'] > cutoff]
+                else:
+                    continue
+                for label, (count, peak, last) in items:
+                    current = totals.get(label)
+                    totals[label] = [count, peak, last] if current is None else \
+                        [current[0] + count, max(current[1], peak), max(current[2], last)]
+            return totals
+
+    def stats(self):
+        with self.lock:
+            return {
+                "max_rows": self.max_rows,
+                "max_age": self.max_age,
+                "rows": {table: len(rows) for table, rows in self.rows.items()},
+                "since": dict(self.since),
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -0,0 +1,346 @@
+import ast
+import time
+import logging
+import cv2
+import numpy as np
+from app.services.overlay import draw_detections
+
+logger = logging.getLogger(__name__)
+
+
+class EngineResult:
+    """
+    Engine-independent result for one frame.
+
+    `detections` is a list of dicts with the RAW model label:
+        {"label": str, "confidence": float, "box": [x1, y1, x2, y2] or None}
+
+    `timings` holds this frame's share of the preprocess / predict /
+    postprocess time in milliseconds, when the backend can measure it.
+    """
+    def __init__(self, frame, detections, native=None, timings=None):
+        self.frame = frame
+        self.detections = detections
+        self.native = native  # Backend-specific result object, if any
+        self.timings = timings or {}
+
+    def plot(self):
+        """Annotated copy of the source frame, drawn from the detection list."""
+        return draw_detections(self.frame, self.detections)
+
+
+class InferenceEngine:
+    """
+    Base class for model backends. Subclasses load a model once and turn a
+    list of BGR frames into a list of EngineResult objects.
+    """
+    name = "base"
+
+    def __init__(self, model_path, conf=0.5, iou=0.45, imgsz=640):
+        self.model_path = model_path
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.names = {}
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict(self, frames, imgsz=None):
+        """`imgsz` optionally overrides the input size where the backend supports it."""
+        raise NotImplementedError
+
+    def close(self):
+        """Release model memory."""
+        pass
+
+
+class TorchEngine(InferenceEngine):
+    """Ultralytics / PyTorch backend (the original behaviour)."""
+    name = "torch"
+
+    def load(self):
+        from ultralytics import YOLO
+        logger.info(f"Loading YOLO model from {self.model_path}...")
+        self.model = YOLO(self.model_path)
+        self.names = self.model.names
+        return self
+
+    def predict(self, frames, imgsz=None):
+        kwargs = {"imgsz": imgsz} if imgsz else {}
+        results = self.model.predict(frames, verbose=False, conf=self.conf, iou=self.iou, **kwargs)
+        return [self._convert(frame, r) for frame, r in zip(frames, results)]
+
+    @staticmethod
+    def _timings(result):
+        # Ultralytics reports per-image stage times (ms) in result.speed
+        speed = getattr(result, 'speed', None) or {}
+        return {
+            stage: speed[key]
+            for stage, key in (("preprocess", "preprocess"), ("predict", "inference"), ("postprocess", "postprocess"))
+            if speed.get(key) is not None
+        }
+
+    def _convert(self, frame, result):
+        detections = []
+
+        if hasattr(result, 'boxes') and result.boxes is not None:
+            for box in result.boxes:
+                cls_id = int(box.cls[0])
+                detections.append({
+                    "label": result.names[cls_id],
+                    "confidence": float(box.conf[0]),
+                    "box": [float(v) for v in box.xyxy[0].tolist()]
+                })
+
+        if hasattr(result, 'probs') and result.probs is not None:
+            try:
+                top1_index = result.probs.top1
+                top1_conf = float(result.probs.top1conf)
+                if top1_conf > self.conf:
+                    detections.append({
+                        "label": result.names[top1_index],
+                        "confidence": top1_conf,
+                        "box": None
+                    })
+            except Exception:
+                pass
+
+        return EngineResult(frame, detections, native=result, timings=self._timings(result))
+
+    def close(self):
+        self.model = None
+
+
+class OnnxEngine(InferenceEngine):
+    """
+    ONNX Runtime CPU backend for Ultralytics-exported models.
+    Does its own letterbox pre-processing and NMS post-processing so that
+    PyTorch does not need to be loaded at all.
+    """
+    name = "onnx"
+
+    def __init__(self, model_path, conf=0.5, iou=0.45, imgsz=640, threads=0):
+        super().__init__(model_path, conf, iou, imgsz)
+        self.threads = threads
+        self.session = None
+
+    def load(self):
+        import onnxruntime as ort
+        logger.info(f"Loading ONNX model from {self.model_path}...")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, width = model_input.shape
+        # Dynamic axes come back as strings/None; fall back to the configured size
+        self.input_hw = (
+            height if isinstance(height, int) else self.imgsz,
+            width if isinstance(width, int) else self.imgsz
+        )
+        self.dynamic_batch = not isinstance(batch, int)
+
+        # Ultralytics stores the class names as a dict literal in the metadata
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        try:
+            self.names = ast.literal_eval(metadata.get('names', '{}'))
+        except (ValueError, SyntaxError):
+            self.names = {}
+        return self
+
+    def letterbox(self, frame):
+        """Resize keeping aspect ratio and pad to the model input size."""
+        h, w = frame.shape[:2]
+        new_h, new_w = self.input_hw
+        ratio = min(new_h / h, new_w / w)
+        resized_w, resized_h = int(round(w * ratio)), int(round(h * ratio))
+        pad_w, pad_h = (new_w - resized_w) / 2, (new_h - resized_h) / 2
+
+        if (w, h) != (resized_w, resized_h):
+            frame = cv2.resize(frame, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+        top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+        left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+        frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+        return frame, ratio, (left, top)
+
+    def _preprocess(self, frame):
+        padded, ratio, pad = self.letterbox(frame)
+        blob = cv2.dnn.blobFromImage(padded, 1 / 255.0, swapRB=True)
+        return blob, ratio, pad
+
+    def predict(self, frames, imgsz=None):
+        # Exported graphs have a fixed input size, so `imgsz` is ignored here
+        started = time.perf_counter()
+        prepared = [self._preprocess(f) for f in frames]
+        preprocessed = time.perf_counter()
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: np.concatenate([p[0] for p in prepared])})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: p[0]})[0] for p in prepared])
+        predicted = time.perf_counter()
+
+        # Batch-level stage times are split evenly across the frames of the batch
+        share = 1000.0 / len(frames)
+        results = []
+        for frame, (_, ratio, pad), output in zip(frames, prepared, outputs):
+            post_started = time.perf_counter()
+            if output.ndim == 1:
+                detections = self._postprocess_cls(output)
+            else:
+                detections = self._postprocess_det(output, ratio, pad, frame.shape)
+            results.append(EngineResult(frame, detections, timings={
+                "preprocess": (preprocessed - started) * share,
+                "predict": (predicted - preprocessed) * share,
+                "postprocess": (time.perf_counter() - post_started) * 1000
+            }))
+        return results
+
+    def _label(self, cls_id):
+        return self.names.get(cls_id, str(cls_id))
+
+    def _postprocess_cls(self, probs):
+        top1 = int(np.argmax(probs))
+        conf = float(probs[top1])
+        if conf > self.conf:
+            return [{"label": self._label(top1), "confidence": conf, "box": None}]
+        return []
+
+    def _postprocess_det(self, output, ratio, pad, shape):
+        # YOLOv8 head: (4 + num_classes, num_anchors) -> (num_anchors, 4 + num_classes)
+        preds = output.T
+        scores = preds[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > self.conf
+        if not keep.any():
+            return []
+
+        preds, class_ids, confidences = preds[keep], class_ids[keep], confidences[keep]
+        cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        boxes = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+        # Undo letterbox
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - pad[0]) / ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - pad[1]) / ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, shape[1])
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, shape[0])
+
+        keep = non_max_suppression(boxes, confidences, class_ids, self.iou)
+        return [
+            {
+                "label": self._label(int(class_ids[i])),
+                "confidence": float(confidences[i]),
+                "box": [float(v) for v in boxes[i]]
+            }
+            for i in keep
+        ]
+
+    def close(self):
+        self.session = None
+
+
+class StubEngine(InferenceEngine):
+    """
+    Model-free engine for benchmarks and CI. Each batch costs a resize to the
+    input size plus `latency_ms` of sleep, and every frame gets one
+    deterministic detection derived from its content.
+    """
+    name = "stub"
+    LABELS = ("Tomato Early blight leaf", "Tomato healthy leaf", "Tomato Septoria leaf spot", "Aphids")
+
+    def __init__(self, model_path="stub", conf=0.5, iou=0.45, imgsz=640, latency_ms=5.0):
+        super().__init__(model_path, conf, iou, imgsz)
+        self.latency_ms = latency_ms
+
+    def load(self):
+        self.names = dict(enumerate(self.LABELS))
+        return self
+
+    def predict(self, frames, imgsz=None):
+        size = imgsz or self.imgsz
+        started = time.perf_counter()
+        small = [cv2.resize(f, (size, size), interpolation=cv2.INTER_AREA) for f in frames]
+        preprocessed = time.perf_counter()
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        predicted = time.perf_counter()
+
+        share = 1000.0 / len(frames)
+        results = []
+        for frame, resized in zip(frames, small):
+            h, w = frame.shape[:2]
+            mean = float(resized.mean())
+            detection = {
+                "label": self.LABELS[int(mean) % len(self.LABELS)],
+                "confidence": 0.5 + (mean % 50) / 100.0,
+                "box": [w * 0.25, h * 0.25, w * 0.75, h * 0.75]
+            }
+            results.append(EngineResult(frame, [detection], timings={
+                "preprocess": (preprocessed - started) * share,
+                "predict": (predicted - preprocessed) * share,
+                "postprocess": 0.0
+            }))
+        return results
+
+
+def non_max_suppression(boxes, scores, class_ids, iou_threshold=0.45):
+    """
+    Class-aware greedy NMS over xyxy boxes. Returns kept indices, highest score first.
+    Boxes of different classes never suppress each other.
+    """
+    if len(boxes) == 0:
+        return []
+
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    # Shift each class into its own coordinate range so one pass handles all classes
+    offsets = np.asarray(class_ids, dtype=np.float32)[:, None] * (boxes.max() + 1)
+    shifted = boxes + offsets
+
+    x1, y1, x2, y2 = shifted[:, 0], shifted[:, 1], shifted[:, 2], shifted[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_threshold]
+    return keep
+
+
+ENGINES = {
+    TorchEngine.name: TorchEngine,
+    OnnxEngine.name: OnnxEngine,
+    StubEngine.name: StubEngine,
+}
+
+
+def create_engine(name, model_path=None):
+    """Builds (but does not load) the engine selected in Config."""
+    from app.core.config import Config
+
+    name = (name or "torch").lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown inference engine '{name}'. Choose from: {', '.join(ENGINES)}")
+
+    if name == StubEngine.name:
+        return StubEngine(model_path or "stub", Config.MODEL_CONFIDENCE, Config.MODEL_IOU,
+                          Config.MODEL_IMGSZ, Config.STUB_LATENCY_MS)
+    if name == OnnxEngine.name:
+        return OnnxEngine(model_path or Config.ONNX_MODEL_PATH, Config.MODEL_CONFIDENCE,
+                          Config.MODEL_IOU, Config.MODEL_IMGSZ, Config.ONNX_THREADS)
+    return TorchEngine(model_path or Config.MODEL_PATH, Config.MODEL_CONFIDENCE,
+                       Config.MODEL_IOU, Config.MODEL_IMGSZ)
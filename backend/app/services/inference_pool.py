@@ -0,0 +1,181 @@
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from app.services.inference_engines import EngineResult, InferenceEngine, create_engine
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(engine_name, model_path, shm_name, conn):
+    """Entry point of a pool process: load the model once, then serve frames from shared memory."""
+    try:
+        engine = create_engine(engine_name, model_path).load()
+    except Exception as e:
+        conn.send(("error", f"Model load failed: {e}"))
+        return
+
+    # Spawned workers share the parent's resource tracker, so attaching here does not
+    # take ownership: the parent alone unlinks the blocks
+    shm = shared_memory.SharedMemory(name=shm_name)
+    conn.send(("ready", engine.names))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if msg is None:
+            break
+
+        if msg[0] == "resize":
+            shm.close()
+            shm = shared_memory.SharedMemory(name=msg[1])
+            continue
+
+        _, shape, dtype, imgsz = msg
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        try:
+            result = engine.predict([frame], imgsz=imgsz)[0]
+            conn.send(("ok", (result.detections, result.timings)))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        finally:
+            # Views into shm.buf must be gone before the block can be closed/resized
+            del frame
+
+    shm.close()
+    engine.close()
+
+
+class _PoolWorker:
+    def __init__(self, ctx, engine_name, model_path, capacity):
+        self.shm = shared_memory.SharedMemory(create=True, size=capacity)
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(engine_name, model_path, self.shm.name, child_conn),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def ensure_capacity(self, nbytes):
+        """Grow the shared input block (and tell the worker) when a larger frame arrives."""
+        if nbytes <= self.shm.size:
+            return
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.conn.send(("resize", self.shm.name))
+        old.close()
+        old.unlink()
+
+    def send_frame(self, frame, imgsz):
+        self.ensure_capacity(frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.shm.buf)[...] = frame
+        self.conn.send(("frame", frame.shape, frame.dtype.str, imgsz))
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ProcessPoolEngine(InferenceEngine):
+    """
+    Runs another engine in N worker processes, each loading the model once.
+
+    Input frames are copied into a per-worker `multiprocessing.shared_memory`
+    block (one memcpy, no pickling); only the small detection list travels back
+    over the pipe, and overlays are drawn in the web process from that list.
+    A batch from the scheduler is fanned out across the workers, so model,
+    pre- and post-processing run outside the Flask process's GIL. A worker
+    process that died is replaced before the next batch.
+    """
+    name = "process_pool"
+
+    def __init__(self, engine_name, model_path=None, workers=2, frame_capacity=1920 * 1080 * 3):
+        # Resolve the concrete model path up front (the workers receive the same one)
+        super().__init__(model_path or create_engine(engine_name).model_path)
+        self.engine_name = engine_name
+        self.workers_count = max(1, int(workers))
+        self.frame_capacity = frame_capacity
+        self.workers = []
+        self.restarts = 0
+        self.ctx = mp.get_context("spawn")  # Never fork a process that already runs threads
+
+    def _start_worker(self):
+        return _PoolWorker(self.ctx, self.engine_name, self.model_path, self.frame_capacity)
+
+    def _await_ready(self, worker):
+        try:
+            status, payload = worker.conn.recv()
+        except EOFError:
+            status, payload = "error", "worker process exited during start-up"
+        if status != "ready":
+            raise RuntimeError(payload)
+        self.names = payload
+
+    def load(self):
+        self.workers = [self._start_worker() for _ in range(self.workers_count)]
+        try:
+            for worker in self.workers:
+                self._await_ready(worker)
+        except RuntimeError:
+            self.close()
+            raise
+        logger.info(f"Inference pool ready: {self.workers_count} x '{self.engine_name}' worker processes.")
+        return self
+
+    def _replace_dead_workers(self):
+        for i, worker in enumerate(self.workers):
+            if worker.process.is_alive():
+                continue
+            logger.warning(f"Inference worker process {worker.process.pid} exited "
+                           f"(code {worker.process.exitcode}); starting a replacement.")
+            worker.close()
+            replacement = self._start_worker()
+            try:
+                self._await_ready(replacement)
+            except RuntimeError:
+                replacement.close()
+                raise
+            self.workers[i] = replacement
+            self.restarts += 1
+
+    def predict(self, frames, imgsz=None):
+        self._replace_dead_workers()
+        results = [None] * len(frames)
+        # Dispatch in waves of one frame per worker, then collect
+        for offset in range(0, len(frames), len(self.workers)):
+            wave = list(enumerate(frames[offset:offset + len(self.workers)], start=offset))
+            for (index, frame), worker in zip(wave, self.workers):
+                worker.send_frame(np.ascontiguousarray(frame), imgsz)
+            # Drain every reply of the wave before raising so the pipes stay in sync
+            errors = []
+            for (index, frame), worker in zip(wave, self.workers):
+                try:
+                    status, payload = worker.conn.recv()
+                except EOFError:
+                    status, payload = "error", "worker process exited"
+                if status == "ok":
+                    detections, timings = payload
+                    results[index] = EngineResult(frame, detections, timings=timings)
+                else:
+                    errors.append(payload)
+            if errors:
+                self._replace_dead_workers()
+                raise RuntimeError(f"Inference worker failed: {errors[0]}")
+        return results
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+        self.workers = []
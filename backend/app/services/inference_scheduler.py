@@ -0,0 +1,302 @@
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future
+from app.core.metrics import Histogram
+from app.core.exceptions import InferenceBusyError, InferenceTimeoutError
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+# Priority classes, highest first
+INTERACTIVE = "interactive"  # A person is waiting (uploads)
+LIVE = "live"                # Camera monitoring loops
+BACKGROUND = "background"    # Re-analysis / batch jobs
+PRIORITIES = (INTERACTIVE, LIVE, BACKGROUND)
+
+# Interactive traffic older than this no longer counts towards pressure
+PRESSURE_WINDOW_S = 10.0
+
+
+class PriorityClass:
+    """
+    Admission settings and state for one priority class.
+
+    `max_outstanding` bounds queued + running frames. When full, a class with
+    `shed_when_full` rejects at once (live frames: a newer one is coming);
+    otherwise the caller waits for a slot until its deadline.
+    `deadline_ms` (0 = none) drops frames that waited too long in the queue.
+    """
+    def __init__(self, name, max_outstanding, deadline_ms=0, shed_when_full=False):
+        self.name = name
+        self.max_outstanding = max(1, int(max_outstanding))
+        self.deadline_ms = float(deadline_ms)
+        self.shed_when_full = shed_when_full
+
+        self.queue = deque()
+        self.outstanding = 0
+
+        self.admitted = 0
+        self.shed = 0
+        self.expired = 0
+        self.degraded = 0
+        self.queue_latency_ms = Histogram()
+        self.total_latency_ms = Histogram()
+
+    def stats(self):
+        return {
+            "queue_depth": len(self.queue),
+            "outstanding": self.outstanding,
+            "max_outstanding": self.max_outstanding,
+            "deadline_ms": self.deadline_ms,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "expired": self.expired,
+            "degraded": self.degraded,
+            "queue_latency_ms": self.queue_latency_ms.snapshot(),
+            "total_latency_ms": self.total_latency_ms.snapshot()
+        }
+
+
+class InferenceScheduler:
+    """
+    Micro-batching, priority-aware front door to the model.
+
+    Callers (upload handlers, the live loop, background jobs) submit single
+    frames with a priority class and get a Future back. A single worker thread
+    always serves the highest non-empty class: it collects that class's
+    pending frames for up to `max_wait_ms`, runs them through `predict_fn` as
+    one batch and resolves each caller's future with its own result. This
+    also serializes access to the model object, which is not safe to share
+    between threads.
+
+    Frames submitted with different `imgsz` values are never mixed in one
+    batch, and classes are never mixed either, so an upload never waits for a
+    batch of camera frames it did not need.
+
+    When the recent interactive p99 exceeds `interactive_p99_target_ms`, live
+    frames are shed while uploads are in flight and the rest are degraded to
+    `degrade_imgsz`, so camera load gives way before upload latency grows.
+    """
+    def __init__(self, predict_fn, max_batch=4, max_wait_ms=5.0, classes=None,
+                 interactive_p99_target_ms=0, degrade_imgsz=None):
+        self.predict_fn = predict_fn
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.classes = {c.name: c for c in (classes or [
+            PriorityClass(INTERACTIVE, 64),
+            PriorityClass(LIVE, 4, deadline_ms=500, shed_when_full=True),
+            PriorityClass(BACKGROUND, 16),
+        ])}
+        self.interactive_p99_target_ms = interactive_p99_target_ms
+        self.degrade_imgsz = degrade_imgsz
+
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+
+        # Recent interactive latencies for the pressure check
+        self.recent_interactive = deque(maxlen=200)
+        self.last_interactive = 0.0
+        self.pressure = False
+
+        # Metrics (all classes)
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_latency_ms = Histogram()
+        self.batch_latency_ms = Histogram()
+        self.total_latency_ms = Histogram()
+
+    def start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.running = True
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+                logger.info(f"Inference scheduler started (max_batch={self.max_batch}, max_wait={self.max_wait * 1000:.1f}ms).")
+
+    def stop(self):
+        """Stops the batching thread; frames still queued fail with InferenceBusyError."""
+        pending = []
+        with self.condition:
+            self.running = False
+            for cls in self.classes.values():
+                pending.extend(item[1] for item in cls.queue)
+                cls.outstanding -= len(cls.queue)
+                cls.queue.clear()
+            self.condition.notify_all()
+        for future in pending:
+            future.set_exception(InferenceBusyError("Inference scheduler stopped."))
+        if self.thread:
+            self.thread.join()
+
+    def under_pressure(self):
+        return self.pressure and time.perf_counter() - self.last_interactive < PRESSURE_WINDOW_S
+
+    def submit(self, frame, imgsz=None, priority=LIVE, deadline_ms=None):
+        """
+        Queue a frame for inference. Returns a Future resolving to its result,
+        or failing with InferenceBusyError (shed) / InferenceTimeoutError (deadline).
+        """
+        cls = self.classes[priority]
+        future = Future()
+        self.start()
+
+        enqueued = time.perf_counter()
+        deadline_ms = cls.deadline_ms if deadline_ms is None else deadline_ms
+        deadline = enqueued + deadline_ms / 1000.0 if deadline_ms else None
+
+        with self.condition:
+            if priority == LIVE and self.under_pressure():
+                # Uploads are slow: give them the model, and make the frames we do run cheaper
+                if self.classes[INTERACTIVE].outstanding:
+                    cls.shed += 1
+                    future.set_exception(InferenceBusyError("Live frame shed while uploads are waiting."))
+                    return future
+                if self.degrade_imgsz:
+                    imgsz = self.degrade_imgsz
+                    cls.degraded += 1
+
+            while cls.outstanding >= cls.max_outstanding:
+                remaining = deadline - time.perf_counter() if deadline else None
+                if cls.shed_when_full or (remaining is not None and remaining <= 0):
+                    cls.shed += 1
+                    future.set_exception(InferenceBusyError(f"Too many pending '{priority}' inference requests."))
+                    return future
+                self.condition.wait(remaining)
+
+            cls.outstanding += 1
+            cls.admitted += 1
+            cls.queue.append((frame, future, enqueued, imgsz, deadline))
+            self.condition.notify_all()
+        return future
+
+    def predict(self, frame, timeout=None, imgsz=None, priority=LIVE):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(frame, imgsz=imgsz, priority=priority).result(timeout)
+
+    def _expire(self, now):
+        """Fails queued frames whose deadline has passed. Caller holds the condition."""
+        for cls in self.classes.values():
+            if not any(item[4] is not None and item[4] <= now for item in cls.queue):
+                continue
+            kept = deque()
+            for item in cls.queue:
+                if item[4] is not None and item[4] <= now:
+                    cls.expired += 1
+                    cls.outstanding -= 1
+                    item[1].set_exception(InferenceTimeoutError(f"'{cls.name}' frame expired in the inference queue."))
+                else:
+                    kept.append(item)
+            cls.queue = kept
+
+    def _next_class(self):
+        for name in PRIORITIES:
+            cls = self.classes.get(name)
+            if cls is not None and cls.queue:
+                return cls
+        return None
+
+    def _collect_batch(self):
+        """Wait for the first frame, then gather more until full or the wait window closes."""
+        with self.condition:
+            while True:
+                while self.running and self._next_class() is None:
+                    self.condition.wait()
+                if not self.running:
+                    return None, []
+
+                deadline = time.perf_counter() + self.max_wait
+                while len(self._next_class().queue) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+
+                self._expire(time.perf_counter())
+                self.condition.notify_all()  # Expired frames freed admission slots
+                cls = self._next_class()  # Re-check: a higher class may have arrived during the window
+                if cls is not None:
+                    break
+
+            # Take frames sharing the first frame's input size; leave the rest queued in order
+            imgsz = cls.queue[0][3]
+            batch, rest = [], deque()
+            while cls.queue:
+                item = cls.queue.popleft()
+                if item[3] == imgsz and len(batch) < self.max_batch:
+                    batch.append(item)
+                else:
+                    rest.append(item)
+            cls.queue = rest
+            return cls, batch
+
+    def _finish(self, cls, count):
+        with self.condition:
+            cls.outstanding -= count
+            self.condition.notify_all()
+
+    def _update_pressure(self, latencies_ms):
+        self.recent_interactive.extend(latencies_ms)
+        self.last_interactive = time.perf_counter()
+        if self.interactive_p99_target_ms:
+            ordered = sorted(self.recent_interactive)
+            p99 = ordered[int(0.99 * (len(ordered) - 1))]
+            if p99 > self.interactive_p99_target_ms and not self.pressure:
+                logger.warning(f"Interactive p99 {p99:.0f}ms over target; shedding/degrading live frames.")
+            self.pressure = p99 > self.interactive_p99_target_ms
+
+    def _run(self):
+        while self.running:
+            cls, batch = self._collect_batch()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            for _, _, enqueued, _, _ in batch:
+                self.queue_latency_ms.observe((start - enqueued) * 1000)
+                cls.queue_latency_ms.observe((start - enqueued) * 1000)
+
+            frames = [item[0] for item in batch]
+            try:
+                results = self.predict_fn(frames, imgsz=batch[0][3])
+                if len(results) != len(frames):
+                    raise RuntimeError(f"Model returned {len(results)} results for {len(frames)} frames")
+            except Exception as e:
+                logger.error(f"Batched inference failed: {e}")
+                self._finish(cls, len(batch))
+                for _, future, _, _, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            done = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            self.batch_latency_ms.observe((done - start) * 1000)
+
+            latencies = []
+            for (_, future, enqueued, _, _), result in zip(batch, results):
+                latency = (done - enqueued) * 1000
+                latencies.append(latency)
+                self.total_latency_ms.observe(latency)
+                cls.total_latency_ms.observe(latency)
+                future.set_result(result)
+            self._finish(cls, len(batch))
+            if cls.name == INTERACTIVE:
+                self._update_pressure(latencies)
+
+    def stats(self):
+        with self.condition:
+            depth = sum(len(c.queue) for c in self.classes.values())
+            classes = {name: c.stats() for name, c in self.classes.items()}
+        return {
+            "queue_depth": depth,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "under_pressure": self.under_pressure(),
+            "classes": classes,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_latency_ms": self.queue_latency_ms.snapshot(),
+            "batch_latency_ms": self.batch_latency_ms.snapshot(),
+            "total_latency_ms": self.total_latency_ms.snapshot()
+        }
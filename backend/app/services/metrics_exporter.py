@@ -0,0 +1,119 @@
+from app.core.database import db
+from app.core.metrics import PrometheusText, PIPELINE_STAGES, pipeline_timers
+from app.services.storage_service import storage_service
+
+
+def render_metrics(service):
+    """Prometheus text page for the vision pipeline of a VisionService."""
+    page = PrometheusText()
+    cameras = list(service.cameras.items())
+
+    # Per-stage latency (capture -> ... -> db_write); known stages are always exported, even before first use
+    stages = list(PIPELINE_STAGES) + sorted(set(pipeline_timers.histograms) - set(PIPELINE_STAGES))
+    page.histogram(
+        "agri_vision_stage_duration_milliseconds",
+        "Time spent per frame in each vision pipeline stage.",
+        [({"stage": stage}, pipeline_timers.histogram(stage)) for stage in stages]
+    )
+
+    # Live loop gauges and counters, per camera
+    page.metric("agri_camera_fps", "gauge", "Frames processed per second (smoothed).",
+                [({"camera": cid}, round(w.fps, 3) if w.running else 0.0) for cid, w in cameras])
+    page.metric("agri_camera_running", "gauge", "1 if the camera's capture threads are running.",
+                [({"camera": cid}, int(w.running)) for cid, w in cameras])
+    page.metric("agri_stream_clients", "gauge", "Connected MJPEG stream clients.",
+                [({"camera": cid}, w.broadcaster.subscribers) for cid, w in cameras])
+    page.metric("agri_frame_buffer_depth", "gauge", "Frames waiting in the capture ring buffer.",
+                [({"camera": cid}, len(w.frame_buffer.frames)) for cid, w in cameras])
+    page.metric("agri_frames_captured_total", "counter", "Frames read from the camera.",
+                [({"camera": cid}, w.frame_buffer.captured) for cid, w in cameras])
+    page.metric("agri_frames_dropped_total", "counter", "Captured frames overwritten before inference.",
+                [({"camera": cid}, w.frame_buffer.dropped) for cid, w in cameras])
+    page.metric("agri_frames_processed_total", "counter", "Frames taken by the processing loop.",
+                [({"camera": cid}, w.frame_count) for cid, w in cameras])
+    page.metric("agri_frames_shed_total", "counter", "Frames refused by the scheduler in favour of uploads.",
+                [({"camera": cid}, w.frames_shed) for cid, w in cameras])
+    page.metric("agri_frames_gated_total", "counter", "Frames whose inference was skipped by the scene-change gate.",
+                [({"camera": cid}, w.scene_gate.skipped) for cid, w in cameras])
+    page.metric("agri_stream_frames_encoded_total", "counter", "Frames JPEG-encoded for stream clients.",
+                [({"camera": cid}, w.broadcaster.encoded) for cid, w in cameras])
+
+    # Shared inference scheduler
+    scheduler = service.scheduler
+    classes = sorted(scheduler.classes.items())
+    with scheduler.condition:
+        depths = [({"priority": name}, len(c.queue)) for name, c in classes]
+    page.metric("agri_inference_queue_depth", "gauge", "Frames waiting for the inference scheduler.", depths)
+    page.metric("agri_inference_outstanding", "gauge", "Queued plus running frames per priority class.",
+                [({"priority": name}, c.outstanding) for name, c in classes])
+    page.metric("agri_inference_under_pressure", "gauge", "1 while live frames are shed/degraded for uploads.",
+                [({}, int(scheduler.under_pressure()))])
+    page.metric("agri_inference_admission_total", "counter", "Admission outcomes per priority class.", [
+        ({"priority": name, "outcome": outcome}, getattr(c, outcome))
+        for name, c in classes for outcome in ("admitted", "shed", "expired", "degraded")
+    ])
+    page.histogram("agri_inference_class_latency_milliseconds", "Submit-to-result time per priority class.",
+                   [({"priority": name}, c.total_latency_ms) for name, c in classes])
+    page.histogram("agri_inference_batch_size", "Frames per model call.", [({}, scheduler.batch_sizes)])
+    page.histogram("agri_inference_queue_latency_milliseconds", "Time a frame waited before its batch started.",
+                   [({}, scheduler.queue_latency_ms)])
+    page.histogram("agri_inference_total_latency_milliseconds", "Submit-to-result time per frame.",
+                   [({}, scheduler.total_latency_ms)])
+    page.metric("agri_inference_imgsz", "gauge", "Input size currently chosen by the rate controller.",
+                [({}, service.rate_controller.imgsz or 0)])
+
+    # Detection logging
+    page.metric("agri_detections_total", "counter", "Detections recorded, by source.",
+                [({"source": source}, n) for source, n in sorted(service.detection_counts.items())])
+    writer = service.csv_writer
+    page.metric("agri_csv_queue_depth", "gauge", "Rows waiting for the CSV writer thread.", [({}, writer.queue.qsize())])
+    page.metric("agri_csv_rows_total", "counter", "Detection CSV rows, by outcome.", [
+        ({"outcome": "written"}, writer.written),
+        ({"outcome": "sampled_out"}, writer.sampled_out),
+        ({"outcome": "dropped"}, writer.dropped)
+    ])
+    page.histogram("agri_csv_flush_duration_milliseconds", "Disk time per CSV batch flush.", [({}, writer.flush_ms)])
+
+    # Uploads
+    uploads = service.upload_decoder
+    page.histogram("agri_upload_peak_rss_megabytes", "Highest process RSS seen while handling an upload.",
+                   [({}, uploads.peak_rss_mb)])
+    page.histogram("agri_upload_rss_growth_megabytes", "RSS growth during an upload request.",
+                   [({}, uploads.rss_growth_mb)])
+    page.metric("agri_upload_rejected_total", "counter", "Uploads rejected for exceeding MAX_UPLOAD_BYTES.",
+                [({}, uploads.rejected)])
+    page.metric("agri_upload_decodes_total", "counter", "Upload decodes, by resolution reduction factor.",
+                [({"reduction": str(k)}, v) for k, v in sorted(uploads.reductions.items())])
+
+    # SQLite connection pool
+    pool = db.pool
+    with pool.condition:
+        in_use, idle = pool.in_use, len(pool.idle)
+    page.metric("agri_db_connections", "gauge", "Pooled SQLite connections, by state.",
+                [({"state": "in_use"}, in_use), ({"state": "idle"}, idle)])
+    page.metric("agri_db_checkouts_total", "counter", "Connections borrowed from the pool.", [({}, pool.checkouts)])
+    page.metric("agri_db_pool_waits_total", "counter", "Checkouts that had to wait for a free connection.",
+                [({}, pool.waits)])
+    page.histogram("agri_db_pool_wait_milliseconds", "Time spent acquiring a pooled connection.", [({}, pool.wait_ms)])
+
+    writer = storage_service.writer
+    if writer:
+        page.metric("agri_db_write_pending", "gauge", "Rows accepted but not yet committed.", [({}, writer.pending_count)])
+        page.metric("agri_db_write_rows_total", "counter", "Write-behind rows, by outcome.", [
+            ({"outcome": "accepted"}, writer.accepted),
+            ({"outcome": "committed"}, writer.committed),
+            ({"outcome": "direct"}, writer.direct_writes)
+        ])
+        page.metric("agri_db_write_failures_total", "counter", "Failed group commits (retried).", [({}, writer.failures)])
+        page.histogram("agri_db_write_commit_milliseconds", "Time per group commit.", [({}, writer.commit_ms)])
+        page.histogram("agri_db_write_rows_per_commit", "Rows per group commit.", [({}, writer.batch_sizes)])
+
+    hot = storage_service.hot
+    if hot:
+        page.metric("agri_hot_window_reads_total", "counter", "Recent-data reads, by whether the in-memory window answered them.",
+                    [({"result": "hit"}, hot.hits), ({"result": "miss"}, hot.misses)])
+
+    engine = service.engine
+    page.metric("agri_model_info", "gauge", "Loaded inference engine and model file.",
+                [({"engine": engine.name, "model_path": engine.model_path}, 1)] if engine else [])
+    return page.render()
@@ -0,0 +1,123 @@
+import os
+import json
+import threading
+import logging
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def warm_up(engine, sizes, rounds=2, batch=1):
+    """
+    Runs dummy frames through a freshly loaded engine at every input size the
+    live loop may use, so the first real request does not pay for lazy
+    initialization (graph optimization, allocator growth, CUDA/cuDNN setup).
+    `batch` frames are sent per call (one per worker for pooled engines).
+    """
+    for imgsz in sizes:
+        frame = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+        for _ in range(rounds):
+            engine.predict([frame] * batch, imgsz=imgsz)
+
+
+def smoke_check(engine, golden_dir):
+    """
+    Runs the golden image set through a candidate engine.
+
+    Every image must produce a well-formed result. If the directory contains an
+    `expected.json` ({"image.jpg": ["Label", ...]}) each listed raw label must
+    also be detected. Returns (ok, report); a missing or empty directory passes.
+    """
+    if not golden_dir or not os.path.isdir(golden_dir):
+        return True, {"images": 0, "failures": []}
+
+    expected = {}
+    manifest = os.path.join(golden_dir, 'expected.json')
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            expected = json.load(f)
+
+    failures, checked = [], 0
+    for name in sorted(os.listdir(golden_dir)):
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        frame = cv2.imread(os.path.join(golden_dir, name))
+        if frame is None:
+            continue
+        checked += 1
+        try:
+            detections = engine.predict([frame])[0].detections
+        except Exception as e:
+            failures.append({"image": name, "error": str(e)})
+            continue
+        found = {d['label'] for d in detections}
+        missing = [label for label in expected.get(name, []) if label not in found]
+        if missing:
+            failures.append({"image": name, "missing": missing, "found": sorted(found)})
+
+    return not failures, {"images": checked, "failures": failures}
+
+
+class ModelFileWatcher:
+    """
+    Polls a model file and calls `on_change(path)` once it has been replaced.
+
+    A change is only reported after the file's size and mtime are unchanged for
+    two consecutive polls, so a model that is still being copied is not loaded
+    half-written.
+    """
+    def __init__(self, path_fn, on_change, interval=5.0):
+        self.path_fn = path_fn
+        self.on_change = on_change
+        self.interval = interval
+        self.thread = None
+        self.running = False
+        self._stop = threading.Event()
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self._stop.clear()
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            logger.info(f"Watching model file for changes every {self.interval:.0f}s.")
+
+    def stop(self):
+        self.running = False
+        self._stop.set()
+        if self.thread:
+            self.thread.join()
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+            return (st.st_size, st.st_mtime)
+        except (OSError, TypeError):
+            return None
+
+    def _run(self):
+        path = self.path_fn()
+        loaded = self._stat(path)
+        candidate = None
+        while not self._stop.wait(self.interval):
+            current_path = self.path_fn()
+            if current_path != path:
+                # The service switched files itself (e.g. admin reload); follow it
+                path, loaded, candidate = current_path, self._stat(current_path), None
+                continue
+            current = self._stat(path)
+            if current is None or current == loaded:
+                candidate = None
+            elif current != candidate:
+                candidate = current  # Changed; wait one more poll for it to settle
+            else:
+                loaded, candidate = current, None
+                logger.info(f"Model file {path} changed; reloading.")
+                try:
+                    self.on_change(path)
+                except Exception as e:
+                    logger.error(f"Model reload after file change failed: {e}")
@@ -0,0 +1,44 @@
+import cv2
+
+# BGR colours cycled per label so the same class keeps the same colour
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255),
+    (49, 210, 207), (10, 249, 72), (23, 204, 146), (134, 219, 61),
+    (52, 147, 26), (187, 212, 0), (168, 153, 44), (255, 194, 0)
+]
+
+
+def _colour_for(label):
+    return PALETTE[sum(ord(c) for c in str(label)) % len(PALETTE)]
+
+
+def draw_detections(frame, detections, copy=True):
+    """
+    Draws boxes and labels for a list of detection dicts onto a frame.
+
+    Each detection needs 'label' and 'confidence'; 'box' ([x1, y1, x2, y2] in
+    frame pixels) is optional. Box-less detections (classification models) are
+    listed as text in the top-left corner instead.
+    """
+    canvas = frame.copy() if copy else frame
+    text_row = 0
+
+    for d in detections:
+        label = d.get('label', 'Unknown')
+        text = f"{label} {d.get('confidence', 0):.2f}"
+        colour = _colour_for(label)
+        box = d.get('box')
+
+        if box is None:
+            text_row += 1
+            cv2.putText(canvas, text, (10, 25 * text_row), cv2.FONT_HERSHEY_SIMPLEX, 0.7, colour, 2, cv2.LINE_AA)
+            continue
+
+        x1, y1, x2, y2 = (int(v) for v in box)
+        cv2.rectangle(canvas, (x1, y1), (x2, y2), colour, 2)
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        top = max(y1 - th - 6, 0)
+        cv2.rectangle(canvas, (x1, top), (x1 + tw + 4, top + th + 6), colour, -1)
+        cv2.putText(canvas, text, (x1 + 2, top + th + 2), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+
+    return canvas
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+
+
+class AdaptiveRateController:
+    """
+    Paces the live inference loop to a target FPS and/or a process CPU budget.
+
+    It keeps a rolling window of inference latencies, samples process CPU time
+    (via time.process_time, so no extra dependency) and a rolling window of HTTP
+    request latencies. From these it derives a backoff factor which stretches the
+    interval between inferences and, if input-size steps are configured, steps
+    the model input size down while under pressure and back up once it clears.
+
+    All targets are optional; with none set the loop runs at full speed.
+    """
+    BACKOFF_UP = 1.25
+    BACKOFF_DOWN = 0.9
+    MAX_BACKOFF = 20.0
+    CALM_UPDATES_BEFORE_UPSIZE = 30
+    HTTP_WINDOW_SECONDS = 30.0
+
+    def __init__(self, target_fps=0.0, cpu_budget=0.0, http_latency_target_ms=0.0,
+                 imgsz_steps=(), window=30):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.http_latency_target_ms = http_latency_target_ms
+        self.imgsz_steps = sorted(imgsz_steps, reverse=True)
+
+        self.latencies = deque(maxlen=window)
+        self.http_latencies = deque(maxlen=window * 4)
+        self._lock = threading.Lock()
+
+        self.backoff = 1.0
+        self.imgsz_index = 0
+        self.calm_updates = 0
+        self.cpu_share = 0.0
+        self._cpu_sample = (time.monotonic(), time.process_time())
+
+    @property
+    def imgsz(self):
+        """Current model input size, or None to use the model default."""
+        if not self.imgsz_steps:
+            return None
+        return self.imgsz_steps[self.imgsz_index]
+
+    def record_inference(self, seconds):
+        self.latencies.append(seconds)
+        self._update()
+
+    def record_http_latency(self, ms):
+        with self._lock:
+            self.http_latencies.append((time.monotonic(), ms))
+
+    def _http_p95(self):
+        # Only recent requests count, so an idle server recovers on its own
+        cutoff = time.monotonic() - self.HTTP_WINDOW_SECONDS
+        with self._lock:
+            ordered = sorted(ms for ts, ms in self.http_latencies if ts >= cutoff)
+        if not ordered:
+            return 0.0
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _sample_cpu(self):
+        wall, cpu = time.monotonic(), time.process_time()
+        last_wall, last_cpu = self._cpu_sample
+        if wall - last_wall >= 1.0:
+            self.cpu_share = (cpu - last_cpu) / (wall - last_wall)
+            self._cpu_sample = (wall, cpu)
+
+    def _under_pressure(self):
+        if self.cpu_budget and self.cpu_share > self.cpu_budget:
+            return True
+        if self.http_latency_target_ms and self._http_p95() > self.http_latency_target_ms:
+            return True
+        return False
+
+    def _has_headroom(self):
+        if self.cpu_budget and self.cpu_share > 0.8 * self.cpu_budget:
+            return False
+        if self.http_latency_target_ms and self._http_p95() > 0.8 * self.http_latency_target_ms:
+            return False
+        return True
+
+    def _update(self):
+        self._sample_cpu()
+
+        if self._under_pressure():
+            self.calm_updates = 0
+            self.backoff = min(self.backoff * self.BACKOFF_UP, self.MAX_BACKOFF)
+            # Once the interval has doubled, shrink the input instead of slowing further
+            if self.backoff >= 2.0 and self.imgsz_index < len(self.imgsz_steps) - 1:
+                self.imgsz_index += 1
+                self.backoff = 1.0
+        elif self._has_headroom():
+            self.calm_updates += 1
+            self.backoff = max(self.backoff * self.BACKOFF_DOWN, 1.0)
+            # Step the input size back up only after a sustained calm period (avoids flapping)
+            if self.backoff == 1.0 and self.imgsz_index > 0 and self.calm_updates >= self.CALM_UPDATES_BEFORE_UPSIZE:
+                self.imgsz_index -= 1
+                self.calm_updates = 0
+
+    def next_delay(self):
+        """Seconds the loop should wait before the next inference."""
+        if not self.latencies or (not self.target_fps and self.backoff <= 1.0):
+            return 0.0
+        last = self.latencies[-1]
+        avg = sum(self.latencies) / len(self.latencies)
+
+        base_interval = 1.0 / self.target_fps if self.target_fps else avg
+        return max(0.0, base_interval * self.backoff - last)
+
+    def stats(self):
+        avg = sum(self.latencies) / len(self.latencies) if self.latencies else None
+        return {
+            "target_fps": self.target_fps,
+            "cpu_budget": self.cpu_budget,
+            "cpu_share": round(self.cpu_share, 3),
+            "http_latency_target_ms": self.http_latency_target_ms,
+            "http_p95_ms": round(self._http_p95(), 2),
+            "avg_inference_ms": round(avg * 1000, 2) if avg is not None else None,
+            "backoff": round(self.backoff, 3),
+            "imgsz": self.imgsz
+        }
@@ -0,0 +1,213 @@
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+from app.core.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def perceptual_hash(frame):
+    """64-bit difference hash (dHash) of a BGR frame; robust to re-encoding and resizing."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def _same_aspect(a, b, tolerance=0.02):
+    if not a or not b:
+        return False
+    return abs(a[0] / a[1] - b[0] / b[1]) <= tolerance * (b[0] / b[1])
+
+
+def _scale_detections(detections, from_size, to_size):
+    """Maps boxes from an image of `from_size` to one of `to_size` (both (width, height))."""
+    sx, sy = to_size[0] / from_size[0], to_size[1] / from_size[1]
+    if sx == 1 and sy == 1:
+        return detections
+    return [dict(d, box=[d['box'][0] * sx, d['box'][1] * sy, d['box'][2] * sx, d['box'][3] * sy])
+            if d.get('box') else d for d in detections]
+
+
+def _entry(row):
+    return {
+        "phash": int(row['phash'], 16) if row['phash'] else None,
+        "detections": json.loads(row['detections']),
+        "infer_ms": row['infer_ms'],
+        "size": (row['width'], row['height']) if row['width'] and row['height'] else None
+    }
+
+
+class ResultCache:
+    """
+    Upload analysis cache.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes; a 64-bit perceptual
+    hash of the decoded image lets near-identical re-uploads (re-encoded,
+    resized) hit as well; their boxes are rescaled to the new image size, and
+    entries stored without a perceptual hash (tiled results) only hit exactly.
+    The in-memory layer is an LRU bounded by
+    `max_entries`; with `persist=True` entries are also written to the
+    `result_cache` SQLite table and reloaded on startup. Every entry is tagged
+    with the model fingerprint, and a fingerprint change drops the cache.
+    """
+    def __init__(self, max_entries=256, max_distance=5, persist=False):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.persist = persist
+
+        self.entries = OrderedDict()  # content_hash -> entry dict
+        self.model_fingerprint = None
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    # --- Invalidation ---
+
+    def ensure_model(self, fingerprint):
+        """Clears the cache if the model changed since entries were stored."""
+        if fingerprint == self.model_fingerprint:
+            return
+        with self._lock:
+            had_model = self.model_fingerprint is not None
+            self.model_fingerprint = fingerprint
+            self.entries.clear()
+        if had_model:
+            logger.info("Model changed; upload result cache invalidated.")
+        if self.persist:
+            self._purge_stale()
+            self._warm()
+
+    # --- Lookups ---
+
+    def get(self, content_hash):
+        with self._lock:
+            entry = self.entries.get(content_hash)
+            if entry is not None:
+                self.entries.move_to_end(content_hash)
+        if entry is None and self.persist:
+            entry = self._load(content_hash)
+        if entry is not None:
+            self._hit(entry, exact=True)
+        return entry['detections'] if entry else None
+
+    def get_similar(self, phash, size):
+        """
+        Detections of the closest near-duplicate of an image of `size` (width, height),
+        with boxes scaled to that size. Entries of another aspect ratio (crops) don't match.
+        """
+        best, best_distance = None, self.max_distance + 1
+        with self._lock:
+            for key, entry in self.entries.items():
+                if entry['phash'] is None or not _same_aspect(entry['size'], size):
+                    continue
+                distance = hamming(phash, entry['phash'])
+                if distance < best_distance:
+                    best, best_distance = key, distance
+            entry = self.entries.get(best) if best is not None else None
+            if entry is not None:
+                self.entries.move_to_end(best)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._hit(entry, exact=False)
+        return _scale_detections(entry['detections'], entry['size'], size)
+
+    def record_miss(self):
+        """Counts a lookup that ends without a similarity search (get() alone doesn't count misses)."""
+        self.misses += 1
+
+    def _hit(self, entry, exact):
+        if exact:
+            self.exact_hits += 1
+        else:
+            self.similar_hits += 1
+        self.saved_ms += entry['infer_ms']
+
+    # --- Writes ---
+
+    def put(self, content_hash, phash, detections, infer_ms, size=None):
+        """`phash` None keeps the entry out of near-duplicate matching; `size` is the image's (width, height)."""
+        entry = {"phash": phash, "detections": detections, "infer_ms": infer_ms, "size": size}
+        with self._lock:
+            self.entries[content_hash] = entry
+            self.entries.move_to_end(content_hash)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if self.persist:
+            self._store(content_hash, entry)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+        if self.persist:
+            with db.transaction() as conn:
+                conn.execute("DELETE FROM result_cache")
+
+    # --- SQLite layer ---
+
+    def _store(self, content_hash, entry):
+        try:
+            with db.transaction() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO result_cache (content_hash, phash, model, detections, infer_ms, created, width, height) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (content_hash, format(entry['phash'], '016x') if entry['phash'] is not None else None,
+                     self.model_fingerprint, json.dumps(entry['detections']), entry['infer_ms'], time.time(),
+                     *(entry['size'] or (None, None))))
+        except Exception as e:
+            logger.warning(f"Result cache write failed: {e}")
+
+    def _load(self, content_hash):
+        with db.connection() as conn:
+            row = conn.execute(
+                "SELECT phash, detections, infer_ms, width, height FROM result_cache WHERE content_hash = ? AND model = ?",
+                (content_hash, self.model_fingerprint)).fetchone()
+        if row is None:
+            return None
+        entry = _entry(row)
+        with self._lock:
+            self.entries[content_hash] = entry
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def _purge_stale(self):
+        with db.transaction() as conn:
+            conn.execute("DELETE FROM result_cache WHERE model IS NOT ?", (self.model_fingerprint,))
+
+    def _warm(self):
+        """Load the most recent persisted entries so near-duplicate lookups work after a restart."""
+        with db.connection() as conn:
+            rows = conn.execute(
+                "SELECT content_hash, phash, detections, infer_ms, width, height FROM result_cache "
+                "WHERE model = ? ORDER BY created DESC LIMIT ?",
+                (self.model_fingerprint, self.max_entries)).fetchall()
+        with self._lock:
+            for row in reversed(rows):
+                self.entries[row['content_hash']] = _entry(row)
+
+    def stats(self):
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        hits = self.exact_hits + self.similar_hits
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "persist": self.persist,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "saved_inference_ms": round(self.saved_ms, 2)
+        }
@@ -0,0 +1,65 @@
+import time
+import cv2
+import numpy as np
+
+
+class SceneChangeGate:
+    """
+    Cheap change detector placed in front of the model.
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared (mean
+    absolute difference, 0-255 scale) with the thumbnail of the last frame that
+    was actually inferred. Below `threshold` the scene is treated as static and
+    inference can be skipped, until the last result is older than `max_age`
+    seconds, at which point a refresh is forced.
+    """
+    def __init__(self, threshold=3.0, max_age=2.0, size=32, enabled=True):
+        self.threshold = threshold
+        self.max_age = max_age
+        self.size = size
+        self.enabled = enabled
+
+        self.reference = None
+        self.reference_time = 0.0
+        self.last_score = None
+
+        self.checked = 0
+        self.skipped = 0
+
+    def _thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def should_infer(self, frame):
+        """True if the frame differs enough (or the last result is too old) to run the model."""
+        self.checked += 1
+        if not self.enabled:
+            return True
+
+        thumb = self._thumbnail(frame)
+        now = time.time()
+
+        if self.reference is not None and (now - self.reference_time) < self.max_age:
+            self.last_score = float(np.abs(thumb - self.reference).mean())
+            if self.last_score < self.threshold:
+                self.skipped += 1
+                return False
+
+        self.reference = thumb
+        self.reference_time = now
+        return True
+
+    def reset(self):
+        """Forget the reference so the next frame is always inferred."""
+        self.reference = None
+
+    def stats(self):
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_age": self.max_age,
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skipped_ratio": round(self.skipped / self.checked, 4) if self.checked else 0.0,
+            "last_score": round(self.last_score, 3) if self.last_score is not None else None
+        }
@@ -1,38 +1,116 @@
+import atexit
 import time
-from collections import Counter
+from app.core.config import Config
 from app.core.database import db
+from app.core.partitions import drop_partitions, view_name
+from app.core.rollups import ROLLUP_TABLE, summarize
+from app.services.hot_window import HotWindow
+from app.services.write_behind import WriteBehindWriter
+
+DETECTION_COLUMNS = ("id", "timestamp", "label", "confidence", "source", "track_id", "event", "dwell")
+SENSOR_COLUMNS = ("id", "timestamp", "temperature", "humidity", "soil_moisture")
+
+
+def _number(value):
+    """Sensor readings arrive as strings, possibly with units ("24.5°C"); store them as numbers."""
+    text = str(value).replace('°C', '').replace('%', '').strip()
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _merge(pending, rows, key='id'):
+    """Committed rows plus not-yet-committed ones, newest (by `key`) first, each id once."""
+    merged = {r['id']: r for r in pending}
+    merged.update((r['id'], r) for r in rows)
+    return sorted(merged.values(), key=lambda r: r[key], reverse=True)
+
 
 class StorageService:
+    """
+    Detection / sensor storage. With DB_WRITE_BEHIND the inserts are only
+    queued on the caller's thread (see WriteBehindWriter); reads merge in the
+    rows that are accepted but not committed yet.
+
+    Every row written is also kept in a HotWindow (HOT_WINDOW_ROWS /
+    HOT_WINDOW_SECONDS), which answers the latest-sensors, recent-detections
+    and summary reads for recent ranges without touching the database.
+    """
+    def __init__(self):
+        tables = {"detections": DETECTION_COLUMNS, "sensors": SENSOR_COLUMNS}
+        self.hot = HotWindow(tables, max_rows=Config.HOT_WINDOW_ROWS,
+                             max_age=Config.HOT_WINDOW_SECONDS) if Config.HOT_WINDOW_ROWS > 0 else None
+        self.writer = WriteBehindWriter(
+            db,
+            tables,
+            batch_size=Config.DB_WRITE_BATCH_SIZE,
+            flush_interval=Config.DB_WRITE_FLUSH_INTERVAL,
+            max_pending=Config.DB_WRITE_MAX_PENDING,
+            block_timeout=Config.DB_WRITE_BLOCK_TIMEOUT,
+            on_renumber=self._renumbered
+        ) if Config.DB_WRITE_BEHIND else None
+        if self.writer:
+            # Registered after the database's own handler, so it runs first at exit
+            atexit.register(self.writer.close)
+
+    def _insert(self, table, columns, rows):
+        if self.writer:
+            ids = self.writer.write_many(table, rows)
+        else:
+            sql = f"INSERT INTO {table} ({', '.join(columns[1:])}) VALUES ({', '.join('?' * (len(columns) - 1))})"
+            with db.transaction() as conn:
+                if self.hot:
+                    ids = [conn.execute(sql, row).lastrowid for row in rows]
+                else:
+                    conn.executemany(sql, rows)
+        if self.hot:
+            self.hot.add(table, ids, rows)
+
+    def _renumbered(self, table, ids):
+        # The window holds these rows under their old ids; serve only rows added from now on
+        if self.hot:
+            self.hot.reset([table], after_id=max(ids))
+
+    def _pending(self, table):
+        # Must be taken before the DB query: a row committed in between then shows up in both (merged by id)
+        return self.writer.pending_rows(table) if self.writer else []
+
     def log_sensor_data(self, data):
-        conn = db.get_connection()
-        c = conn.cursor()
-        try:
-            c.execute("INSERT INTO sensors (timestamp, temperature, humidity, soil_moisture) VALUES (?, ?, ?, ?)",
-                    (time.time(), 
-                    data.get('temperature', 0).replace('°C',''), 
-                    data.get('humidity', 0).replace('%',''), 
-                    data.get('soil_moisture', 0).replace('%','')))
-            conn.commit()
-        finally:
-            conn.close()
-
-    def log_detection(self, label, confidence, source="webcam"):
-        conn = db.get_connection()
-        c = conn.cursor()
-        try:
-            c.execute("INSERT INTO detections (timestamp, label, confidence, source) VALUES (?, ?, ?, ?)",
-                    (time.time(), label, confidence, source))
-            conn.commit()
-        finally:
-            conn.close()
+        self._insert("sensors", SENSOR_COLUMNS, [(
+            time.time(),
+            _number(data.get('temperature', 0)),
+            _number(data.get('humidity', 0)),
+            _number(data.get('soil_moisture', 0))
+        )])
+
+    def log_detection(self, label, confidence, source="webcam", track_id=None, event=None, dwell=None):
+        self._insert("detections", DETECTION_COLUMNS, [(time.time(), label, confidence, source, track_id, event, dwell)])
+
+    def log_detections_bulk(self, rows):
+        """
+        Inserts many detections in one transaction.
+        rows: (timestamp, label, confidence, source, track_id, event, dwell) tuples.
+        """
+        self._insert("detections", DETECTION_COLUMNS, rows)
+
+    def flush(self, timeout=10.0):
+        """Waits until every accepted row is committed."""
+        return self.writer.flush(timeout) if self.writer else True
+
+    def get_write_stats(self):
+        return self.writer.stats() if self.writer else {"enabled": False}
+
+    def get_hot_window_stats(self):
+        return self.hot.stats() if self.hot else {"enabled": False}
 
     def clear_logs(self):
         """
         Clear all logs from the database for demo reset.
         """
-        conn = db.get_connection()
-        c = conn.cursor()
-        try:
+        self.flush()
+        with db.transaction() as conn:
+            c = conn.cursor()
             c.execute("DELETE FROM detections")
             c.execute("DELETE FROM sensors")
             try:
@@ -40,59 +118,87 @@ class StorageService:
                 c.execute("DELETE FROM sqlite_sequence WHERE name='sensors'")
             except Exception:
                 pass
-            conn.commit()
-        finally:
-            conn.close()
+            drop_partitions(conn)
+            c.execute(f"DELETE FROM {ROLLUP_TABLE}")
+        if self.writer:
+            self.writer.reset_ids()
+        if self.hot:
+            self.hot.reset()
 
     def get_latest_sensors(self):
-        conn = db.get_connection()
-        try:
-            c = conn.cursor()
-            c.execute("SELECT * FROM sensors ORDER BY id DESC LIMIT 1")
-            row = c.fetchone()
-            if row:
-                return dict(row)
-            return None
-        finally:
-            conn.close()
+        rows = self.hot.latest("sensors", 1) if self.hot else None
+        if rows:
+            return rows[0]
+        pending = self._pending("sensors")
+        with db.connection() as conn:
+            row = conn.execute("SELECT * FROM sensors ORDER BY id DESC LIMIT 1").fetchone()
+            if row is None:
+                # Everything may have been moved into partitions
+                row = conn.execute(f"SELECT * FROM {view_name('sensors')} ORDER BY id DESC LIMIT 1").fetchone()
+        rows = _merge(pending[-1:], [dict(row)] if row else [])
+        if rows:
+            return rows[0]
+        return None
 
     def get_recent_detections(self, limit=5):
-        conn = db.get_connection()
-        try:
-            c = conn.cursor()
-            c.execute("SELECT * FROM detections ORDER BY id DESC LIMIT ?", (limit,))
-            rows = c.fetchall()
-            return [dict(r) for r in rows]
-        finally:
-            conn.close()
+        rows = self.hot.latest("detections", limit) if self.hot else None
+        if rows is not None:
+            return rows
+        pending = self._pending("detections")
+        with db.connection() as conn:
+            rows = conn.execute("SELECT * FROM detections ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            if len(rows) < limit:
+                # The live table only holds the current partition period
+                rows = conn.execute(f"SELECT * FROM {view_name('detections')} ORDER BY id DESC LIMIT ?",
+                                    (limit,)).fetchall()
+        return _merge(pending[-limit:], [dict(r) for r in rows])[:limit]
 
     def get_detections_summary(self, seconds=60):
         """
         Get summary of detections in the last N seconds.
+
+        Served by the hot window when it holds the whole range. Otherwise whole
+        minutes / hours / days come from the rollups (a few rows however long
+        the window); only the partial first minute is read from raw rows.
+        Accepted rows not committed yet are added on top.
         """
-        conn = db.get_connection()
-        try:
-            c = conn.cursor()
-            cutoff = time.time() - seconds
-            c.execute("SELECT label, timestamp FROM detections WHERE timestamp > ? ORDER BY id DESC", (cutoff,))
-            rows = c.fetchall()
-            
-            if not rows:
-                return {"most_frequent": None, "count": 0, "last_seen": None, "total_detections": 0}
-                
-            labels = [r['label'] for r in rows]
-            last_seen = labels[0]
-            
-            counter = Counter(labels)
-            most_common = counter.most_common(1)[0]
-            
-            return {
-                "most_frequent": most_common[0],
-                "count": most_common[1],
-                "last_seen": last_seen,
-                "total_detections": len(labels)
-            }
-        finally:
-            conn.close()
+        cutoff = time.time() - seconds
+        totals = self.hot.totals_since("detections", cutoff) if self.hot else None
+        if totals is not None:
+            return self._summarize_rows(totals, [])
+        pending = [r for r in self._pending("detections") if r['timestamp'] > cutoff]
+
+        with db.snapshot() as conn:
+            totals, edge_end = summarize(conn, cutoff)
+            edge = conn.execute(f"SELECT label, confidence, timestamp FROM {view_name('detections')} "
+                                "WHERE timestamp > ? AND timestamp < ?", (cutoff, edge_end)).fetchall()
+            # Pending rows committed since they were listed are already in the rollups / edge rows
+            committed = set()
+            ids = [r['id'] for r in pending]
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                committed.update(r[0] for r in conn.execute(
+                    f"SELECT id FROM detections WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+
+        return self._summarize_rows(totals, list(edge) + [r for r in pending if r['id'] not in committed])
+
+    def _summarize_rows(self, totals, rows):
+        """Adds raw detection rows to {label: [count, max_confidence, last_seen]} and builds the summary."""
+        for r in rows:
+            count, peak, last = totals.get(r['label'], (0, r['confidence'], r['timestamp']))
+            totals[r['label']] = [count + 1, max(peak, r['confidence']), max(last, r['timestamp'])]
+
+        if not totals:
+            return {"most_frequent": None, "count": 0, "last_seen": None, "total_detections": 0}
+
+        most_frequent = max(totals, key=lambda label: totals[label][0])
+        last_seen = max(totals, key=lambda label: totals[label][2])
+
+        return {
+            "most_frequent": most_frequent,
+            "count": totals[most_frequent][0],
+            "last_seen": last_seen,
+            "total_detections": sum(t[0] for t in totals.values())
+        }
 
 storage_service = StorageService()
@@ -0,0 +1,68 @@
+import threading
+import cv2
+
+
+class FrameBroadcaster:
+    """
+    Encode-once, fan-out MJPEG publisher.
+
+    The processing loop publishes each annotated frame; it is JPEG-encoded a
+    single time and stored with a sequence number. Stream clients wait on a
+    condition variable and always jump to the newest encoded frame, so a slow
+    client skips frames instead of queueing them. When nobody is subscribed,
+    publish() returns immediately without encoding.
+    """
+    def __init__(self, jpeg_quality=80):
+        self.condition = threading.Condition()
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self.jpeg = None
+        self.seq = 0
+        self.subscribers = 0
+        self.encoded = 0
+
+    def has_subscribers(self):
+        return self.subscribers > 0
+
+    def publish(self, frame):
+        """Encode a frame once and wake every waiting client."""
+        if not self.has_subscribers():
+            return False
+
+        flag, encoded_image = cv2.imencode(".jpg", frame, self.encode_params)
+        if not flag:
+            return False
+
+        with self.condition:
+            self.jpeg = encoded_image.tobytes()
+            self.seq += 1
+            self.encoded += 1
+            self.condition.notify_all()
+        return True
+
+    def stream(self, timeout=5.0):
+        """Generator yielding multipart MJPEG chunks for a single client."""
+        with self.condition:
+            self.subscribers += 1
+        try:
+            last_seq = 0
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.seq != last_seq, timeout)
+                    if self.seq == last_seq:
+                        continue
+                    last_seq = self.seq
+                    jpeg = self.jpeg
+
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            # Runs when the client disconnects and the generator is closed
+            with self.condition:
+                self.subscribers -= 1
+
+    def stats(self):
+        return {
+            "subscribers": self.subscribers,
+            "encoded_frames": self.encoded,
+            "seq": self.seq
+        }
@@ -0,0 +1,115 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from app.services.inference_engines import non_max_suppression
+from app.services.inference_scheduler import INTERACTIVE
+
+
+def make_tiles(height, width, tile_size=640, overlap=0.2):
+    """
+    Splits an image into overlapping square tiles of `tile_size` pixels.
+    Returns a list of (x, y, w, h); edge tiles are shifted inwards so every tile
+    is full-size whenever the image is large enough.
+    """
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(tile_size, width - x), min(tile_size, height - y))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+def merge_detections(tile_results, iou_threshold=0.45):
+    """
+    Cross-tile NMS. `tile_results` is a list of ((x, y), detections) where the
+    detection boxes are tile-relative. Returns the merged detections in
+    full-image coordinates; box-less detections are kept once per label with
+    their best confidence.
+    """
+    boxed, boxless = [], {}
+    for (ox, oy), detections in tile_results:
+        for d in detections:
+            if d.get('box') is None:
+                if d['confidence'] > boxless.get(d['label'], {}).get('confidence', -1):
+                    boxless[d['label']] = d
+                continue
+            x1, y1, x2, y2 = d['box']
+            boxed.append(dict(d, box=[x1 + ox, y1 + oy, x2 + ox, y2 + oy]))
+
+    if boxed:
+        labels = sorted({d['label'] for d in boxed})
+        class_ids = [labels.index(d['label']) for d in boxed]
+        keep = non_max_suppression([d['box'] for d in boxed], [d['confidence'] for d in boxed], class_ids, iou_threshold)
+        boxed = [boxed[i] for i in keep]
+
+    return boxed + list(boxless.values())
+
+
+class TiledAnalysis:
+    """
+    Runs one large image through the model as overlapping tiles.
+
+    Tiles are submitted to the shared scheduler a window at a time (at most
+    `window`, default the scheduler's max_batch, in flight), so they are batched
+    together without taking every interactive slot from other uploads.
+    A downscaled full-image pass is added so large lesions that span several
+    tiles are still found; the results are merged with cross-tile NMS.
+    """
+    def __init__(self, scheduler, tile_size=640, overlap=0.2, iou_threshold=0.45, include_full_image=True,
+                 priority=INTERACTIVE, window=None):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.window = window
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self.include_full_image = include_full_image
+
+    def run(self, frame):
+        height, width = frame.shape[:2]
+        tiles = make_tiles(height, width, self.tile_size, self.overlap)
+
+        started = time.perf_counter()
+        pending_tiles = [((x, y), (x, y, w, h), frame[y:y + h, x:x + w]) for (x, y, w, h) in tiles]
+        if self.include_full_image and len(tiles) > 1:
+            pending_tiles.append(((0, 0), (0, 0, width, height), frame))
+        pending_tiles.reverse()
+        window = max(1, self.window or self.scheduler.max_batch)
+
+        jobs = {}
+        tile_results, timings = [], []
+        while pending_tiles or jobs:
+            while pending_tiles and len(jobs) < window:
+                offset, rect, image = pending_tiles.pop()
+                jobs[self.scheduler.submit(image, priority=self.priority)] = (offset, rect)
+            done, _ = wait(jobs, return_when=FIRST_COMPLETED)
+            for future in done:
+                offset, rect = jobs.pop(future)
+                result = future.result()
+                tile_results.append((offset, result.detections))
+                # The tile's own model time (its share when batched with other tiles), plus when it came back
+                predict_ms = result.timings.get("predict")
+                timings.append({
+                    "tile": list(rect),
+                    "predict_ms": round(predict_ms, 2) if predict_ms is not None else None,
+                    "inference_ms": round(sum(result.timings.values()), 2) if result.timings else None,
+                    "completed_after_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "detections": len(result.detections)
+                })
+
+        merged = merge_detections(tile_results, self.iou_threshold)
+        return merged, {
+            "image_size": [width, height],
+            "tile_size": self.tile_size,
+            "overlap": self.overlap,
+            "tiles": len(tiles),
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "per_tile": timings
+        }
@@ -0,0 +1,174 @@
+import itertools
+import time
+
+# Track ids start at the process start time in ms so they stay unique across restarts
+_track_ids = itertools.count(int(time.time() * 1000))
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid_distance(a, b):
+    """Centroid distance relative to the larger box diagonal (0 = same centre)."""
+    ca = ((a[0] + a[2]) / 2, (a[1] + a[3]) / 2)
+    cb = ((b[0] + b[2]) / 2, (b[1] + b[3]) / 2)
+    diag = max(((a[2] - a[0]) ** 2 + (a[3] - a[1]) ** 2) ** 0.5,
+               ((b[2] - b[0]) ** 2 + (b[3] - b[1]) ** 2) ** 0.5, 1e-6)
+    return ((ca[0] - cb[0]) ** 2 + (ca[1] - cb[1]) ** 2) ** 0.5 / diag
+
+
+class Track:
+    def __init__(self, detection, now):
+        self.id = None  # Assigned once the track is confirmed
+        self.label = detection['label']
+        self.box = detection.get('box')
+        self.confidence = detection['confidence']
+        self.peak = detection['confidence']
+        self.reported_peak = None
+        self.first_seen = now
+        self.last_seen = now
+        self.last_event = None
+        self.hits = 1
+
+    @property
+    def dwell(self):
+        return self.last_seen - self.first_seen
+
+
+class DetectionTracker:
+    """
+    Lightweight multi-object tracker for one camera.
+
+    Detections are associated with existing tracks of the same label greedily
+    by IoU, falling back to centroid distance for fast-moving or re-framed
+    objects; box-less (classification) detections form one track per label.
+    Instead of a row per frame, each track emits a few events:
+
+      start - once the track has been seen on `min_hits` frames
+      peak  - when confidence beats the last reported value by `peak_margin`
+              (at most every `peak_interval` seconds)
+      end   - when unseen for `max_age` seconds; carries the peak confidence
+
+    Every event carries the track id and the dwell time so far.
+    """
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.5, max_age=1.5, min_hits=2,
+                 peak_margin=0.05, peak_interval=5.0):
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_age = max_age
+        self.min_hits = max(1, min_hits)
+        self.peak_margin = peak_margin
+        self.peak_interval = peak_interval
+        self.tracks = []
+
+        self.updates = 0
+        self.detections_seen = 0
+        self.events_emitted = 0
+
+    def _match_score(self, track, detection):
+        """Higher is better; None if the detection cannot belong to the track."""
+        if track.label != detection['label']:
+            return None
+        box = detection.get('box')
+        if track.box is None or box is None:
+            return 1.0 if track.box is None and box is None else None
+        iou = box_iou(track.box, box)
+        if iou >= self.iou_threshold:
+            return 1.0 + iou
+        distance = _centroid_distance(track.box, box)
+        if distance <= self.max_centroid_distance:
+            return 1.0 - distance  # Always ranks below any IoU match
+        return None
+
+    def _event(self, track, kind, now):
+        track.last_event = now
+        self.events_emitted += 1
+        confidence = track.peak if kind in ('peak', 'end') else track.confidence
+        if kind in ('start', 'peak'):
+            track.reported_peak = track.peak
+        return {
+            "track_id": track.id,
+            "event": kind,
+            "label": track.label,
+            "confidence": confidence,
+            "box": track.box,
+            "dwell": round(track.dwell, 3)
+        }
+
+    def update(self, detections, now=None):
+        """Feeds one frame's detections; returns the events it produced."""
+        now = time.time() if now is None else now
+        self.updates += 1
+        self.detections_seen += len(detections)
+        events = []
+
+        # Greedy association, best pairs first
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for di, d in enumerate(detections):
+                score = self._match_score(track, d)
+                if score is not None:
+                    pairs.append((score, ti, di))
+        pairs.sort(reverse=True)
+        used_tracks, used_detections = set(), set()
+        for _, ti, di in pairs:
+            if ti in used_tracks or di in used_detections:
+                continue
+            used_tracks.add(ti)
+            used_detections.add(di)
+
+            track, d = self.tracks[ti], detections[di]
+            track.box = d.get('box')
+            track.confidence = d['confidence']
+            track.last_seen = now
+            track.hits += 1
+            track.peak = max(track.peak, d['confidence'])
+
+            if track.id is None:
+                if track.hits >= self.min_hits:
+                    track.id = next(_track_ids)
+                    events.append(self._event(track, 'start', now))
+            elif (track.peak >= track.reported_peak + self.peak_margin
+                  and now - track.last_event >= self.peak_interval):
+                events.append(self._event(track, 'peak', now))
+
+        for di, d in enumerate(detections):
+            if di not in used_detections:
+                track = Track(d, now)
+                self.tracks.append(track)
+                if self.min_hits <= 1:
+                    track.id = next(_track_ids)
+                    events.append(self._event(track, 'start', now))
+
+        # Expire tracks not seen for max_age (unconfirmed ones vanish silently)
+        alive = []
+        for track in self.tracks:
+            if now - track.last_seen > self.max_age:
+                if track.id is not None:
+                    events.append(self._event(track, 'end', now))
+            else:
+                alive.append(track)
+        self.tracks = alive
+        return events
+
+    def flush(self):
+        """Ends every confirmed track (e.g. when the camera stops)."""
+        now = time.time()
+        events = [self._event(t, 'end', now) for t in self.tracks if t.id is not None]
+        self.tracks = []
+        return events
+
+    def stats(self):
+        return {
+            "active_tracks": sum(1 for t in self.tracks if t.id is not None),
+            "tentative_tracks": sum(1 for t in self.tracks if t.id is None),
+            "updates": self.updates,
+            "detections_seen": self.detections_seen,
+            "events_emitted": self.events_emitted,
+            "reduction_ratio": round(self.detections_seen / self.events_emitted, 2) if self.events_emitted else None
+        }
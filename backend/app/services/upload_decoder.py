@@ -0,0 +1,214 @@
+import struct
+import threading
+import logging
+import cv2
+import numpy as np
+from app.core.exceptions import UploadTooLargeError
+from app.core.metrics import Histogram, MEMORY_BUCKETS_MB
+
+logger = logging.getLogger(__name__)
+
+# (factor, imread flag) from the most to the least aggressive reduction
+REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# JPEG start-of-frame markers carrying the image size (excludes DHT/JPG/DAC)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(data):
+    """(width, height) read from a JPEG or PNG header, or None for other/unknown formats."""
+    if len(data) >= 24 and bytes(data[:8]) == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack('>II', bytes(data[16:24]))
+        return width, height
+
+    if len(data) < 4 or bytes(data[:2]) != b'\xff\xd8':
+        return None
+    i, n = 2, len(data)
+    while i + 3 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in (0x01,) or 0xD0 <= marker <= 0xD9:  # Markers without a length
+            i += 2
+            continue
+        if marker in _JPEG_SOF:
+            if i + 9 > n:
+                return None
+            height, width = struct.unpack('>HH', bytes(data[i + 5:i + 9]))
+            return width, height
+        i += 2 + struct.unpack('>H', bytes(data[i + 2:i + 4]))[0]
+    return None
+
+
+class BufferPool:
+    """
+    Reusable bytearrays for upload bodies. Buffers start at `initial_size` and
+    grow by doubling while a request is read; up to `max_buffers` of at most
+    `max_pooled_size` bytes are kept for reuse so steady traffic does not keep
+    allocating, while an occasional huge upload is not pinned in memory.
+    """
+    def __init__(self, max_buffers=4, initial_size=1024 * 1024, max_pooled_size=4 * 1024 * 1024):
+        self.max_buffers = max_buffers
+        self.initial_size = initial_size
+        self.max_pooled_size = max(initial_size, max_pooled_size)
+        self.free = []
+        self._lock = threading.Lock()
+        self.allocated = 0
+        self.reused = 0
+        self.discarded = 0
+
+    def acquire(self):
+        with self._lock:
+            if self.free:
+                self.reused += 1
+                return self.free.pop()
+            self.allocated += 1
+        return bytearray(self.initial_size)
+
+    def release(self, buf):
+        with self._lock:
+            if len(buf) > self.max_pooled_size:
+                self.discarded += 1
+            elif len(self.free) < self.max_buffers:
+                self.free.append(buf)
+                # Hand out the largest buffer first
+                self.free.sort(key=len)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "free": len(self.free),
+                "pooled_mb": round(sum(len(b) for b in self.free) / (1024 * 1024), 2),
+                "allocated": self.allocated,
+                "reused": self.reused,
+                "discarded": self.discarded
+            }
+
+
+class UploadBody:
+    """An upload read into a pooled buffer. Use as a context manager to return the buffer."""
+    def __init__(self, pool, buf, length):
+        self.pool = pool
+        self.buf = buf
+        self.length = length
+        self.data = memoryview(buf)[:length]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def release(self):
+        if self.buf is not None:
+            self.data.release()
+            self.pool.release(self.buf)
+            self.buf = None
+
+
+class UploadDecoder:
+    """
+    Memory-bounded upload path.
+
+    The file part is copied in `chunk_size` pieces into a pooled buffer and
+    rejected with 413 once it passes `max_bytes` (the request body as a whole
+    is already capped by Flask's MAX_CONTENT_LENGTH while it is parsed). Images much larger than the model input are decoded directly at
+    1/2, 1/4 or 1/8 scale (libjpeg DCT scaling) so the full-resolution pixels
+    never exist in memory; the chosen scale keeps the long side at or above
+    `min_side`.
+    """
+    def __init__(self, max_bytes=20 * 1024 * 1024, chunk_size=64 * 1024, pool_size=4,
+                 min_side=640, reduced_decode=True):
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.min_side = min_side
+        self.reduced_decode = reduced_decode
+        self.pool = BufferPool(pool_size, initial_size=min(1024 * 1024, max_bytes + 1))
+
+        self.rejected = 0
+        self.reductions = {1: 0, 2: 0, 4: 0, 8: 0}
+        self.peak_rss_mb = Histogram(MEMORY_BUCKETS_MB)
+        self.rss_growth_mb = Histogram(MEMORY_BUCKETS_MB)
+
+    def read(self, file_stream):
+        """Copies an upload into a pooled buffer. Raises UploadTooLargeError past max_bytes."""
+        stream = getattr(file_stream, 'stream', file_stream)
+        readinto = getattr(stream, 'readinto', None)
+
+        buf = self.pool.acquire()
+        length = 0
+        try:
+            while True:
+                if length == len(buf):
+                    # Grow (at most to max_bytes + 1, enough to detect an oversized body)
+                    grown = bytearray(min(len(buf) * 2, self.max_bytes + 1))
+                    grown[:length] = buf
+                    buf = grown
+                end = min(length + self.chunk_size, len(buf))
+                if readinto is not None:
+                    with memoryview(buf)[length:end] as window:
+                        got = readinto(window)
+                else:
+                    chunk = stream.read(end - length)
+                    got = len(chunk)
+                    buf[length:length + got] = chunk
+                if not got:
+                    break
+                length += got
+                if length > self.max_bytes:
+                    self.rejected += 1
+                    raise UploadTooLargeError(
+                        f"Uploaded file exceeds the {self.max_bytes / (1024 * 1024):.1f} MB limit.")
+        except Exception:
+            self.pool.release(buf)
+            raise
+        return UploadBody(self.pool, buf, length)
+
+    def reduction_for(self, data):
+        """(factor, imread flag) for decoding `data`; (1, IMREAD_COLOR) for full resolution."""
+        if self.reduced_decode:
+            size = image_dimensions(data)
+            if size:
+                long_side = max(size)
+                for factor, flag in REDUCED_MODES:
+                    if long_side // factor >= self.min_side:
+                        return factor, flag
+        return 1, cv2.IMREAD_COLOR
+
+    def decode(self, data, full_resolution=False):
+        """
+        Decodes image bytes. Returns (frame, scale) where `scale` maps decoded pixel
+        coordinates back to the original image; frame is None if undecodable.
+        """
+        factor, flag = (1, cv2.IMREAD_COLOR) if full_resolution else self.reduction_for(data)
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), flag)
+        if frame is None:
+            return None, 1.0
+        self.reductions[factor] += 1
+
+        scale = 1.0
+        if factor > 1:
+            size = image_dimensions(data)
+            scale = max(size) / max(frame.shape[:2])
+        return frame, scale
+
+    def record_request(self, sampler):
+        self.peak_rss_mb.observe(sampler.peak)
+        self.rss_growth_mb.observe(sampler.growth)
+
+    def stats(self):
+        return {
+            "max_bytes": self.max_bytes,
+            "rejected": self.rejected,
+            "decode_reductions": {str(k): v for k, v in self.reductions.items()},
+            "buffer_pool": self.pool.stats(),
+            "peak_rss_mb": self.peak_rss_mb.snapshot(),
+            "rss_growth_mb": self.rss_growth_mb.snapshot()
+        }
@@ -0,0 +1,381 @@
+import os
+import time
+import uuid
+import threading
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from app.core.config import Config
+from app.services.storage_service import storage_service
+from app.services.label_normalizer import normalize_label
+from app.services.inference_scheduler import BACKGROUND
+from app.services.tracker import DetectionTracker
+from app.services.vision_service import vision_service
+
+logger = logging.getLogger(__name__)
+
+
+def is_stream(source):
+    return isinstance(source, str) and "://" in source
+
+
+def plan_segments(frame_count, fps, segment_seconds):
+    """Splits [0, frame_count) into (start, end) frame ranges of about `segment_seconds`."""
+    size = max(1, int(round(segment_seconds * fps)))
+    return [(start, min(start + size, frame_count)) for start in range(0, frame_count, size)]
+
+
+class Segment:
+    def __init__(self, index, start_frame, end_frame):
+        self.index = index
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.state = "queued"
+        self.frames_read = 0
+        self.frames_analyzed = 0
+        self.events = 0
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "start_frame": self.start_frame,
+            "end_frame": self.end_frame,
+            "state": self.state,
+            "frames_read": self.frames_read,
+            "frames_analyzed": self.frames_analyzed,
+            "events": self.events,
+            "error": self.error
+        }
+
+
+class VideoJob:
+    """
+    One offline analysis of a video file or stream.
+
+    Files are split into `segment_seconds` time segments that are decoded in
+    parallel (each worker seeks to its own segment); streams cannot seek and
+    are read sequentially, cut into segments as they arrive. Every `stride`-th
+    frame goes through the shared scheduler at background priority, a tracker
+    turns per-frame detections into start / peak / end events, and each
+    segment's events are bulk-inserted into `detections` with source
+    `video:<job id>`. Timestamps are `base_time` plus the frame's offset in
+    the video. With `delete_source` the file is removed once the job ends
+    (API uploads).
+    """
+    def __init__(self, source, stride=5, segment_seconds=60.0, workers=2, max_seconds=None, base_time=None,
+                 delete_source=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.source = source
+        self.delete_source = delete_source
+        self.source_tag = f"video:{self.id}"
+        self.stride = max(1, int(stride))
+        self.segment_seconds = max(1.0, float(segment_seconds))
+        self.workers = max(1, int(workers))
+        self.max_seconds = float(max_seconds) if max_seconds else None
+        self.base_time = base_time
+
+        self.state = "queued"
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.fps = None
+        self.frame_count = None
+        self.segments = []
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    # --- Progress ---
+
+    def _totals(self):
+        with self._lock:
+            segments = list(self.segments)
+        return (sum(s.frames_read for s in segments),
+                sum(s.frames_analyzed for s in segments),
+                sum(s.events for s in segments))
+
+    def to_dict(self, include_segments=False):
+        frames_read, frames_analyzed, events = self._totals()
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        total = self.frame_count
+        if total and self.max_seconds and self.fps:
+            total = min(total, int(self.max_seconds * self.fps))
+        data = {
+            "id": self.id,
+            "source": str(self.source),
+            "source_tag": self.source_tag,
+            "state": self.state,
+            "error": self.error,
+            "stride": self.stride,
+            "segment_seconds": self.segment_seconds,
+            "workers": self.workers,
+            "video_fps": self.fps,
+            "frame_count": total,
+            "frames_read": frames_read,
+            "frames_analyzed": frames_analyzed,
+            "events": events,
+            "progress": round(frames_read / total, 4) if total else None,
+            "elapsed_s": round(elapsed, 2),
+            "read_fps": round(frames_read / elapsed, 2) if elapsed else None,
+            "analyzed_fps": round(frames_analyzed / elapsed, 2) if elapsed else None,
+            "realtime_factor": round(frames_read / self.fps / elapsed, 2) if elapsed and self.fps else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "segments_done": sum(1 for s in self.segments if s.state == "completed"),
+            "segments_total": len(self.segments)
+        }
+        if include_segments:
+            data["segments"] = [s.to_dict() for s in self.segments]
+        return data
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class VideoJobManager:
+    """
+    Registry and runner for offline video jobs. At most `max_concurrent` jobs
+    run at once; later ones wait in the queued state.
+    """
+    def __init__(self, service, max_concurrent=1, max_inflight=8, history=50):
+        self.service = service
+        self.max_inflight = max(1, max_inflight)
+        self.jobs = {}
+        self.history = deque(maxlen=history)  # Completed job ids, oldest evicted first
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._lock = threading.Lock()
+
+    def create_job(self, source, **options):
+        job = VideoJob(source, **options)
+        with self._lock:
+            self.jobs[job.id] = job
+        threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+        return job
+
+    def run_job(self, source, **options):
+        """Runs a job in the calling thread (CLI) and returns it when done."""
+        job = VideoJob(source, **options)
+        with self._lock:
+            self.jobs[job.id] = job
+        self._run_job(job)
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self):
+        return [j.to_dict() for j in sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)]
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancel()
+        return job is not None
+
+    # --- Execution ---
+
+    def _run_job(self, job):
+        try:
+            self._execute(job)
+        finally:
+            if job.delete_source and not is_stream(job.source):
+                try:
+                    os.remove(job.source)
+                except OSError as e:
+                    logger.warning(f"Could not remove uploaded video {job.source}: {e}")
+
+    def _execute(self, job):
+        with self._slots:
+            if job.cancelled.is_set():
+                job.state = "cancelled"
+                return
+            job.state = "running"
+            job.started = time.time()
+            try:
+                if self.service.engine is None:
+                    self.service.load_model()
+                if self.service.engine is None:
+                    raise RuntimeError("Model is not loaded.")
+                if is_stream(job.source):
+                    self._run_stream(job)
+                else:
+                    self._run_file(job)
+                job.state = "cancelled" if job.cancelled.is_set() else "completed"
+            except Exception as e:
+                logger.error(f"Video job {job.id} failed: {e}")
+                job.state = "failed"
+                job.error = str(e)
+            finally:
+                job.finished = time.time()
+                self._retire(job)
+        summary = job.to_dict()
+        logger.info(f"Video job {job.id} {job.state}: {summary['frames_analyzed']} frames analyzed, "
+                    f"{summary['events']} events, {summary['analyzed_fps']} fps.")
+
+    def _retire(self, job):
+        with self._lock:
+            if len(self.history) == self.history.maxlen:
+                self.jobs.pop(self.history[0], None)
+            self.history.append(job.id)
+
+    def _run_file(self, job):
+        if not os.path.exists(job.source):
+            raise FileNotFoundError(f"Video not found: {job.source}")
+        cap = cv2.VideoCapture(job.source)
+        try:
+            if not cap.isOpened():
+                raise RuntimeError(f"Could not open video: {job.source}")
+            job.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            job.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        finally:
+            cap.release()
+        if job.frame_count <= 0:
+            # Some containers don't report a frame count, so segments can't be planned: read sequentially
+            logger.warning(f"Video job {job.id}: unknown frame count, analyzing sequentially.")
+            job.frame_count = None
+            self._run_stream(job)
+            job.frame_count = sum(s.frames_read for s in job.segments)
+            return
+        if job.base_time is None:
+            # Best guess at the recording time: the file was closed when recording ended
+            job.base_time = os.path.getmtime(job.source) - job.frame_count / job.fps
+
+        frame_count = job.frame_count
+        if job.max_seconds:
+            frame_count = min(frame_count, int(job.max_seconds * job.fps))
+        job.segments = [Segment(i, start, end)
+                        for i, (start, end) in enumerate(plan_segments(frame_count, job.fps, job.segment_seconds))]
+
+        with ThreadPoolExecutor(max_workers=job.workers, thread_name_prefix=f"video-{job.id}") as pool:
+            for future in [pool.submit(self._run_segment, job, segment) for segment in job.segments]:
+                future.result()
+        failed = [s for s in job.segments if s.state == "failed"]
+        if failed:
+            raise RuntimeError(f"{len(failed)} segment(s) failed: {failed[0].error}")
+
+    def _run_segment(self, job, segment):
+        """Decodes one segment in its own VideoCapture and analyzes every stride-th frame."""
+        if job.cancelled.is_set():
+            segment.state = "cancelled"
+            return
+        segment.state = "running"
+        cap = cv2.VideoCapture(job.source)
+        try:
+            if segment.start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, segment.start_frame)
+            index = segment.start_frame
+
+            def frames():
+                nonlocal index
+                while index < segment.end_frame and not job.cancelled.is_set():
+                    # grab() skips the colour conversion for frames the stride drops
+                    if not cap.grab():
+                        break
+                    current, index = index, index + 1
+                    segment.frames_read += 1
+                    if (current - segment.start_frame) % job.stride == 0:
+                        ok, frame = cap.retrieve()
+                        if ok:
+                            yield current, frame
+
+            self._analyze(job, segment, frames())
+            segment.state = "cancelled" if job.cancelled.is_set() else "completed"
+        except Exception as e:
+            segment.state = "failed"
+            segment.error = str(e)
+        finally:
+            cap.release()
+
+    def _run_stream(self, job):
+        """
+        Streams cannot seek: read sequentially, cutting segments by time as they arrive.
+        Also used for files without a frame count (timestamps then start at the analysis time).
+        """
+        cap = cv2.VideoCapture(job.source)
+        try:
+            if not cap.isOpened():
+                raise RuntimeError(f"Could not open {'stream' if is_stream(job.source) else 'video'}: {job.source}")
+            job.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            if job.base_time is None:
+                job.base_time = time.time()
+            per_segment = max(1, int(round(job.segment_seconds * job.fps)))
+            limit = int(job.max_seconds * job.fps) if job.max_seconds else None
+            index = 0
+            while not job.cancelled.is_set() and (limit is None or index < limit):
+                end = index + per_segment if limit is None else min(index + per_segment, limit)
+                segment = Segment(len(job.segments), index, end)
+                with job._lock:
+                    job.segments.append(segment)
+                segment.state = "running"
+                ended = False
+
+                def frames():
+                    nonlocal index, ended
+                    while index < end and not job.cancelled.is_set():
+                        if not cap.grab():
+                            ended = True
+                            break
+                        current, index = index, index + 1
+                        segment.frames_read += 1
+                        if current % job.stride == 0:
+                            ok, frame = cap.retrieve()
+                            if ok:
+                                yield current, frame
+
+                self._analyze(job, segment, frames())
+                segment.end_frame = index
+                segment.state = "completed"
+                if ended:
+                    break
+        finally:
+            cap.release()
+
+    def _analyze(self, job, segment, frames):
+        """Runs frames through the scheduler (keeping a few in flight) and bulk-stores track events."""
+        tracker = DetectionTracker(
+            iou_threshold=Config.TRACK_IOU_THRESHOLD,
+            # Track timing is in video seconds; allow for the gaps the stride leaves
+            max_age=max(Config.TRACK_MAX_AGE, 2 * job.stride / job.fps),
+            min_hits=Config.TRACK_MIN_HITS,
+            peak_margin=Config.TRACK_PEAK_MARGIN
+        )
+        rows = []
+
+        def collect(frame_index, future):
+            result = future.result()
+            detections = [
+                {"label": normalize_label(d['label']), "confidence": d['confidence'], "box": d['box']}
+                for d in result.detections
+            ]
+            segment.frames_analyzed += 1
+            at = frame_index / job.fps
+            for e in tracker.update(detections, now=at):
+                rows.append((job.base_time + at, e['label'], e['confidence'], job.source_tag,
+                             e['track_id'], e['event'], e['dwell']))
+
+        inflight = deque()
+        for frame_index, frame in frames:
+            inflight.append((frame_index, self.service.scheduler.submit(frame, priority=BACKGROUND)))
+            if len(inflight) >= self.max_inflight:
+                collect(*inflight.popleft())
+        while inflight:
+            collect(*inflight.popleft())
+
+        end_time = (segment.start_frame + segment.frames_read) / job.fps
+        for e in tracker.flush():
+            rows.append((job.base_time + end_time, e['label'], e['confidence'], job.source_tag,
+                         e['track_id'], e['event'], e['dwell']))
+
+        if rows:
+            storage_service.log_detections_bulk(rows)
+        segment.events = len(rows)
+
+
+video_job_manager = VideoJobManager(
+    vision_service,
+    max_concurrent=Config.VIDEO_JOB_MAX_CONCURRENT,
+    max_inflight=Config.VIDEO_JOB_MAX_INFLIGHT
+)
@@ -1,156 +1,361 @@
-import cv2
-import numpy as np
-from ultralytics import YOLO
 import threading
 import time
 import os
-import csv
+import atexit
+import hashlib
+import gc
 import logging
 from app.services.storage_service import storage_service
 from app.core.config import Config
+from app.core.metrics import pipeline_timers, RssSampler
 from app.services.label_normalizer import normalize_label
 from app.services.disease_features import get_disease_features
+from app.services.inference_scheduler import InferenceScheduler, PriorityClass, INTERACTIVE, LIVE, BACKGROUND
+from app.services.inference_engines import create_engine
+from app.services.inference_pool import ProcessPoolEngine
+from app.services.camera_worker import CameraWorker, parse_camera_sources, parse_source
+from app.services.overlay import draw_detections
+from app.services.rate_controller import AdaptiveRateController
+from app.services.result_cache import ResultCache, perceptual_hash
+from app.services.detection_log_writer import DetectionLogWriter
+from app.services.tiling import TiledAnalysis
+from app.services.model_swap import ModelFileWatcher, warm_up, smoke_check
+from app.services.upload_decoder import UploadDecoder
 
 logger = logging.getLogger(__name__)
 
 class VisionService:
     def __init__(self):
-        self.camera = None
-        self.model = None
+        self.engine = None
+        self.engine_name = Config.INFERENCE_ENGINE
+        self.model_fingerprint = None
         self.lock = threading.Lock()
-        self.latest_detections_display = ["Initializing..."]
         
-        # State
-        self.output_frame = None
-        self.thread = None
-        self.running = False
+        # Hot-swap state: batches lease the engine they run on so a replaced model
+        # is only closed once its in-flight batch has finished
+        self.engine_cond = threading.Condition()
+        self.engine_leases = {}
+        self.reload_thread = None
+        self.reload_status = {"state": "idle"}
+        self.model_watcher = None
+        
+        # Camera registry: one capture worker per source, all sharing one model
+        self.cameras = {}
+        for i, (camera_id, source) in enumerate(parse_camera_sources(Config.CAMERA_SOURCES).items()):
+            # The first camera keeps the historical 'webcam' source tag
+            self.add_camera(camera_id, source, source_tag="webcam" if i == 0 else None)
+        
+        # Paces the live loops to the configured FPS / CPU / HTTP latency budget
+        self.rate_controller = AdaptiveRateController(
+            target_fps=Config.VISION_TARGET_FPS,
+            cpu_budget=Config.VISION_CPU_BUDGET,
+            http_latency_target_ms=Config.HTTP_LATENCY_TARGET_MS,
+            imgsz_steps=Config.VISION_IMGSZ_STEPS
+        )
+        
+        # Upload analysis cache (exact + near-duplicate)
+        self.result_cache = ResultCache(
+            max_entries=Config.RESULT_CACHE_SIZE,
+            max_distance=Config.RESULT_CACHE_MAX_DISTANCE,
+            persist=Config.RESULT_CACHE_PERSIST
+        )
+        
+        # Shared micro-batching queue in front of the model: uploads first, then cameras, then background jobs
+        self.scheduler = InferenceScheduler(
+            self._predict_batch,
+            max_batch=Config.INFERENCE_MAX_BATCH,
+            max_wait_ms=Config.INFERENCE_MAX_WAIT_MS,
+            classes=[
+                PriorityClass(INTERACTIVE, Config.INFERENCE_INTERACTIVE_MAX, Config.INFERENCE_INTERACTIVE_DEADLINE_MS),
+                PriorityClass(LIVE, Config.INFERENCE_LIVE_MAX, Config.INFERENCE_LIVE_DEADLINE_MS, shed_when_full=True),
+                PriorityClass(BACKGROUND, Config.INFERENCE_BACKGROUND_MAX, Config.INFERENCE_BACKGROUND_DEADLINE_MS),
+            ],
+            interactive_p99_target_ms=Config.INTERACTIVE_P99_TARGET_MS,
+            degrade_imgsz=min(Config.VISION_IMGSZ_STEPS) if Config.VISION_IMGSZ_STEPS else None
+        )
+        
+        # High-resolution uploads: overlapping model-resolution tiles through the same scheduler
+        self.tiler = TiledAnalysis(
+            self.scheduler,
+            tile_size=Config.TILE_SIZE,
+            overlap=Config.TILE_OVERLAP,
+            iou_threshold=Config.MODEL_IOU
+        )
+        
+        # Uploads: size-limited streaming reads into pooled buffers, reduced-resolution decode
+        self.upload_decoder = UploadDecoder(
+            max_bytes=Config.MAX_UPLOAD_BYTES,
+            chunk_size=Config.UPLOAD_CHUNK_SIZE,
+            pool_size=Config.UPLOAD_BUFFER_POOL,
+            min_side=Config.MODEL_IMGSZ,
+            reduced_decode=Config.UPLOAD_REDUCED_DECODE
+        )
         
         # Logging State
         self.last_logged_time = {} 
         self.rolling_history = [] 
         self.frame_count = 0
+        self.detection_counts = {}  # source -> detections recorded
         
-        # CSV Logging
-        self.log_file_csv = "logs/detections_log.csv"
-        os.makedirs("logs", exist_ok=True)
-        if not os.path.exists(self.log_file_csv):
-            with open(self.log_file_csv, mode='w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Frame", "Timestamp", "Plant", "Disease", "Confidence", "Source"])
+        # CSV Logging (buffered background writer, rotated by size/day)
+        self.log_file_csv = Config.CSV_LOG_PATH
+        self.csv_writer = DetectionLogWriter(
+            self.log_file_csv,
+            ["Frame", "Timestamp", "Plant", "Disease", "Confidence", "Source", "TrackId", "Event", "Dwell"],
+            max_queue=Config.CSV_LOG_QUEUE_SIZE,
+            batch_size=Config.CSV_LOG_BATCH_SIZE,
+            flush_interval=Config.CSV_LOG_FLUSH_INTERVAL,
+            max_bytes=Config.CSV_LOG_MAX_BYTES,
+            rotate_daily=Config.CSV_LOG_ROTATE_DAILY
+        )
+        atexit.register(self.csv_writer.close)
+
+    def _build_engine(self, engine_name, model_path=None):
+        """Builds and loads an engine (in worker processes when INFERENCE_WORKERS > 0)."""
+        if Config.INFERENCE_WORKERS > 0:
+            # Model runs in worker processes; frames are handed over via shared memory
+            return ProcessPoolEngine(engine_name, model_path, workers=Config.INFERENCE_WORKERS).load()
+        return create_engine(engine_name, model_path).load()
 
     def load_model(self):
-        if self.model is None:
-            path = Config.MODEL_PATH
-            logger.info(f"Loading YOLO model from {path}...")
+        if self.engine is None:
             try:
-                self.model = YOLO(path)
+                engine = self._build_engine(self.engine_name)
+                self.model_fingerprint = self._model_fingerprint(engine.model_path)
+                self.engine = engine
+                logger.info(f"Inference engine '{self.engine.name}' ready.")
             except Exception as e:
                 logger.error(f"Failed to load model: {e}")
-                self.model = None
-
-    def start_processing(self):
-        """Starts the background thread for camera processing if not running."""
-        if self.thread is None or not self.thread.is_alive():
-            self.running = True
-            self.thread = threading.Thread(target=self._process_loop, daemon=True)
-            self.thread.start()
-            logger.info("Vision processing thread started.")
-
-    def _process_loop(self):
-        """Main loop that reads camera and runs inference."""
-        self.get_camera() # Ensure camera is open
-        if not self.camera or not self.camera.isOpened():
-             logger.error("Camera could not be opened. Exiting loop.")
-             return
-
-        if self.model is None:
-            self.load_model()
-
-        while self.running:
-            success, frame = self.camera.read()
-            if not success:
-                logger.warning("Camera read failed. Retrying...")
-                # Simple retry logic
-                self.camera.release()
-                time.sleep(1)
-                self.camera = cv2.VideoCapture(Config.CAMERA_INDEX)
-                continue
-
-            self.frame_count += 1
+                self.engine = None
+                return
             
-            # Run Inference
-            annotated_frame, detections = self.detect_on_frame(frame, source="webcam")
-            
-            # Update Lock-protected State
-            with self.lock:
-                self.output_frame = annotated_frame.copy()
-            
-            # Update Detections Display
-            current_probs = [f"Detected: {d['label']} ({d['confidence']:.2f})" for d in detections]
-            if not current_probs:
-                current_probs = ["Monitoring..."]
-            self.latest_detections_display = current_probs
-            
-            # Sleep slightly to limit CPU usage if needed, or run full speed
-            # time.sleep(0.01) 
+            if Config.MODEL_WATCH and self.model_watcher is None:
+                self.model_watcher = ModelFileWatcher(
+                    lambda: self.engine.model_path if self.engine else None,
+                    self._on_model_file_changed,
+                    interval=Config.MODEL_WATCH_INTERVAL
+                )
+                self.model_watcher.start()
+
+    def _on_model_file_changed(self, path):
+        # Already running this exact file (e.g. an admin reload got there first)
+        if self._model_fingerprint(path) != self.model_fingerprint:
+            self.reload_model(model_path=path, wait=True)
+
+    def reload_model(self, model_path=None, engine_name=None, wait=False):
+        """
+        Loads a model in the background and swaps it in without stopping streams or uploads.
+        Defaults to re-reading the current model file. Returns False if a reload is already running.
+        """
+        with self.lock:
+            if self.reload_thread and self.reload_thread.is_alive():
+                return False
+            engine_name = engine_name or self.engine_name
+            if model_path is None and self.engine is not None and engine_name == self.engine_name:
+                model_path = self.engine.model_path
+            self.reload_status = {
+                "state": "loading",
+                "engine": engine_name,
+                "model_path": model_path,
+                "started": time.time()
+            }
+            self.reload_thread = threading.Thread(target=self._reload, args=(engine_name, model_path), daemon=True)
+            self.reload_thread.start()
+        if wait:
+            self.reload_thread.join()
+        return True
+
+    def _reload(self, engine_name, model_path):
+        started = time.perf_counter()
+        status = self.reload_status
+        try:
+            candidate = self._build_engine(engine_name, model_path)
+        except Exception as e:
+            logger.error(f"Model reload failed to load: {e}")
+            status.update(state="failed", error=f"Load failed: {e}")
+            return
+        status["model_path"] = candidate.model_path
+
+        try:
+            # Warm every input size the live loop may switch to; pool engines warm each worker
+            status["state"] = "warming"
+            sizes = sorted(set(self.rate_controller.imgsz_steps) | {Config.MODEL_IMGSZ})
+            warm_up(candidate, sizes, rounds=Config.MODEL_WARMUP_ROUNDS,
+                    batch=len(getattr(candidate, 'workers', [])) or 1)
+
+            status["state"] = "checking"
+            ok, report = smoke_check(candidate, Config.GOLDEN_IMAGES_DIR)
+            status["smoke_check"] = report
+            if not ok:
+                raise RuntimeError(f"Smoke check failed on {len(report['failures'])} golden image(s)")
+        except Exception as e:
+            logger.error(f"Model reload rejected: {e}")
+            candidate.close()
+            status.update(state="failed", error=str(e))
+            return
+
+        # Atomic swap: batches collected from now on run on the new engine
+        with self.engine_cond:
+            old = self.engine
+            self.engine = candidate
+            self.engine_name = engine_name
+            self.model_fingerprint = self._model_fingerprint(candidate.model_path)
+            # Let the batch that may still be running on the old engine finish
+            drained = self.engine_cond.wait_for(lambda: self.engine_leases.get(id(old), 0) == 0, timeout=30)
+        if old is not None:
+            if not drained:
+                logger.warning("Old model still busy after 30s; closing it anyway.")
+            old.close()
+            del old
+            gc.collect()
 
-    def get_camera(self):
-        if self.camera is None or not self.camera.isOpened():
-            logger.info("Opening Camera...")
-            self.camera = cv2.VideoCapture(Config.CAMERA_INDEX)
-            time.sleep(0.5)
-        return self.camera
+        status.update(state="ready", swapped=time.time(), duration_ms=round((time.perf_counter() - started) * 1000, 2))
+        logger.info(f"Model hot-swapped to '{candidate.model_path}' ({candidate.name}).")
+
+    def get_model_status(self):
+        return {
+            "engine": self.engine.name if self.engine else None,
+            "model_path": self.engine.model_path if self.engine else None,
+            "fingerprint": self.model_fingerprint,
+            "watching": bool(self.model_watcher and self.model_watcher.running),
+            "last_reload": dict(self.reload_status)
+        }
+
+    def add_camera(self, camera_id, source, source_tag=None, capture_factory=None):
+        """Registers a camera. Its threads start when first streamed or started."""
+        with self.lock:
+            if camera_id in self.cameras:
+                raise ValueError(f"Camera '{camera_id}' already exists.")
+            worker = CameraWorker(self, camera_id, parse_source(source), source_tag, capture_factory)
+            self.cameras[camera_id] = worker
+        return worker
+
+    def remove_camera(self, camera_id):
+        with self.lock:
+            worker = self.cameras.pop(camera_id, None)
+        if worker:
+            worker.stop()
+        return worker is not None
+
+    def get_camera_worker(self, camera_id=None):
+        """Returns the worker for camera_id (the first registered camera by default), or None."""
+        if camera_id is None:
+            return next(iter(self.cameras.values()), None)
+        return self.cameras.get(camera_id)
+
+    def start_processing(self, camera_id=None):
+        """Starts the background capture and inference threads for a camera if not running."""
+        worker = self.get_camera_worker(camera_id)
+        if worker:
+            worker.start()
+
+    def get_pipeline_stats(self):
+        """Per-stage counters for the live pipeline (captured, dropped, inferred) per camera."""
+        return {
+            "cameras": {cid: w.status() for cid, w in list(self.cameras.items())},
+            "inference": self.scheduler.stats(),
+            "rate_controller": self.rate_controller.stats(),
+            "csv_log": self.csv_writer.stats(),
+            "uploads": self.upload_decoder.stats(),
+            "model": self.get_model_status()
+        }
+
+    def list_cameras(self):
+        return [w.status() for w in list(self.cameras.values())]
 
     def release_resources(self):
-        self.running = False
-        if self.thread:
-            self.thread.join()
-        if self.camera:
-            self.camera.release()
-            self.camera = None
-
-    def should_log_db(self, label):
-        """Debounce DB logging."""
+        if self.model_watcher:
+            self.model_watcher.stop()
+        for worker in list(self.cameras.values()):
+            worker.stop()
+        self.scheduler.stop()
+        self.csv_writer.close()
+        if self.engine:
+            self.engine.close()
+            self.engine = None
+
+    def _predict_batch(self, frames, imgsz=None):
+        """Runs one batched model call. Only ever invoked from the scheduler thread."""
+        with self.engine_cond:
+            engine = self.engine
+            self.engine_leases[id(engine)] = self.engine_leases.get(id(engine), 0) + 1
+        try:
+            results = engine.predict(frames, imgsz=imgsz)
+            for result in results:
+                for stage, ms in result.timings.items():
+                    pipeline_timers.observe(stage, ms)
+            return results
+        finally:
+            with self.engine_cond:
+                self.engine_leases[id(engine)] -= 1
+                if not self.engine_leases[id(engine)]:
+                    del self.engine_leases[id(engine)]
+                self.engine_cond.notify_all()
+
+    def should_log_db(self, label, source="webcam"):
+        """Debounce DB logging (per source, so cameras do not mask each other)."""
         now = time.time()
-        last = self.last_logged_time.get(label, 0)
+        key = (source, label)
+        last = self.last_logged_time.get(key, 0)
         if last == 0 or (now - last) > Config.LOG_COOLDOWN:
-            self.last_logged_time[label] = now
+            self.last_logged_time[key] = now
             return True
         return False
 
-    def detect_on_frame(self, frame, source="webcam"):
-        """Runs inference on a frame and returns annotated frame + detections list."""
-        detections = []
-        annotated_frame = frame
+    def _record_detection(self, display_label, conf, source, event=None):
+        """
+        Writes one (normalized) detection to the CSV log and the DB.
+        Track events (`event` from a DetectionTracker) are always written; plain
+        detections (uploads) are debounced per label.
+        """
+        # Log to CSV (using normalized label); only enqueues, the writer thread touches the disk
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.detection_counts[source] = self.detection_counts.get(source, 0) + 1
+        track_id, kind, dwell = (event['track_id'], event['event'], event['dwell']) if event else ("", "", "")
+        # We can store the normalized label in the 'Disease' column or split it if preferred.
+        # For simplicity, we put normalized label in 'Disease' and 'Unknown' in Plant if not parsing.
+        with pipeline_timers.time("csv_write"):
+            self.csv_writer.write([self.frame_count, timestamp, "Agri-Plant", display_label, f"{conf:.4f}", source,
+                                   track_id, kind, dwell])
         
-        if self.model:
-            results = self.model.predict(frame, verbose=False, conf=Config.MODEL_CONFIDENCE)
-            annotated_frame = results[0].plot()
-            
-            # Extract results
-            found_items = []
+        # Log to DB (Debounced unless it is a track event)
+        if event or self.should_log_db(display_label, source):
+            with pipeline_timers.time("db_write"):
+                if event:
+                    storage_service.log_detection(display_label, conf, source, track_id=track_id, event=kind, dwell=dwell)
+                else:
+                    storage_service.log_detection(display_label, conf, source)
             
-            if hasattr(results[0], 'boxes') and results[0].boxes is not None:
-                for box in results[0].boxes:
-                    conf = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    label = results[0].names[cls_id]
-                    found_items.append((label, conf))
-                    
-            if hasattr(results[0], 'probs') and results[0].probs is not None:
-                try:
-                    top1_index = results[0].probs.top1
-                    top1_conf = float(results[0].probs.top1conf)
-                    if top1_conf > Config.MODEL_CONFIDENCE:
-                        label = results[0].names[top1_index]
-                        found_items.append((label, top1_conf))
-                except Exception:
-                    pass
-
-            # Log raw results for debugging
-            logger.info(f"Raw YOLO Results: {found_items}")
-
-            for raw_label_from_model, conf in found_items:
+            # Update rolling history
+            self.rolling_history.append({
+                "label": display_label,
+                "confidence": conf,
+                "timestamp": time.strftime("%H:%M:%S")
+            })
+            if len(self.rolling_history) > 20:
+                self.rolling_history.pop(0)
+
+    def record_track_events(self, events, source):
+        """Logs tracker events (start / peak / end) instead of every per-frame detection."""
+        for e in events:
+            self._record_detection(e['label'], e['confidence'], source, event=e)
+
+    def _enrich_and_record(self, raw_detections, source, tracker=None):
+        """
+        Normalizes labels, adds disease features and logs the detections:
+        each one, or only the tracker's events when a tracker is given.
+        """
+        detections = []
+
+        # Extract results
+        found_items = [(d['label'], d['confidence'], d['box']) for d in raw_detections]
+
+        # Log raw results for debugging (per frame, so only at debug level)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Raw YOLO Results: {found_items}")
+
+        with pipeline_timers.time("enrich"):
+            for raw_label_from_model, conf, box in found_items:
                 # 1. Normalize the label IMMEDIATELY
                 display_label = normalize_label(raw_label_from_model)
                 
@@ -160,82 +365,170 @@ class VisionService:
                 detection_obj = {
                     "label": display_label,
                     "confidence": conf,
-                    "features": features
+                    "features": features,
+                    "box": box
                 }
                 detections.append(detection_obj)
-                
-                # 3. Log to CSV (using normalized label)
-                timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
-                with open(self.log_file_csv, mode='a', newline='') as f:
-                    writer = csv.writer(f)
-                    # We can store the normalized label in the 'Disease' column or split it if preferred.
-                    # For simplicity, we put normalized label in 'Disease' and 'Unknown' in Plant if not parsing.
-                    writer.writerow([self.frame_count, timestamp, "Agri-Plant", display_label, f"{conf:.4f}", source])
-                
-                # 4. Log to DB (Debounced)
-                if self.should_log_db(display_label):
-                    storage_service.log_detection(display_label, conf, source)
-                    
-                    # Update rolling history
-                    self.rolling_history.append({
-                        "label": display_label,
-                        "confidence": conf,
-                        "timestamp": time.strftime("%H:%M:%S")
-                    })
-                    if len(self.rolling_history) > 20:
-                        self.rolling_history.pop(0)
 
-        return annotated_frame, detections
+        # 3 & 4. Log to CSV and DB
+        if tracker is not None:
+            self.record_track_events(tracker.update(detections), source)
+        else:
+            for d in detections:
+                self._record_detection(d['label'], d['confidence'], source)
 
-    def generate_frames(self):
-        """Generator for MJPEG stream."""
-        # Ensure processing is running
-        self.start_processing()
+        return detections
+
+    def detect_on_frame(self, frame, source="webcam", imgsz=None, annotate=False, tracker=None, priority=LIVE):
+        """
+        Runs inference on a frame and returns (frame, detections list).
+        With annotate=True the returned frame is a copy with the overlay drawn from
+        the detection list; otherwise the input frame is returned untouched.
+        With a tracker only track start / peak / end events are logged.
+        `priority` is the scheduler class (interactive / live / background).
+        """
+        detections = []
+        annotated_frame = frame
         
-        while True:
-            with self.lock:
-                if self.output_frame is None:
-                    continue
-                # Encode the frame in Jpeg format
-                (flag, encodedImage) = cv2.imencode(".jpg", self.output_frame)
-            
-            if not flag:
-                continue
-                
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + bytearray(encodedImage) + b'\r\n')
-            
-            # Simple throttle to control stream FPS
-            time.sleep(0.05) 
+        if self.engine:
+            result = self.scheduler.predict(frame, imgsz=imgsz, priority=priority)
+            detections = self._enrich_and_record(result.detections, source, tracker=tracker)
+
+            if annotate:
+                with pipeline_timers.time("draw"):
+                    annotated_frame = draw_detections(frame, detections)
+
+        return annotated_frame, detections
 
-    def predict_image_file(self, file_stream):
-        """Process an uploaded image."""
+    def generate_frames(self, camera_id=None):
+        """Generator for MJPEG stream (first registered camera by default)."""
+        worker = self.get_camera_worker(camera_id)
+        if worker is None:
+            return iter(())
+        return worker.stream()
+
+    def predict_image_file(self, file_stream, tiled=False):
+        """
+        Process an uploaded image.
+        With tiled=True large images are analysed as overlapping model-resolution
+        tiles (for small lesions/pests on drone and high-resolution field shots).
+        """
         # Ensure model loaded
-        if self.model is None:
+        if self.engine is None:
             self.load_model()
             
-        npimg = np.frombuffer(file_stream.read(), np.uint8)
-        frame = cv2.imdecode(npimg, cv2.IMREAD_COLOR)
-        
-        valid_detections = []
-        if frame is not None:
-             _, valid_detections = self.detect_on_frame(frame, source="upload")
+        rss = RssSampler()
+        try:
+            with self.upload_decoder.read(file_stream) as body:
+                rss.sample()
+                valid_detections, tiling = self._analyze_upload(body.data, tiled=tiled, rss=rss)
+        finally:
+            self.upload_decoder.record_request(rss)
 
         # Task 4 & 6: Construct structured response
         if not valid_detections:
-            return {"has_disease": False}
-        
-        # Get best detection
-        best_detection = max(valid_detections, key=lambda x: x['confidence'])
-        
-        return {
-            "has_disease": True,
-            "disease": best_detection['label'],
-            "confidence": best_detection['confidence'],
-            "features": best_detection.get('features', [])
-        }
+            response = {"has_disease": False}
+        else:
+            # Get best detection
+            best_detection = max(valid_detections, key=lambda x: x['confidence'])
+            
+            response = {
+                "has_disease": True,
+                "disease": best_detection['label'],
+                "confidence": best_detection['confidence'],
+                "features": best_detection.get('features', [])
+            }
+
+        response["detections"] = [
+            {"label": d['label'], "confidence": d['confidence'], "box": d.get('box')}
+            for d in valid_detections
+        ]
+        if tiled:
+            response["tiling"] = tiling
+        return response
+
+    @staticmethod
+    def _model_fingerprint(path):
+        """Identifies a model file (path + size + mtime), taken when it is loaded."""
+        try:
+            st = os.stat(path)
+            return f"{os.path.abspath(path)}:{st.st_size}:{int(st.st_mtime)}"
+        except OSError:
+            return os.path.abspath(path)
+
+    @staticmethod
+    def _scale_boxes(detections, scale):
+        """Maps boxes from a reduced-resolution decode back to original image pixels."""
+        if scale == 1.0:
+            return detections
+        return [dict(d, box=[v * scale for v in d['box']]) if d.get('box') else d for d in detections]
+
+    def _analyze_upload(self, data, tiled=False, rss=None):
+        """
+        Detections (and tiling report, if tiled) for uploaded image bytes,
+        served from the result cache when possible.
+        """
+        self.result_cache.ensure_model(self.model_fingerprint or self._model_fingerprint(Config.MODEL_PATH))
+
+        # Tiled and whole-image results differ, so they are cached separately.
+        # Near-duplicate matching is skipped for tiled mode: small lesions are exactly
+        # what a perceptual hash cannot see.
+        content_hash = hashlib.sha256(data).hexdigest() + (":tiled" if tiled else "")
+        cached = self.result_cache.get(content_hash)
+        if cached is None:
+            # Tiles need every pixel; whole-image analysis is decoded near the model input size
+            frame, scale = self.upload_decoder.decode(data, full_resolution=tiled)
+            if frame is None:
+                return [], None
+            if rss:
+                rss.sample()
+
+            # Boxes are reported in original image pixels
+            size = (int(round(frame.shape[1] * scale)), int(round(frame.shape[0] * scale)))
+            phash = None if tiled else perceptual_hash(frame)
+            if tiled:
+                self.result_cache.record_miss()
+                cached = None
+            else:
+                cached = self.result_cache.get_similar(phash, size)
+            if cached is None:
+                started = time.perf_counter()
+                tiling = None
+                if tiled and self.engine:
+                    raw_detections, tiling = self.tiler.run(frame)
+                    detections = self._enrich_and_record(raw_detections, "upload")
+                else:
+                    _, detections = self.detect_on_frame(frame, source="upload", priority=INTERACTIVE)
+                    detections = self._scale_boxes(detections, scale)
+                if rss:
+                    rss.sample()
+                if self.engine:
+                    # Tiled entries carry no perceptual hash, so only the exact same upload (in tiled mode) gets them
+                    self.result_cache.put(content_hash, phash, detections, (time.perf_counter() - started) * 1000, size)
+                return detections, tiling
+
+        # Cache hit: still record the detections so history and chat context stay accurate
+        for d in cached:
+            self._record_detection(d['label'], d['confidence'], "upload")
+        return cached, ({"cached": True} if tiled else None)
+
+    def get_cache_stats(self):
+        return self.result_cache.stats()
+
+    def get_upload_stats(self):
+        return self.upload_decoder.stats()
+
+    def get_snapshot(self, camera_id=None):
+        """JPEG bytes of the latest frame with its overlay, or None if no frame is available."""
+        worker = self.get_camera_worker(camera_id)
+        if worker is None:
+            return None
+        return worker.snapshot()
 
-    def get_latest_status(self):
-        return self.latest_detections_display
+    def get_latest_status(self, camera_id=None):
+        worker = self.get_camera_worker(camera_id)
+        if worker is None:
+            return ["No camera configured."]
+        return worker.latest_detections_display
 
 vision_service = VisionService()
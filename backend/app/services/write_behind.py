@@ -0,0 +1,277 @@
+import sqlite3
+import threading
+import time
+import logging
+from app.core.metrics import Histogram, STAGE_BUCKETS_MS
+
+logger = logging.getLogger(__name__)
+
+# Rows per group commit
+COMMIT_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+
+class WriteBehindWriter:
+    """
+    Background ingestion queue for append-only tables (detections, sensors).
+
+    Callers only allocate an id and enqueue the row; a writer thread group-
+    commits queued rows with one `executemany` per table in a single
+    transaction once `batch_size` rows are waiting or the oldest has waited
+    `flush_interval` seconds.
+
+    Ids are allocated here rather than by SQLite, so a row has its final id
+    from the moment it is accepted. Rows stay in `pending` until their commit
+    finishes; readers take `pending_rows()` *before* querying the database and
+    merge by id, so an accepted row is always visible exactly once.
+
+    At most `max_pending` rows wait at a time. Beyond that callers block for
+    up to `block_timeout` seconds, then write their rows themselves, so a
+    stalled disk slows producers down instead of growing memory or losing rows.
+    """
+    def __init__(self, database, tables, batch_size=500, flush_interval=0.5, max_pending=20000, block_timeout=2.0,
+                 on_renumber=None):
+        self.db = database
+        self.tables = tables  # name -> column names, starting with "id"
+        self.batch_size = max(1, min(batch_size, max_pending))
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.block_timeout = block_timeout
+        self.on_renumber = on_renumber  # Called with (table, new ids) after rows had to change ids
+
+        self.condition = threading.Condition()
+        self.queue = []  # (table, id) in arrival order, not yet taken by the writer
+        self.pending = {table: {} for table in tables}  # id -> row, accepted but not committed
+        self.pending_count = 0
+        self.next_ids = {}
+        self.first_queued = None
+        self.thread = None
+        self.running = False
+
+        self.accepted = 0
+        self.committed = 0
+        self.batches = 0
+        self.blocked = 0
+        self.direct_writes = 0
+        self.failures = 0
+        self.renumbered = 0
+        self.commit_ms = Histogram(STAGE_BUCKETS_MS)
+        self.batch_sizes = Histogram(COMMIT_SIZE_BUCKETS)
+
+    def start(self):
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                self.running = True
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def close(self, timeout=10.0):
+        """Commits everything still queued and stops the writer thread."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+        if self.pending_count:
+            logger.warning(f"Write-behind queue closed with {self.pending_count} uncommitted rows.")
+
+    def flush(self, timeout=10.0):
+        """Blocks until every row accepted so far is committed. Returns False on timeout."""
+        with self.condition:
+            if self.queue:
+                self.first_queued = 0.0  # Don't wait out the flush interval
+                self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending_count, timeout)
+
+    # --- Producers ---
+
+    def write(self, table, values):
+        """Accepts one row (column values without the id). Returns its id."""
+        return self.write_many(table, [values])[0]
+
+    def write_many(self, table, rows):
+        """Accepts several rows of one table. Returns their ids."""
+        if not rows:
+            return []
+        self.start()
+        deadline = time.monotonic() + self.block_timeout
+        with self.condition:
+            direct = False
+            # A batch larger than the whole queue is still let in once the queue is empty
+            while self.pending_count and self.pending_count + len(rows) > self.max_pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    direct = True
+                    break
+                self.blocked += 1
+                self.condition.wait(remaining)
+
+            ids = self._allocate(table, len(rows))
+            target = self.pending[table]
+            for row_id, values in zip(ids, rows):
+                target[row_id] = (row_id,) + tuple(values)
+            self.pending_count += len(rows)
+            self.accepted += len(rows)
+            if not direct:
+                if not self.queue:
+                    self.first_queued = time.monotonic()
+                self.queue.extend((table, row_id) for row_id in ids)
+                self.condition.notify_all()
+
+        if direct:
+            # Backpressure: the queue is still full, so this caller pays for its own commit
+            self.direct_writes += len(rows)
+            ok, entries = self._commit([(table, row_id) for row_id in ids])
+            if not ok:
+                with self.condition:
+                    self.queue.extend(entries)
+                    self.condition.notify_all()
+        return ids
+
+    def _allocate(self, table, count):
+        """Reserves `count` consecutive ids. Caller holds the condition."""
+        if table not in self.next_ids:
+            self.next_ids[table] = self._max_id(table) + 1
+        first = self.next_ids[table]
+        self.next_ids[table] = first + count
+        return list(range(first, first + count))
+
+    def _max_id(self, table):
+        # sqlite_sequence remembers ids of rows since moved out of the table (partitions)
+        with self.db.connection() as conn:
+            current = conn.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+            sequence = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        return max(current, sequence[0] if sequence else 0)
+
+    def reset_ids(self):
+        """Forgets allocated ids (after the tables were emptied)."""
+        with self.condition:
+            self.next_ids = {}
+
+    # --- Readers ---
+
+    def pending_rows(self, table):
+        """Accepted, not yet committed rows of `table` as dicts (oldest first)."""
+        columns = self.tables[table]
+        with self.condition:
+            rows = list(self.pending[table].values())
+        return [dict(zip(columns, row)) for row in rows]
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                # Group commit: let rows gather until the batch is full or the oldest is due
+                while self.running and len(self.queue) < self.batch_size:
+                    remaining = self.first_queued + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.queue:
+                    return  # Stopped and drained
+                taken, self.queue = self.queue[:self.batch_size], self.queue[self.batch_size:]
+                if self.queue:
+                    self.first_queued = time.monotonic()
+
+            ok, taken = self._commit(taken)
+            if ok:
+                continue
+            with self.condition:
+                running = self.running
+                if running:
+                    # Put the batch back in front and retry after a pause (the DB may be locked)
+                    self.queue = taken + self.queue
+                    self.first_queued = time.monotonic()
+            if not running:
+                with self.condition:
+                    taken, self.queue = taken + self.queue, []
+                logger.error(f"Dropping {len(taken)} rows that could not be committed at shutdown.")
+                self._discard(taken)
+                return
+            time.sleep(min(1.0, self.flush_interval * 2))
+
+    def _commit(self, entries):
+        """
+        Inserts the given (table, id) rows in one transaction. Returns (ok, entries);
+        entries carry new ids if they had to be re-numbered.
+        """
+        started = time.perf_counter()
+        for attempt in (1, 2):
+            with self.condition:
+                by_table = {}
+                for table, row_id in entries:
+                    by_table.setdefault(table, []).append(self.pending[table][row_id])
+            try:
+                with self.db.transaction() as conn:
+                    for table, rows in by_table.items():
+                        columns = self.tables[table]
+                        conn.executemany(
+                            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                            rows)
+                break
+            except sqlite3.IntegrityError as e:
+                if attempt == 2:
+                    return self._failed(entries, e), entries
+                # Another process inserted rows since our ids were allocated
+                entries = self._renumber(entries)
+            except sqlite3.Error as e:
+                return self._failed(entries, e), entries
+
+        self.commit_ms.observe((time.perf_counter() - started) * 1000)
+        self.batch_sizes.observe(len(entries))
+        self._discard(entries)
+        with self.condition:
+            self.committed += len(entries)
+            self.batches += 1
+        return True, entries
+
+    def _failed(self, entries, error):
+        self.failures += 1
+        logger.error(f"Write-behind commit of {len(entries)} rows failed: {error}")
+        return False
+
+    def _discard(self, entries):
+        with self.condition:
+            for table, row_id in entries:
+                if self.pending[table].pop(row_id, None) is not None:
+                    self.pending_count -= 1
+            self.condition.notify_all()
+
+    def _renumber(self, entries):
+        """Moves the given rows to fresh ids past the table's current maximum."""
+        with self.condition:
+            for table in {t for t, _ in entries}:
+                self.next_ids[table] = max(self.next_ids.get(table, 1), self._max_id(table) + 1)
+            renumbered = []
+            for table, row_id in entries:
+                row = self.pending[table].pop(row_id)
+                new_id = self._allocate(table, 1)[0]
+                self.pending[table][new_id] = (new_id,) + row[1:]
+                renumbered.append((table, new_id))
+            self.renumbered += len(entries)
+        logger.warning(f"Re-numbered {len(entries)} queued rows after an id collision.")
+        if self.on_renumber:
+            for table in {t for t, _ in renumbered}:
+                self.on_renumber(table, [row_id for t, row_id in renumbered if t == table])
+        return renumbered
+
+    def stats(self):
+        with self.condition:
+            return {
+                "pending": self.pending_count,
+                "queued": len(self.queue),
+                "max_pending": self.max_pending,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "accepted": self.accepted,
+                "committed": self.committed,
+                "batches": self.batches,
+                "blocked": self.blocked,
+                "direct_writes": self.direct_writes,
+                "failures": self.failures,
+                "renumbered": self.renumbered,
+                "commit_ms": self.commit_ms.snapshot(),
+                "rows_per_commit": self.batch_sizes.snapshot()
+            }
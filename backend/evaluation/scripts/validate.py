@@ -2,24 +2,36 @@ from ultralytics import YOLO
 from pathlib import Path
 
 # Paths
-MODEL_PATH = Path("../../models/best.pt")
-DATA_YAML = Path("../../scripts/dlcpd_dataset.yaml")
-
-# Load model
-model = YOLO(str(MODEL_PATH))
-
-# Run validation
-metrics = model.val(
-    data=str(DATA_YAML),
-    split="val",
-    project="../results",
-    name="val",
-    save_json=True
-)
-
-# Print key metrics (for terminal + viva)
-print("\n=== VALIDATION METRICS ===")
-print(f"mAP@0.5       : {metrics.box.map50:.4f}")
-print(f"mAP@0.5:0.95  : {metrics.box.map:.4f}")
-print(f"Precision     : {metrics.box.mp:.4f}")
-print(f"Recall        : {metrics.box.mr:.4f}")
+SCRIPT_DIR = Path(__file__).resolve().parent
+MODEL_PATH = SCRIPT_DIR / "../../models/best.pt"
+DATA_YAML = SCRIPT_DIR / "../../scripts/dlcpd_dataset.yaml"
+RESULTS_DIR = SCRIPT_DIR / "../results"
+
+
+def validate(model_path=MODEL_PATH, data_yaml=DATA_YAML, name="val", imgsz=640):
+    """Runs YOLO validation for a .pt or exported (.onnx) model and returns the metrics."""
+    # Load model
+    model = YOLO(str(model_path))
+
+    # Run validation
+    return model.val(
+        data=str(data_yaml),
+        split="val",
+        imgsz=imgsz,
+        project=str(RESULTS_DIR),
+        name=name,
+        save_json=True
+    )
+
+
+def print_metrics(metrics):
+    # Print key metrics (for terminal + viva)
+    print("\n=== VALIDATION METRICS ===")
+    print(f"mAP@0.5       : {metrics.box.map50:.4f}")
+    print(f"mAP@0.5:0.95  : {metrics.box.map:.4f}")
+    print(f"Precision     : {metrics.box.mp:.4f}")
+    print(f"Recall        : {metrics.box.mr:.4f}")
+
+
+if __name__ == "__main__":
+    print_metrics(validate())
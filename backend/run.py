@@ -4,8 +4,21 @@ load_dotenv()
 from app import create_app
 from app.core.config import Config
 
-app = create_app()
+_app = None
+
+
+def __getattr__(name):
+    # "run:app" for WSGI servers, built on first access: spawned inference workers
+    # (INFERENCE_WORKERS) re-import this module and must not start a second app
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
+    app = __getattr__("app")
     print(f"🚀 Starting Agri-Backend on port {Config.PORT}...")
     app.run(host='0.0.0.0', port=Config.PORT, debug=Config.DEBUG)
@@ -0,0 +1,182 @@
+"""
+Measures SQLite throughput for the storage access patterns of the app, with
+the legacy one-connection-per-call setup ("before") and the pooled WAL
+DatabaseManager ("after"), each on its own scratch database.
+
+Workloads:
+  insert - single-row detection inserts, one commit each (live loop logging)
+  read   - recent detections + 5-minute summary queries (chat context)
+  mixed  - one writer thread inserting continuously while reader threads query;
+           reports reader throughput and latency
+
+Usage:
+  python scripts/benchmark_db.py
+  python scripts/benchmark_db.py --inserts 5000 --reads 5000 --readers 4 --duration 5 --json report.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+
+from app.core.database import DatabaseManager  # noqa: E402
+from app.core.migrations import migrate  # noqa: E402
+
+INSERT_SQL = ("INSERT INTO detections (timestamp, label, confidence, source, track_id, event, dwell) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)")
+LABELS = ("Tomato Early blight leaf", "Tomato healthy leaf", "Aphids", "Tomato Septoria leaf spot")
+
+
+class LegacyDatabase:
+    """The pre-pool access pattern: a fresh default-pragma connection for every call."""
+    def __init__(self, path):
+        self.path = path
+        conn = sqlite3.connect(path)
+        migrate(conn)  # Same schema and indexes, so only connection handling differs
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as conn:
+            yield conn
+            conn.commit()
+
+    def close(self):
+        pass
+
+
+def insert_one(database, i):
+    with database.transaction() as conn:
+        conn.execute(INSERT_SQL, (time.time(), LABELS[i % len(LABELS)], 0.8, "benchmark", None, None, None))
+
+
+def read_one(database):
+    with database.connection() as conn:
+        conn.execute("SELECT * FROM detections ORDER BY id DESC LIMIT 5").fetchall()
+        conn.execute("SELECT label, timestamp FROM detections WHERE timestamp > ? ORDER BY id DESC",
+                     (time.time() - 300,)).fetchall()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+def run_sequential(fn, count):
+    started = time.perf_counter()
+    for i in range(count):
+        fn(i)
+    elapsed = time.perf_counter() - started
+    return {"ops": count, "elapsed_s": round(elapsed, 3), "ops_per_s": round(count / elapsed, 1)}
+
+
+def run_mixed(database, readers, duration):
+    stop = threading.Event()
+    writes = [0]
+    latencies = [[] for _ in range(readers)]
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            insert_one(database, i)
+            i += 1
+        writes[0] = i
+
+    def reader(samples):
+        while not stop.is_set():
+            started = time.perf_counter()
+            read_one(database)
+            samples.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(s,)) for s in latencies]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    samples = [ms for s in latencies for ms in s]
+    return {
+        "writes_per_s": round(writes[0] / duration, 1),
+        "reads_per_s": round(len(samples) / duration, 1),
+        "read_p50_ms": round(percentile(samples, 50), 3) if samples else None,
+        "read_p99_ms": round(percentile(samples, 99), 3) if samples else None,
+        "read_max_ms": round(max(samples), 3) if samples else None
+    }
+
+
+def benchmark(name, database, args):
+    print(f"[{name}] inserts...")
+    inserts = run_sequential(lambda i: insert_one(database, i), args.inserts)
+    print(f"[{name}] reads...")
+    reads = run_sequential(lambda i: read_one(database), args.reads)
+    print(f"[{name}] mixed ({args.readers} readers + 1 writer, {args.duration:.0f}s)...")
+    mixed = run_mixed(database, args.readers, args.duration)
+    return {"insert": inserts, "read": reads, "mixed": mixed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite storage benchmark: per-call connections vs pooled WAL")
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads in the mixed workload")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds of mixed workload")
+    parser.add_argument("--dir", default=None, help="Directory for the scratch databases (default: temp dir)")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    scratch = args.dir or tempfile.mkdtemp(prefix='agri-dbbench-')
+    os.makedirs(scratch, exist_ok=True)
+
+    legacy = LegacyDatabase(os.path.join(scratch, 'legacy.db'))
+    results = {"legacy": benchmark("legacy", legacy, args)}
+
+    pooled = DatabaseManager(os.path.join(scratch, 'pooled.db'))
+    pooled.init_db()
+    results["pooled"] = benchmark("pooled", pooled, args)
+    results["pooled"]["settings"] = pooled.stats()
+    pooled.close()
+
+    before, after = results["legacy"], results["pooled"]
+    print(f"\n{'':<22}{'legacy':>12}{'pooled':>12}{'speedup':>10}")
+    for label, old, new in (
+        ("inserts/s", before["insert"]["ops_per_s"], after["insert"]["ops_per_s"]),
+        ("reads/s", before["read"]["ops_per_s"], after["read"]["ops_per_s"]),
+        ("mixed writes/s", before["mixed"]["writes_per_s"], after["mixed"]["writes_per_s"]),
+        ("mixed reads/s", before["mixed"]["reads_per_s"], after["mixed"]["reads_per_s"]),
+    ):
+        print(f"{label:<22}{old:>12}{new:>12}{(new / old if old else 0):>9.1f}x")
+    for label, key in (("mixed read p99 ms", "read_p99_ms"), ("mixed read max ms", "read_max_ms")):
+        print(f"{label:<22}{before['mixed'][key]:>12}{after['mixed'][key]:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
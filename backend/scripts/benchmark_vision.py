@@ -0,0 +1,321 @@
+"""
+Headless benchmark of the live vision pipeline.
+
+Recorded frames (a directory of images or a video file) are replayed through
+the real camera pipeline - capture -> scene gate -> detect_on_frame -> track /
+log -> draw -> encode - via a fake VideoCapture, with no camera, browser or
+HTTP server involved. The report (FPS, per-stage p50/p95/p99 latency, memory,
+scheduler and drop counters) is printed and saved as JSON so runs can be
+compared over time.
+
+By default the run logs to a throwaway database / CSV and uses the engine from
+the environment; `--engine stub` swaps in a model-free engine for quick CI runs.
+
+Usage:
+  python scripts/benchmark_vision.py samples/field.mp4 --frames 500
+  python scripts/benchmark_vision.py data/test/images --engine stub --frames 200
+  python scripts/benchmark_vision.py samples/field.mp4 --engine onnx --smoke
+  python scripts/benchmark_vision.py walk.mp4 --duration 60 --compare evaluation/reports/benchmarks/last.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from dotenv import load_dotenv  # noqa: E402
+load_dotenv(os.path.join(BASE_DIR, '.env'))
+
+import cv2  # noqa: E402
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+REPORT_DIR = os.path.join(BASE_DIR, 'evaluation', 'reports', 'benchmarks')
+
+
+def load_frames(source, limit, width=None):
+    """
+    Decodes up to `limit` frames from an image directory or a video file into
+    memory. Returns (frames, native fps or None).
+    """
+    frames, fps = [], None
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if len(frames) >= limit:
+                break
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(source)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or None
+            while len(frames) < limit:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                frames.append(frame)
+        finally:
+            cap.release()
+
+    if width:
+        frames = [cv2.resize(f, (width, int(f.shape[0] * width / f.shape[1])), interpolation=cv2.INTER_AREA)
+                  if f.shape[1] != width else f for f in frames]
+    return frames, fps
+
+
+class ReplayCapture:
+    """
+    Stand-in for cv2.VideoCapture that loops over pre-decoded frames, so the
+    benchmark measures the pipeline rather than disk or codec speed. With
+    `fps` set, read() is paced like a real camera; otherwise frames are
+    delivered as fast as they are asked for.
+    """
+    def __init__(self, frames, fps=0.0):
+        self.frames = frames
+        self.fps = fps
+        self.index = 0
+        self.delivered = 0
+        self.opened = bool(frames)
+        self._next_at = None
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        if self.fps:
+            now = time.perf_counter()
+            if self._next_at is not None and now < self._next_at:
+                time.sleep(self._next_at - now)
+            self._next_at = max(now, self._next_at or now) + 1.0 / self.fps
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        self.delivered += 1
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.frames)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES and self.frames:
+            self.index = int(value) % len(self.frames)
+            return True
+        return False
+
+    def release(self):
+        self.opened = False
+
+
+def stage_percentiles(timers):
+    """p50/p95/p99 (interpolated within buckets) and mean per pipeline stage."""
+    report = {}
+    for stage, h in sorted(timers.histograms.items()):
+        if not h.count:
+            continue
+        report[stage] = {
+            "count": h.count,
+            "mean": round(h.sum / h.count, 3),
+            "p50": round(h.percentile(50, interpolate=True), 3),
+            "p95": round(h.percentile(95, interpolate=True), 3),
+            "p99": round(h.percentile(99, interpolate=True), 3)
+        }
+    return report
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, previous):
+    """Prints relative changes against an earlier report."""
+    def delta(new, old):
+        if new is None or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nCompared with {previous.get('timestamp')} ({previous.get('git_revision')}):")
+    print(f"  fps            {current['fps']:>9}  vs {previous.get('fps'):>9}  {delta(current['fps'], previous.get('fps'))}")
+    print(f"  peak_rss_mb    {current['memory']['peak_rss_mb']:>9}  vs {previous['memory']['peak_rss_mb']:>9}  "
+          f"{delta(current['memory']['peak_rss_mb'], previous['memory']['peak_rss_mb'])}")
+    for stage, stats in current['stages'].items():
+        old = previous.get('stages', {}).get(stage)
+        if old:
+            print(f"  {stage:<14} p95 {stats['p95']:>8}ms vs {old['p95']:>8}ms  {delta(stats['p95'], old['p95'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded frames through the vision pipeline")
+    parser.add_argument("source", help="Directory of images or a video file")
+    parser.add_argument("--engine", choices=("torch", "onnx", "stub"), default=None,
+                        help="Inference engine (default: INFERENCE_ENGINE from the environment)")
+    parser.add_argument("--stub-latency-ms", type=float, default=None, help="Per-batch sleep of the stub engine")
+    parser.add_argument("--frames", type=int, default=300, help="Stop after this many processed frames")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=10, help="Processed frames excluded from the results")
+    parser.add_argument("--fps", type=float, default=None,
+                        help="Replayed camera rate (default: the video's rate, 30 for images; 0 = unpaced)")
+    parser.add_argument("--width", type=int, default=None, help="Resize replayed frames to this width")
+    parser.add_argument("--max-load", type=int, default=300, help="Frames decoded into memory for the replay loop")
+    parser.add_argument("--scene-gate", action="store_true", help="Keep the scene-change gate on (off by default)")
+    parser.add_argument("--no-stream", action="store_true", help="Skip draw/encode (no MJPEG subscriber)")
+    parser.add_argument("--keep-logs", action="store_true", help="Log to the configured DB/CSV instead of temp files")
+    parser.add_argument("--output", help="Report path (default: evaluation/reports/benchmarks/bench-<time>.json)")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--smoke", action="store_true",
+                        help="Quick end-to-end check: 20 frames, exit 1 if none got through, no report unless --output")
+    args = parser.parse_args()
+    if args.smoke:
+        args.frames, args.warmup, args.duration = min(args.frames, 20), min(args.warmup, 2), None
+
+    # Configuration is read at import time, so overrides go into the environment first
+    if args.engine:
+        os.environ['INFERENCE_ENGINE'] = args.engine
+    if args.stub_latency_ms is not None:
+        os.environ['STUB_LATENCY_MS'] = str(args.stub_latency_ms)
+    os.environ['SCENE_GATE_ENABLED'] = 'True' if args.scene_gate else 'False'
+    os.environ['CAMERA_SOURCES'] = ''
+    os.environ['MODEL_WATCH'] = 'False'
+    scratch = None
+    if not args.keep_logs:
+        scratch = tempfile.mkdtemp(prefix='agri-bench-')
+        os.environ['DB_PATH'] = os.path.join(scratch, 'bench.db')
+        os.environ['CSV_LOG_PATH'] = os.path.join(scratch, 'detections_log.csv')
+
+    from app.core.config import Config
+    from app.core.database import db
+    from app.core.metrics import pipeline_timers, current_rss_mb
+    from app.services.vision_service import vision_service
+
+    frames, native_fps = load_frames(args.source, args.max_load, args.width)
+    if not frames:
+        print(f"No frames could be read from {args.source}")
+        return 1
+    height, width = frames[0].shape[:2]
+    print(f"Replaying {len(frames)} frames ({width}x{height}) with engine '{Config.INFERENCE_ENGINE}'...")
+
+    db.init_db()
+    rss_start = current_rss_mb()
+    vision_service.load_model()
+    if vision_service.engine is None:
+        print("Model could not be loaded.")
+        return 1
+    rss_loaded = current_rss_mb()
+
+    replay_fps = args.fps if args.fps is not None else (native_fps or 30.0)
+    capture = ReplayCapture(frames, replay_fps)
+    worker = vision_service.add_camera("bench", f"replay:{args.source}", source_tag="benchmark",
+                                       capture_factory=lambda _source: capture)
+
+    done = threading.Event()
+
+    def subscribe():
+        # One MJPEG client so draw + encode run as they would with a browser attached
+        for _ in worker.broadcaster.stream():
+            if done.is_set():
+                break
+
+    if not args.no_stream:
+        threading.Thread(target=subscribe, daemon=True).start()
+
+    rss_peak = rss_loaded
+    worker.start()
+    while worker.frame_count < args.warmup and worker.running:
+        time.sleep(0.01)
+    pipeline_timers.reset()
+    base_frames, base_captured = worker.frame_count, capture.delivered
+    started = time.perf_counter()
+
+    while worker.running:
+        time.sleep(0.05)
+        rss_peak = max(rss_peak, current_rss_mb())
+        elapsed = time.perf_counter() - started
+        if args.duration is not None:
+            if elapsed >= args.duration:
+                break
+        elif worker.frame_count - base_frames >= args.frames:
+            break
+
+    elapsed = time.perf_counter() - started
+    processed = worker.frame_count - base_frames
+    captured = capture.delivered - base_captured
+    status = worker.status()
+    done.set()
+    engine = vision_service.engine
+    model_path = engine.model_path if engine is not None and engine.name != "stub" else None
+    vision_service.release_resources()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "config": {
+            "source": args.source,
+            "engine": Config.INFERENCE_ENGINE,
+            "model": model_path,
+            "imgsz": Config.MODEL_IMGSZ,
+            "max_batch": Config.INFERENCE_MAX_BATCH,
+            "frame_size": [width, height],
+            "replay_fps": replay_fps,
+            "scene_gate": args.scene_gate,
+            "stream": not args.no_stream,
+            "tracking": Config.TRACKING_ENABLED
+        },
+        "frames_processed": processed,
+        "frames_captured": captured,
+        "elapsed_s": round(elapsed, 3),
+        "fps": round(processed / elapsed, 2) if elapsed else None,
+        "capture_fps": round(captured / elapsed, 2) if elapsed else None,
+        "frames_dropped": status["dropped"],
+        "frames_shed": status["frames_shed"],
+        "frames_encoded": status["stream"]["encoded_frames"],
+        "stages": stage_percentiles(pipeline_timers),
+        "memory": {
+            "start_rss_mb": round(rss_start, 1),
+            "model_loaded_rss_mb": round(rss_loaded, 1),
+            "peak_rss_mb": round(rss_peak, 1),
+            "end_rss_mb": round(current_rss_mb(), 1)
+        }
+    }
+
+    print(f"\n{processed} frames in {elapsed:.1f}s: {report['fps']} fps "
+          f"(capture {report['capture_fps']} fps, {report['frames_dropped']} dropped)")
+    print(f"{'stage':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<14}{stats['count']:>8}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+    print(f"RSS: start {report['memory']['start_rss_mb']} MB, model loaded {report['memory']['model_loaded_rss_mb']} MB, "
+          f"peak {report['memory']['peak_rss_mb']} MB")
+
+    if args.smoke and not args.output:
+        return 0 if processed else 1
+
+    output = args.output or os.path.join(REPORT_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0 if processed or not args.smoke else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
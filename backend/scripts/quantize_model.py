@@ -0,0 +1,246 @@
+"""
+Build, verify and (optionally) promote quantized variants of models/best.pt.
+
+Steps:
+  1. Export an FP32 ONNX model, then a dynamic INT8 and a static INT8 variant
+     (the static one is calibrated on a sample of the unified dataset).
+  2. Run the evaluation/scripts/validate.py metrics and a CPU latency benchmark
+     on every variant.
+  3. Write a comparison report (mAP, p50/p99 latency, size) to
+     evaluation/reports/, and promote the fastest variant that stays inside the
+     accuracy-drop budget to the path the ONNX engine serves.
+
+Usage:
+  python scripts/quantize_model.py --calib-samples 200 --max-map-drop 0.01 --promote
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, "evaluation", "scripts"))
+
+from app.core.config import Config  # noqa: E402
+from app.services.inference_engines import OnnxEngine, TorchEngine  # noqa: E402
+from validate import validate  # noqa: E402
+
+VALID_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+DEFAULT_DATASET = os.path.join(BASE_DIR, "scripts", "unified_dataset")
+
+
+def sample_images(image_dir, count, seed=42):
+    paths = [p for p in glob.glob(os.path.join(image_dir, "**", "*"), recursive=True)
+             if os.path.splitext(p)[1].lower() in VALID_EXTENSIONS]
+    if not paths:
+        print(f"Error: No images found in {image_dir}")
+        sys.exit(1)
+    random.Random(seed).shuffle(paths)
+    return paths[:count]
+
+
+def export_fp32(model_path, out_dir, imgsz):
+    from ultralytics import YOLO
+    print("Exporting FP32 ONNX model...")
+    target = os.path.join(out_dir, "model_fp32.onnx")
+    # Ultralytics writes the .onnx next to the weights, which for models/best.pt is the
+    # served ONNX_MODEL_PATH; export from a scratch copy so only promote() touches it
+    with tempfile.TemporaryDirectory(prefix='agri-export-') as scratch:
+        weights = os.path.join(scratch, os.path.basename(model_path))
+        shutil.copyfile(model_path, weights)
+        exported = YOLO(weights).export(format='onnx', imgsz=imgsz, simplify=True)
+        shutil.copyfile(exported, target)
+    return target
+
+
+def quantize_dynamic_int8(fp32_path, out_dir):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    print("Building dynamic INT8 model...")
+    target = os.path.join(out_dir, "model_int8_dynamic.onnx")
+    quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+    return target
+
+
+def quantize_static_int8(fp32_path, out_dir, calib_paths, imgsz):
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat,
+                                          QuantType, quantize_static)
+
+    # Reuse the serving pre-processing so calibration sees exactly what inference sees
+    engine = OnnxEngine(fp32_path, imgsz=imgsz).load()
+
+    class ImageCalibrationReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(calib_paths)
+
+        def get_next(self):
+            for path in self.paths:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    blob, _, _ = engine._preprocess(frame)
+                    return {engine.input_name: blob}
+            return None
+
+    print(f"Building static INT8 model (calibrating on {len(calib_paths)} images)...")
+    target = os.path.join(out_dir, "model_int8_static.onnx")
+    quantize_static(fp32_path, target, ImageCalibrationReader(),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    engine.close()
+    return target
+
+
+def benchmark_latency(engine, frames, runs, warmup=5):
+    """CPU latency of single-frame predict() calls, in milliseconds."""
+    for frame in frames[:warmup]:
+        engine.predict([frame])
+
+    timings = []
+    for i in range(runs):
+        frame = frames[i % len(frames)]
+        start = time.perf_counter()
+        engine.predict([frame])
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p99_ms": round(float(np.percentile(timings, 99)), 2),
+        "mean_ms": round(float(np.mean(timings)), 2)
+    }
+
+
+def evaluate_variant(name, path, engine, data_yaml, frames, args):
+    print(f"\n--- Evaluating {name} ({path}) ---")
+    metrics = validate(path, data_yaml, name=f"quant_{name}", imgsz=args.imgsz)
+    latency = benchmark_latency(engine.load(), frames, args.runs)
+    engine.close()
+    return {
+        "variant": name,
+        "path": path,
+        "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+        "map50": round(float(metrics.box.map50), 4),
+        "map50_95": round(float(metrics.box.map), 4),
+        **latency
+    }
+
+
+def write_report(rows, baseline, budget, chosen, report_dir):
+    os.makedirs(report_dir, exist_ok=True)
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "baseline": baseline["variant"],
+        "max_map_drop": budget,
+        "promoted": chosen["variant"] if chosen else None,
+        "variants": rows
+    }
+    json_path = os.path.join(report_dir, "quantization_report.json")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    md_path = os.path.join(report_dir, "quantization_report.md")
+    with open(md_path, "w") as f:
+        f.write("# Quantization Report\n\n")
+        f.write(f"Generated: {report['generated_at']}  \n")
+        f.write(f"Accuracy-drop budget (mAP@0.5:0.95): {budget}\n\n")
+        f.write("| Variant | mAP@0.5 | mAP@0.5:0.95 | Drop | p50 (ms) | p99 (ms) | Size (MB) | Within budget |\n")
+        f.write("|---|---|---|---|---|---|---|---|\n")
+        for r in rows:
+            f.write(f"| {r['variant']} | {r['map50']:.4f} | {r['map50_95']:.4f} | {r['map_drop']:.4f} | "
+                    f"{r['p50_ms']} | {r['p99_ms']} | {r['size_mb']} | {'yes' if r['within_budget'] else 'no'} |\n")
+        f.write(f"\nPromoted: **{report['promoted'] or 'none'}**\n")
+
+    print(f"\nReport written to {json_path} and {md_path}")
+
+
+def promote(variant):
+    target = Config.ONNX_MODEL_PATH
+    if os.path.exists(target):
+        backup = target + ".bak"
+        shutil.copyfile(target, backup)
+        print(f"Existing model backed up to {backup}")
+    # Copy then rename, so a running server / model watcher never sees a partial file
+    staging = target + ".tmp"
+    shutil.copyfile(variant["path"], staging)
+    os.replace(staging, target)
+    print(f"Promoted {variant['variant']} -> {target}")
+    print("Serve it with INFERENCE_ENGINE=onnx.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and verify INT8 quantized variants of the detection model")
+    parser.add_argument("--model", default=Config.MODEL_PATH, help="Source PyTorch weights (best.pt)")
+    parser.add_argument("--data", default=os.path.join(DEFAULT_DATASET, "data.yaml"), help="Dataset YAML for validation")
+    parser.add_argument("--calib-dir", default=os.path.join(DEFAULT_DATASET, "images", "train"), help="Calibration image directory")
+    parser.add_argument("--calib-samples", type=int, default=100, help="Number of calibration images")
+    parser.add_argument("--imgsz", type=int, default=Config.MODEL_IMGSZ, help="Model input size")
+    parser.add_argument("--runs", type=int, default=100, help="Latency benchmark iterations per variant")
+    parser.add_argument("--max-map-drop", type=float, default=float(os.environ.get('QUANT_MAX_MAP_DROP', 0.01)),
+                        help="Maximum allowed mAP@0.5:0.95 drop versus the FP32 baseline")
+    parser.add_argument("--out-dir", default=os.path.join(BASE_DIR, "models", "quantized"), help="Where variants are written")
+    parser.add_argument("--report-dir", default=os.path.join(BASE_DIR, "evaluation", "reports"), help="Where the report is written")
+    parser.add_argument("--promote", action="store_true", help="Copy the best in-budget variant to ONNX_MODEL_PATH")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Error: Model not found at {args.model}")
+        sys.exit(1)
+    if not os.path.exists(args.data):
+        print(f"Error: Dataset not found at {args.data}")
+        print("Please run 'dataset_unifier.py' first.")
+        sys.exit(1)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    calib_paths = sample_images(args.calib_dir, args.calib_samples)
+    bench_frames = [f for f in (cv2.imread(p) for p in calib_paths[:20]) if f is not None]
+
+    # 1. Build variants
+    fp32_path = export_fp32(args.model, args.out_dir, args.imgsz)
+    variants = [
+        ("pytorch_fp32", args.model, TorchEngine(args.model, Config.MODEL_CONFIDENCE)),
+        ("onnx_fp32", fp32_path, OnnxEngine(fp32_path, Config.MODEL_CONFIDENCE, imgsz=args.imgsz)),
+    ]
+    dynamic_path = quantize_dynamic_int8(fp32_path, args.out_dir)
+    variants.append(("onnx_int8_dynamic", dynamic_path, OnnxEngine(dynamic_path, Config.MODEL_CONFIDENCE, imgsz=args.imgsz)))
+    static_path = quantize_static_int8(fp32_path, args.out_dir, calib_paths, args.imgsz)
+    variants.append(("onnx_int8_static", static_path, OnnxEngine(static_path, Config.MODEL_CONFIDENCE, imgsz=args.imgsz)))
+
+    # 2. Validate + benchmark each
+    rows = []
+    for name, path, engine in variants:
+        try:
+            rows.append(evaluate_variant(name, path, engine, args.data, bench_frames, args))
+        except Exception as e:
+            print(f"Evaluation of {name} failed: {e}")
+
+    baseline = next((r for r in rows if r["variant"] == "pytorch_fp32"), None)
+    if baseline is None:
+        print("Error: Baseline evaluation failed; nothing to compare against.")
+        sys.exit(1)
+
+    # 3. Budget check, report and promotion
+    for r in rows:
+        r["map_drop"] = round(baseline["map50_95"] - r["map50_95"], 4)
+        r["within_budget"] = r["map_drop"] <= args.max_map_drop
+
+    candidates = [r for r in rows if r["path"].endswith(".onnx") and r["within_budget"]]
+    chosen = min(candidates, key=lambda r: r["p50_ms"]) if candidates else None
+    write_report(rows, baseline, args.max_map_drop, chosen, args.report_dir)
+
+    if chosen is None:
+        print("No ONNX variant stayed inside the accuracy-drop budget. Nothing promoted.")
+    elif args.promote:
+        promote(chosen)
+    else:
+        print(f"Best in-budget variant: {chosen['variant']} (re-run with --promote to deploy it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# Importing app modules creates the service singletons: keep them off the real model, database and logs
+_scratch = tempfile.mkdtemp(prefix="agri-tests-")
+os.environ.setdefault("INFERENCE_ENGINE", "stub")
+os.environ.setdefault("DB_PATH", os.path.join(_scratch, "agri.db"))
+os.environ.setdefault("CSV_LOG_PATH", os.path.join(_scratch, "detections_log.csv"))
+os.environ.setdefault("DB_PARTITION", "none")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import DatabaseManager  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A fresh, fully migrated database."""
+    manager = DatabaseManager(str(tmp_path / "test.db"))
+    manager.init_db()
+    yield manager
+    manager.close()
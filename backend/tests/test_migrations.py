@@ -0,0 +1,75 @@
+import sqlite3
+import time
+from app.core.migrations import MIGRATIONS, current_version, migrate
+from app.core.partitions import list_partitions, period_bounds, rotate, view_name
+
+
+def _local(year, month, day, hour=12):
+    return time.mktime((year, month, day, hour, 0, 0, 0, 0, -1))
+
+
+def _names(conn, kind):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def test_migrate_creates_latest_schema(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "fresh.db"))
+    assert migrate(conn) == MIGRATIONS[-1][0]
+    assert current_version(conn) == MIGRATIONS[-1][0]
+    assert {"detections", "sensors", "result_cache", "detection_rollups"} <= _names(conn, "table")
+    assert {"detections_all", "sensors_all"} <= _names(conn, "view")
+    assert "detections_rollup" in _names(conn, "trigger")
+    # Already current: nothing to do
+    assert migrate(conn) == MIGRATIONS[-1][0]
+
+
+def test_migrate_upgrades_pre_versioning_database(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "old.db"))
+    conn.execute("CREATE TABLE detections (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp REAL, label TEXT, confidence REAL)")
+    conn.execute("CREATE TABLE result_cache (content_hash TEXT PRIMARY KEY, phash TEXT, model TEXT, detections TEXT, "
+                 "infer_ms REAL, created REAL)")
+    conn.execute("INSERT INTO detections (timestamp, label, confidence) VALUES (?, 'Rust', 0.8)", (_local(2026, 1, 5),))
+    conn.commit()
+
+    migrate(conn)
+    columns = {r[1] for r in conn.execute("PRAGMA table_info(detections)")}
+    assert {"source", "track_id", "event", "dwell"} <= columns
+    assert {"width", "height"} <= {r[1] for r in conn.execute("PRAGMA table_info(result_cache)")}
+    # Existing rows are counted into the rollups when they are created
+    assert conn.execute("SELECT SUM(count) FROM detection_rollups WHERE resolution = 60").fetchone()[0] == 1
+    assert conn.execute("SELECT source FROM detections").fetchone()[0] == "webcam"
+
+
+def test_period_bounds():
+    suffix, start, end = period_bounds(_local(2026, 2, 14), "month")
+    assert (suffix, start, end) == ("202602", _local(2026, 2, 1, 0), _local(2026, 3, 1, 0))
+    suffix, start, end = period_bounds(_local(2026, 12, 31), "day")
+    assert (suffix, start, end) == ("20261231", _local(2026, 12, 31, 0), _local(2027, 1, 1, 0))
+
+
+def test_rotate_moves_old_rows_into_partitions(database):
+    stamps = [_local(2026, 1, 10), _local(2026, 1, 11), _local(2026, 1, 12), _local(2026, 2, 20), _local(2026, 3, 5)]
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO detections (timestamp, label, confidence) VALUES (?, 'Blight', 0.7)",
+                         [(t,) for t in stamps])
+        conn.execute("INSERT INTO sensors (timestamp, temperature) VALUES (?, 21.5)", (_local(2026, 2, 1),))
+
+    with database.connection() as conn:
+        rollups_before = conn.execute("SELECT * FROM detection_rollups ORDER BY 1, 2, 3, 4").fetchall()
+        ids_before = [r[0] for r in conn.execute("SELECT id FROM detections ORDER BY id")]
+
+        # Small chunks: January needs two transactions
+        assert rotate(conn, "month", now=_local(2026, 3, 15), chunk_rows=2) == 5
+
+        assert list_partitions(conn, "detections") == ["detections_p202601", "detections_p202602"]
+        assert list_partitions(conn, "sensors") == ["sensors_p202602"]
+        assert conn.execute("SELECT COUNT(*) FROM detections_p202601").fetchone()[0] == 3
+        assert [r[0] for r in conn.execute("SELECT timestamp FROM detections")] == [stamps[-1]]
+        # Rows keep their ids and stay readable through the view; rollups are untouched
+        assert sorted(r[0] for r in conn.execute(f"SELECT id FROM {view_name('detections')}")) == ids_before
+        assert conn.execute(f"SELECT COUNT(*) FROM {view_name('sensors')}").fetchone()[0] == 1
+        assert conn.execute("SELECT * FROM detection_rollups ORDER BY 1, 2, 3, 4").fetchall() == rollups_before
+
+        # Nothing left to move
+        assert rotate(conn, "month", now=_local(2026, 3, 15)) == 0
+        assert rotate(conn, "none") == 0
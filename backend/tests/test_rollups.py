@@ -0,0 +1,71 @@
+import time
+from app.core.rollups import ROLLUP_TABLE, RESOLUTIONS, rebuild_from_db, summarize
+
+DAY = 86400
+# A UTC day boundary a few days back, so every bucket used below is complete
+BASE = (int(time.time()) // DAY - 3) * DAY
+
+
+def _insert(conn, rows):
+    conn.executemany("INSERT INTO detections (timestamp, label, confidence, source) VALUES (?, ?, ?, ?)", rows)
+
+
+def _rollups(conn):
+    return conn.execute(f"SELECT * FROM {ROLLUP_TABLE} ORDER BY 1, 2, 3, 4").fetchall()
+
+
+def test_trigger_counts_every_resolution(database):
+    with database.transaction() as conn:
+        _insert(conn, [(BASE + 10, "Rust", 0.6, "cam1"), (BASE + 50, "Rust", 0.9, "cam1"),
+                       (BASE + 70, "Rust", 0.7, "cam1"), (BASE + 20, None, 0.5, None)])
+        rows = conn.execute(f"SELECT resolution, bucket, label, source, count, max_confidence, last_seen "
+                            f"FROM {ROLLUP_TABLE} WHERE label = 'Rust' ORDER BY resolution, bucket").fetchall()
+        assert [tuple(r) for r in rows] == [
+            (60, BASE // 60, "Rust", "cam1", 2, 0.9, BASE + 50),
+            (60, BASE // 60 + 1, "Rust", "cam1", 1, 0.7, BASE + 70),
+            (3600, BASE // 3600, "Rust", "cam1", 3, 0.9, BASE + 70),
+            (DAY, BASE // DAY, "Rust", "cam1", 3, 0.9, BASE + 70),
+        ]
+        # Missing label / source are grouped under ''
+        blank = conn.execute(f"SELECT COUNT(*), SUM(count) FROM {ROLLUP_TABLE} WHERE label = '' AND source = ''").fetchone()
+        assert tuple(blank) == (len(RESOLUTIONS), len(RESOLUTIONS))
+
+        # A rebuild from the stored rows gives the same rollups
+        before = _rollups(conn)
+        rebuild_from_db(conn)
+        assert _rollups(conn) == before
+
+
+def test_summarize_leaves_partial_minute_to_raw_reads(database):
+    since = BASE + 2 * 3600 + 61
+    first_minute = BASE + 2 * 3600 + 120
+    with database.transaction() as conn:
+        _insert(conn, [
+            (since + 10, "Blight", 0.99, "cam1"),         # Edge: after since, before the first whole minute
+            (first_minute + 5, "Blight", 0.6, "cam1"),    # Whole minutes
+            (BASE + 3 * 3600 + 5, "Blight", 0.7, "cam2"),  # Whole hours
+            (BASE + DAY + 1, "Rust", 0.8, "cam1"),         # Whole days
+            (since - 30, "Rust", 0.95, "cam1"),            # Before the window
+        ])
+        totals, edge_end = summarize(conn, since)
+
+    assert edge_end == first_minute
+    assert totals == {"Blight": [2, 0.7, BASE + 3 * 3600 + 5], "Rust": [1, 0.8, BASE + DAY + 1]}
+
+
+def test_summarize_from_a_day_boundary(database):
+    with database.transaction() as conn:
+        _insert(conn, [(BASE - 30, "Rust", 0.5, "cam1"), (BASE, "Rust", 0.6, "cam1"),
+                       (BASE + DAY + 3600, "Rust", 0.7, "cam1")])
+        totals, edge_end = summarize(conn, BASE)
+    assert edge_end == BASE
+    assert totals == {"Rust": [2, 0.7, BASE + DAY + 3600]}
+
+
+def test_summarize_inside_the_current_minute(database):
+    since = time.time()
+    with database.transaction() as conn:
+        _insert(conn, [(since + 0.001, "Rust", 0.5, "cam1")])
+        totals, edge_end = summarize(conn, since)
+    # No whole minute yet: the caller reads everything raw
+    assert (totals, edge_end) == ({}, since)
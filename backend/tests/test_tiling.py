@@ -0,0 +1,42 @@
+from app.services.tiling import make_tiles, merge_detections
+
+
+def test_small_image_is_one_tile():
+    assert make_tiles(300, 500, tile_size=640) == [(0, 0, 500, 300)]
+
+
+def test_tiles_cover_the_image_with_full_size_edges():
+    tiles = make_tiles(1000, 1500, tile_size=640, overlap=0.2)
+    xs = sorted({x for x, _, _, _ in tiles})
+    ys = sorted({y for _, y, _, _ in tiles})
+    assert xs == [0, 512, 860]  # Last column shifted inwards to end at the border
+    assert ys == [0, 360]
+    assert len(tiles) == len(xs) * len(ys)
+    assert all(w == 640 and h == 640 for _, _, w, h in tiles)
+    assert max(x + w for x, _, w, _ in tiles) == 1500
+    assert max(y + h for _, y, _, h in tiles) == 1000
+
+
+def test_merge_offsets_boxes_and_suppresses_overlaps():
+    tile_results = [
+        ((0, 0), [{"label": "Rust", "confidence": 0.9, "box": [600, 10, 640, 50]}]),
+        # Same lesion seen by the neighbouring tile
+        ((512, 0), [{"label": "Rust", "confidence": 0.7, "box": [90, 12, 128, 50]},
+                    {"label": "Blight", "confidence": 0.6, "box": [92, 12, 128, 50]}]),
+        ((860, 0), [{"label": "Rust", "confidence": 0.8, "box": [0, 0, 20, 20]}]),
+    ]
+    merged = merge_detections(tile_results, iou_threshold=0.45)
+    assert sorted((d["label"], d["confidence"], d["box"]) for d in merged) == [
+        ("Blight", 0.6, [604, 12, 640, 50]),  # Other classes never suppress each other
+        ("Rust", 0.8, [860, 0, 880, 20]),
+        ("Rust", 0.9, [600, 10, 640, 50]),
+    ]
+
+
+def test_merge_keeps_best_boxless_detection_per_label():
+    merged = merge_detections([
+        ((0, 0), [{"label": "Healthy", "confidence": 0.4, "box": None}]),
+        ((512, 0), [{"label": "Healthy", "confidence": 0.7, "box": None},
+                    {"label": "Rust", "confidence": 0.5, "box": None}]),
+    ])
+    assert sorted((d["label"], d["confidence"]) for d in merged) == [("Healthy", 0.7), ("Rust", 0.5)]
@@ -0,0 +1,57 @@
+from app.services.tracker import DetectionTracker, box_iou
+
+
+def _det(box, confidence=0.6, label="Rust"):
+    return {"label": label, "confidence": confidence, "box": box}
+
+
+def _kinds(events):
+    return [e["event"] for e in events]
+
+
+def test_box_iou():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+    assert abs(box_iou([0, 0, 10, 10], [5, 0, 15, 10]) - 1 / 3) < 1e-9
+
+
+def test_track_start_peak_end():
+    tracker = DetectionTracker(max_age=1.5, min_hits=2, peak_margin=0.05, peak_interval=5.0)
+    assert tracker.update([_det([0, 0, 10, 10])], now=0.0) == []  # Tentative until min_hits
+
+    start = tracker.update([_det([1, 0, 11, 10])], now=0.5)
+    assert _kinds(start) == ["start"]
+    track_id = start[0]["track_id"]
+    assert track_id is not None and start[0]["dwell"] == 0.5
+
+    # Higher confidence, but within peak_interval of the start event
+    assert tracker.update([_det([1, 0, 11, 10], 0.9)], now=1.0) == []
+    peak = tracker.update([_det([2, 0, 12, 10], 0.8)], now=5.5)
+    assert _kinds(peak) == ["peak"] and peak[0]["confidence"] == 0.9
+    # Already reported: no repeat
+    assert tracker.update([_det([2, 0, 12, 10], 0.9)], now=11.0) == []
+
+    end = tracker.update([], now=13.0)
+    assert _kinds(end) == ["end"]
+    assert end[0]["track_id"] == track_id and end[0]["confidence"] == 0.9 and end[0]["dwell"] == 11.0
+    assert tracker.tracks == []
+
+
+def test_tracks_are_per_label_and_unconfirmed_tracks_vanish():
+    tracker = DetectionTracker(max_age=1.0, min_hits=2)
+    tracker.update([_det([0, 0, 10, 10]), _det([0, 0, 10, 10], label="Blight")], now=0.0)
+    events = tracker.update([_det([0, 0, 10, 10])], now=0.5)
+    assert [(e["event"], e["label"]) for e in events] == [("start", "Rust")]
+
+    # The Blight track was never confirmed, so it expires without an event
+    assert _kinds(tracker.update([_det([0, 0, 10, 10])], now=1.2)) == []
+    assert tracker.stats()["active_tracks"] == 1 and tracker.stats()["tentative_tracks"] == 0
+
+
+def test_fast_motion_matches_by_centroid():
+    tracker = DetectionTracker(iou_threshold=0.3, max_centroid_distance=0.5, min_hits=1)
+    first = tracker.update([_det([0, 0, 10, 10])], now=0.0)
+    # No overlap with the last box, but the centre moved less than half a diagonal
+    assert tracker.update([_det([6, 0, 16, 10])], now=0.1) == []
+    assert len(tracker.tracks) == 1
+    assert _kinds(tracker.flush()) == ["end"] and first[0]["event"] == "start"
@@ -0,0 +1,19 @@
+from app.services.video_jobs import is_stream, plan_segments
+
+
+def test_plan_segments_splits_into_whole_ranges():
+    assert plan_segments(250, 25.0, 4) == [(0, 100), (100, 200), (200, 250)]
+    assert plan_segments(200, 25.0, 4) == [(0, 100), (100, 200)]
+
+
+def test_plan_segments_edge_cases():
+    assert plan_segments(0, 30.0, 60) == []
+    assert plan_segments(10, 30.0, 60) == [(0, 10)]
+    # Segments are never shorter than one frame
+    assert plan_segments(3, 30.0, 0) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_is_stream():
+    assert is_stream("rtsp://camera/1")
+    assert not is_stream("field.mp4")
+    assert not is_stream(0)
@@ -0,0 +1,73 @@
+from app.services.storage_service import DETECTION_COLUMNS
+from app.services.write_behind import WriteBehindWriter
+
+
+def _writer(database, **kwargs):
+    # Long flush interval: rows only reach the database on flush()
+    return WriteBehindWriter(database, {"detections": DETECTION_COLUMNS}, flush_interval=60.0, **kwargs)
+
+
+def _row(timestamp, label="Leaf Spot"):
+    return (timestamp, label, 0.9, "webcam", None, None, None)
+
+
+def _stored_ids(database):
+    with database.connection() as conn:
+        return [r[0] for r in conn.execute("SELECT id FROM detections ORDER BY id")]
+
+
+def test_ids_continue_after_stored_rows(database):
+    with database.transaction() as conn:
+        conn.execute("INSERT INTO detections (id, timestamp, label, confidence) VALUES (41, 1.0, 'x', 0.5)")
+    writer = _writer(database)
+    assert writer.write_many("detections", [_row(2.0), _row(3.0)]) == [42, 43]
+    assert writer.write("detections", _row(4.0)) == 44
+    writer.close()
+
+
+def test_ids_skip_rows_moved_out_of_the_table(database):
+    # AUTOINCREMENT's sqlite_sequence remembers ids no longer in the live table
+    with database.transaction() as conn:
+        conn.execute("INSERT INTO detections (id, timestamp, label, confidence) VALUES (7, 1.0, 'x', 0.5)")
+        conn.execute("DELETE FROM detections")
+    writer = _writer(database)
+    assert writer.write("detections", _row(2.0)) == 8
+    writer.close()
+
+
+def test_pending_rows_visible_until_committed(database):
+    writer = _writer(database)
+    ids = writer.write_many("detections", [_row(1.0), _row(2.0)])
+    assert [r["id"] for r in writer.pending_rows("detections")] == ids
+    assert _stored_ids(database) == []
+
+    assert writer.flush()
+    assert writer.pending_rows("detections") == []
+    assert _stored_ids(database) == ids
+    writer.close()
+
+
+def test_renumbers_rows_after_id_collision(database):
+    renumbered = []
+    writer = _writer(database, on_renumber=lambda table, ids: renumbered.append((table, ids)))
+    ids = writer.write_many("detections", [_row(1.0), _row(2.0)])
+
+    # Another process takes the same ids before the group commit
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO detections (id, timestamp, label, confidence) VALUES (?, 0.5, 'other', 0.1)",
+                         [(i,) for i in ids])
+
+    assert writer.flush()
+    new_ids = renumbered[0][1]
+    assert renumbered == [("detections", new_ids)]
+    assert min(new_ids) > max(ids)
+    assert _stored_ids(database) == ids + new_ids
+    with database.connection() as conn:
+        labels = [r[0] for r in conn.execute("SELECT label FROM detections WHERE id IN (?, ?) ORDER BY id", new_ids)]
+    assert labels == ["Leaf Spot", "Leaf Spot"]
+
+    stats = writer.stats()
+    assert stats["renumbered"] == 2 and stats["committed"] == 2 and stats["failures"] == 0
+    # Later rows continue after the renumbered ones
+    assert writer.write("detections", _row(3.0)) == max(new_ids) + 1
+    writer.close()